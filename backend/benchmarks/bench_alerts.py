@@ -0,0 +1,94 @@
+"""Alert rule matching benchmark
+
+Run from the backend directory:
+    python -m benchmarks.bench_alerts --rules 100000 --batch 200 --edits 2000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.alerts import AlertRuleIndex
+
+VENUES = ["Polymarket", "Kalshi", "Manifold", "PredictIt", "Betfair"]
+CATEGORIES = ["Politics", "Crypto", "Sports", "Economics", "Science", "Entertainment"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the indexed alert rule matcher")
+    parser.add_argument("--rules", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=2000, help="Single-rule changes, each followed by a match")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    rules = []
+    for i in range(args.rules):
+        rules.append({
+            "id": f"rule-{i}",
+            "min_spread_pct": float(rng.uniform(0.5, 10)),
+            "min_liquidity_usd": float(rng.lognormal(8, 1.5)),
+            "venue_filter": list(rng.choice(VENUES, rng.integers(0, 3), replace=False)),
+            "category_filter": list(rng.choice(CATEGORIES, rng.integers(0, 2), replace=False)),
+            "status": "active",
+        })
+    opportunities = [{
+        "net_spread_pct": float(rng.exponential(2)),
+        "max_tradable_amount": float(rng.lognormal(8, 1.5)),
+        "venue_a_name": str(rng.choice(VENUES)),
+        "venue_b_name": str(rng.choice(VENUES)),
+        "market_a_category": str(rng.choice(CATEGORIES)),
+        "market_b_category": str(rng.choice(CATEGORIES)),
+    } for _ in range(args.batch)]
+
+    index = AlertRuleIndex()
+    start = time.perf_counter()
+    index.replace_all(rules)
+    index.match(opportunities[0])
+    print(f"Index build:           {(time.perf_counter() - start) * 1000:.0f} ms for {args.rules:,} rules")
+
+    start = time.perf_counter()
+    matches = index.match_batch(opportunities)
+    elapsed = time.perf_counter() - start
+    print(f"Batch match:           {elapsed * 1000:.1f} ms for {args.batch} opportunities")
+    print(f"Per opportunity:       {elapsed / args.batch * 1e6:.0f} us")
+    print(f"Matches:               {sum(len(m) for m in matches):,}")
+
+    # Cross-check against a linear scan
+    def naive(opp):
+        return [r["id"] for r in rules
+                if r["min_spread_pct"] <= opp["net_spread_pct"]
+                and r["min_liquidity_usd"] <= opp["max_tradable_amount"]
+                and (not r["venue_filter"] or opp["venue_a_name"] in r["venue_filter"] or opp["venue_b_name"] in r["venue_filter"])
+                and (not r["category_filter"] or opp["market_a_category"] in r["category_filter"] or opp["market_b_category"] in r["category_filter"])]
+
+    start = time.perf_counter()
+    expected = [naive(opp) for opp in opportunities[:20]]
+    naive_elapsed = (time.perf_counter() - start) / 20
+    assert all(sorted(a) == sorted(b) for a, b in zip(matches[:20], expected))
+    print(f"Linear scan:           {naive_elapsed * 1e6:.0f} us per opportunity (results match)")
+
+    # Rule edits and deletions as they arrive from NOTIFY, a match after each
+    start = time.perf_counter()
+    for i in range(args.edits):
+        position = int(rng.integers(len(rules)))
+        if i % 10 == 0:
+            index.remove(rules[position]["id"])
+            rules[position] = dict(rules[position], status="inactive")
+        else:
+            rules[position] = dict(rules[position], min_spread_pct=float(rng.uniform(0.5, 10)), status="active")
+            index.upsert(rules[position])
+        index.match(opportunities[i % len(opportunities)])
+    elapsed = time.perf_counter() - start
+    print(f"Edit + match:          {elapsed / max(args.edits, 1) * 1e6:.0f} us per change "
+          f"({index.compactions} compactions)")
+
+    rules = [r for r in rules if r["status"] == "active"]
+    matches = index.match_batch(opportunities[:20])
+    assert all(sorted(a) == sorted(naive(opp)) for a, opp in zip(matches, opportunities[:20]))
+    print(f"After edits:           {len(index):,} rules, results match the linear scan")
+
+
+if __name__ == "__main__":
+    main()
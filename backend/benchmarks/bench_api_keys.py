@@ -0,0 +1,56 @@
+"""API key authentication benchmark
+
+Run from the backend directory:
+    python -m benchmarks.bench_api_keys --keys 10000 --requests 200000
+"""
+import argparse
+import asyncio
+import secrets
+import time
+
+import numpy as np
+
+from utils.api_keys import ApiKeyAuthenticator, ApiKeyEntry, hash_api_key
+
+
+async def run(args):
+    auth = ApiKeyAuthenticator(cache_size=args.keys, required=True)
+    keys = [f"arb_{secrets.token_hex(16)}" for _ in range(args.keys)]
+    for i, key in enumerate(keys):
+        auth._cache[hash_api_key(key)] = ApiKeyEntry({
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "user_id": None,
+            "tier": "pro",
+            "rate_limit_per_minute": args.rate_limit,
+            "expires_at": None,
+        })
+
+    rng = np.random.default_rng(args.seed)
+    picks = [keys[i] for i in rng.integers(0, args.keys, args.requests)]
+
+    start = time.perf_counter()
+    statuses = {}
+    for key in picks:
+        result = await auth.authenticate(key)
+        statuses[result.status_code] = statuses.get(result.status_code, 0) + 1
+    elapsed = time.perf_counter() - start
+
+    print(f"Requests:              {args.requests:,} across {args.keys:,} cached keys")
+    print(f"Per request:           {elapsed / args.requests * 1e6:.2f} us")
+    print(f"Throughput:            {args.requests / elapsed:,.0f} req/s")
+    print(f"Status counts:         {dict(sorted(statuses.items()))}")
+    print(f"Pending last_used_at:  {len(auth._last_used):,} rows in one flush")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cached API key verification and rate limiting")
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--rate-limit", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=9)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Arrow vs JSON export benchmark for loading opportunities into pandas
+
+Run from the backend directory:
+    python -m benchmarks.bench_arrow_export --rows 500000
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from utils.arrow_export import arrow_type, record_batch, ipc_stream
+from utils.exports import ndjson_chunk
+
+
+def synthetic_rows(n, seed):
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    spreads = rng.exponential(2, n)
+    amounts = rng.lognormal(8, 1.5, n)
+    seconds = np.sort(rng.integers(0, 30 * 86400, n))
+    pair_ids = [str(uuid.uuid4()) for _ in range(500)]
+    return [{
+        "id": str(uuid.uuid4()),
+        "pair_id": pair_ids[i % 500],
+        "created_at": start + timedelta(seconds=int(seconds[i])),
+        "net_spread_pct": Decimal(f"{spreads[i]:.4f}"),
+        "max_tradable_amount": Decimal(f"{amounts[i]:.2f}"),
+        "venue_a_name": "Polymarket",
+        "venue_b_name": "Kalshi",
+    } for i in range(n)]
+
+
+async def run(args):
+    rows = synthetic_rows(args.rows, args.seed)
+    schema = pa.schema([
+        ("id", pa.string()), ("pair_id", pa.string()),
+        ("created_at", arrow_type("timestamp with time zone")),
+        ("net_spread_pct", arrow_type("numeric", 8, 4)),
+        ("max_tradable_amount", arrow_type("numeric", 18, 2)),
+        ("venue_a_name", pa.string()), ("venue_b_name", pa.string()),
+    ])
+    chunks = [rows[i:i + args.chunk] for i in range(0, len(rows), args.chunk)]
+
+    start = time.perf_counter()
+    body = b"".join(ndjson_chunk(chunk) for chunk in chunks)
+    frame = pd.DataFrame([json.loads(line) for line in body.splitlines()])
+    json_elapsed = time.perf_counter() - start
+
+    async def batches():
+        for chunk in chunks:
+            yield record_batch(chunk, schema)
+
+    start = time.perf_counter()
+    body_arrow = b"".join([data async for data in ipc_stream(schema, batches())])
+    arrow_frame = pa.ipc.open_stream(body_arrow).read_pandas()
+    arrow_elapsed = time.perf_counter() - start
+
+    assert len(frame) == len(arrow_frame) == args.rows
+    print(f"Rows:                  {args.rows:,}")
+    print(f"NDJSON -> DataFrame:   {json_elapsed:.2f} s ({len(body) / 1e6:.0f} MB, spreads as float)")
+    print(f"Arrow -> DataFrame:    {arrow_elapsed:.2f} s ({len(body_arrow) / 1e6:.0f} MB, exact decimals)")
+    print(f"Speedup:               {json_elapsed / arrow_elapsed:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Arrow IPC against NDJSON for DataFrame loads")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--chunk", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=17)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Block bootstrap benchmark
+
+Run from the backend directory:
+    python -m benchmarks.bench_bootstrap --days 90 --resamples 10000
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.bootstrap import bootstrap_confidence_intervals, bootstrap_confidence_intervals_parallel
+
+
+async def run_parallel(returns, resamples, workers):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Warm the workers so process start-up is not measured
+        await bootstrap_confidence_intervals_parallel(returns, executor, n_resamples=workers * 10, chunks=workers)
+        start = time.perf_counter()
+        result = await bootstrap_confidence_intervals_parallel(returns, executor, n_resamples=resamples, chunks=workers)
+        return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bootstrap confidence intervals")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--resamples", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    returns = np.random.default_rng(3).normal(0.01, 0.02, args.days)
+
+    start = time.perf_counter()
+    bootstrap_confidence_intervals(returns, n_resamples=args.resamples)
+    print(f"Single process:        {time.perf_counter() - start:.2f} s")
+
+    result, elapsed = asyncio.run(run_parallel(returns, args.resamples, args.workers))
+    print(f"{f'{args.workers} workers:':<23}{elapsed:.2f} s")
+    for name in ("sharpe_ratio", "max_drawdown_pct", "cumulative_daily_return_pct"):
+        print(f"  {name:<28} {result[name]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Cold-start benchmark: time to ready and first-request latency
+
+Starts the API under uvicorn in a subprocess, with and without the startup
+warm-up, and measures time until the port answers, time until
+/health/ready returns 200, and the latency of the first and following
+requests to a hot route. Needs DATABASE_URL (or BENCH_DATABASE_URL).
+
+Run from the backend directory:
+    python -m benchmarks.bench_cold_start --path /api/v1/opportunities --requests 20
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(url, timeout=30.0):
+    """(status, body, seconds); connection errors return status 0"""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        body, status = e.read(), e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        body, status = b"", 0
+    return status, body, time.perf_counter() - start
+
+
+def run_once(args, warmup):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, STARTUP_WARMUP="true" if warmup else "false")
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+        env.pop("SUPABASE_DB_URL", None)
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        listening = ready = None
+        report = {}
+        while time.perf_counter() - started < args.timeout:
+            status, body, _ = get(f"{base}/health/ready", timeout=1.0)
+            if status and listening is None:
+                listening = time.perf_counter() - started
+            if status == 200:
+                ready = time.perf_counter() - started
+                report = json.loads(body)
+                break
+            time.sleep(0.02)
+        if ready is None:
+            raise SystemExit(f"Server did not become ready within {args.timeout} s")
+
+        first_status, _, first = get(f"{base}{args.path}")
+        following = [get(f"{base}{args.path}")[2] for _ in range(args.requests)]
+        return {
+            "listening_s": listening,
+            "ready_s": ready,
+            "first_ms": first * 1000,
+            "first_status": first_status,
+            "steady_p50_ms": float(np.median(following)) * 1000,
+            "report": report,
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start and first-request latency with and without warm-up")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--path", default="/api/v1/opportunities")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    if not (args.database_url or os.getenv("DATABASE_URL") or os.getenv("SUPABASE_DB_URL")):
+        raise SystemExit("Set --database-url, BENCH_DATABASE_URL or DATABASE_URL")
+
+    for warmup in (False, True):
+        result = run_once(args, warmup)
+        report = result["report"]
+        print(f"Warm-up {'on' if warmup else 'off'}:")
+        print(f"  Port answering:       {result['listening_s'] * 1000:.0f} ms (main imports {report.get('import_ms')} ms)")
+        print(f"  Ready:                {result['ready_s'] * 1000:.0f} ms (steps {report.get('steps_ms')})")
+        print(f"  First {args.path}:  {result['first_ms']:.1f} ms (HTTP {result['first_status']})")
+        print(f"  Steady-state p50:     {result['steady_p50_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
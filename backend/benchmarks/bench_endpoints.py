@@ -0,0 +1,313 @@
+"""Endpoint benchmark suite with a JSON regression baseline
+
+Drives every route in main.py in-process over ASGI, plus the backtest
+calculation and the uncached stats aggregates, against a database filled by
+benchmarks.synthetic_data. Each case reports p50/p90/p99 latency and rows
+per second. With --baseline the run fails (exit code 1) when p50 or p90
+latency grows, or throughput drops, by more than --tolerance.
+
+Run from the backend directory:
+    python -m benchmarks.synthetic_data --opportunities 1000000 --days 90
+    python -m benchmarks.bench_endpoints --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_endpoints --baseline benchmarks/baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+import numpy as np
+
+BENCH_BACKTEST_NAME = "bench-endpoints"
+
+
+def percentiles(samples):
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99]) * 1000
+    return {"p50_ms": round(p50, 3), "p90_ms": round(p90, 3), "p99_ms": round(p99, 3),
+            "mean_ms": round(float(np.mean(samples)) * 1000, 3)}
+
+
+def count_rows(response):
+    """Rows a response carried: list lengths for JSON, lines for text exports"""
+    content_type = response.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        body = response.json()
+        for key in ("opportunities", "venues", "markets"):
+            if isinstance(body, dict) and isinstance(body.get(key), list):
+                return len(body[key])
+        return 1
+    if content_type.startswith(("application/x-ndjson", "text/csv")):
+        return response.content.count(b"\n")
+    return 1
+
+
+async def fixtures(database_url):
+    """Ids and date ranges to request, read from the loaded data"""
+    conn = await asyncpg.connect(database_url, timeout=30.0)
+    try:
+        ids = [str(r['id']) for r in await conn.fetch(
+            "SELECT id FROM arbitrage_opportunities ORDER BY created_at DESC LIMIT 100"
+        )]
+        newest = await conn.fetchval("SELECT MAX(created_at) FROM arbitrage_opportunities")
+        category = await conn.fetchval(
+            "SELECT category FROM markets GROUP BY category ORDER BY COUNT(*) DESC LIMIT 1"
+        )
+        venue = await conn.fetchval("SELECT name FROM venues ORDER BY name LIMIT 1")
+        user_id = await conn.fetchval("SELECT id FROM user_profiles ORDER BY created_at LIMIT 1")
+        total = await conn.fetchval("SELECT COUNT(*) FROM arbitrage_opportunities")
+    finally:
+        await conn.close()
+    if not ids:
+        raise SystemExit("No opportunities found; load data with benchmarks.synthetic_data first")
+    return {
+        "ids": ids, "newest": newest or datetime.now(timezone.utc), "category": category,
+        "venue": venue, "user_id": str(user_id) if user_id else None, "opportunities": total,
+    }
+
+
+def http_cases(data):
+    """(name, method, path, params, json body) for every route"""
+    newest = data["newest"].date()
+    day = newest.isoformat()
+    week = (newest - timedelta(days=6)).isoformat()
+    ids = data["ids"]
+    cases = [
+        ("health", "GET", "/health", None, None),
+        ("root", "GET", "/", None, None),
+        ("preflight", "OPTIONS", "/api/v1/opportunities", None, None),
+        ("opportunities", "GET", "/api/v1/opportunities", {"limit": 50}, None),
+        ("opportunities_limit_500", "GET", "/api/v1/opportunities", {"limit": 500}, None),
+        ("opportunities_filtered", "GET", "/api/v1/opportunities",
+         {"limit": 50, "category": data["category"], "min_spread": 1.0}, None),
+        ("opportunities_venue", "GET", "/api/v1/opportunities", {"limit": 50, "venues": data["venue"]}, None),
+        ("opportunities_fields", "GET", "/api/v1/opportunities",
+         {"limit": 500, "fields": "id,net_spread_pct,created_at"}, None),
+        ("opportunity_detail", "GET", f"/api/v1/opportunities/{ids[0]}", None, None),
+        ("opportunities_batch_100", "POST", "/api/v1/opportunities/batch", None, {"ids": ids}),
+        ("venues", "GET", "/api/v1/venues", None, None),
+        ("markets", "GET", "/api/v1/markets", {"limit": 100}, None),
+        ("markets_category", "GET", "/api/v1/markets", {"limit": 100, "category": data["category"]}, None),
+        ("stats", "GET", "/api/v1/stats", None, None),
+        ("export_ndjson_day", "GET", "/api/v1/exports/opportunities",
+         {"start_date": day, "end_date": day}, None),
+        ("export_csv_day", "GET", "/api/v1/exports/opportunities",
+         {"start_date": day, "end_date": day, "format": "csv"}, None),
+        ("export_arrow_week", "GET", "/api/v1/exports/opportunities",
+         {"start_date": week, "end_date": day, "format": "arrow"}, None),
+        ("export_ticks_day", "GET", "/api/v1/exports/market-ticks",
+         {"start_date": day, "end_date": day}, None),
+    ]
+    if data["user_id"]:
+        # A range with no opportunities keeps the queued calculation trivial,
+        # so this measures the insert and response
+        future = (newest + timedelta(days=365)).isoformat()
+        cases.append(("backtest_create", "POST", "/api/v1/backtests", None, {
+            "name": BENCH_BACKTEST_NAME, "user_id": data["user_id"], "start_date": future, "end_date": future,
+        }))
+    return cases
+
+
+async def time_calls(call, iterations, warmup):
+    rows = 0
+    for _ in range(warmup):
+        await call()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        rows = await call()
+        samples.append(time.perf_counter() - start)
+    result = percentiles(np.array(samples))
+    result["rows"] = rows
+    result["rows_per_s"] = round(rows / float(np.mean(samples)), 1)
+    result["iterations"] = iterations
+    return result
+
+
+def report(name, result):
+    print(f"{name:<28}{result['p50_ms']:>9.2f} ms p50{result['p90_ms']:>9.2f} ms p90"
+          f"{result['p99_ms']:>9.2f} ms p99{result['rows_per_s']:>14,.0f} rows/s")
+
+
+async def run_suite(args, database_url):
+    data = await fixtures(database_url)
+    # main reads its configuration at import time
+    os.environ.pop("SUPABASE_DB_URL", None)
+    os.environ["DATABASE_URL"] = database_url
+    import httpx
+    import main
+
+    results = {}
+    pattern = re.compile(args.only) if args.only else None
+    devnull = open(os.devnull, "w")
+    await main.app.router.startup()
+    try:
+        # Wait for the startup warm-up, then let the version listeners connect
+        deadline = time.perf_counter() + 120
+        while not main.startup_warmup.ready and main.startup_warmup.error is None and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(args.settle)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            backtest_id = None
+            for name, method, path, params, body in http_cases(data):
+                if pattern and not pattern.search(name):
+                    continue
+
+                async def call():
+                    response = await client.request(method, path, params=params, json=body)
+                    if response.status_code >= 400:
+                        raise RuntimeError(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+                    return count_rows(response)
+
+                with contextlib.redirect_stdout(devnull):
+                    results[name] = await time_calls(call, args.iterations, args.warmup)
+                report(name, results[name])
+
+            if data["user_id"] and (not pattern or pattern.search("backtest_get")):
+                future = (data["newest"] + timedelta(days=365)).date().isoformat()
+                created = await client.post("/api/v1/backtests", json={
+                    "name": BENCH_BACKTEST_NAME, "user_id": data["user_id"], "start_date": future, "end_date": future,
+                })
+                backtest_id = created.json()["id"]
+
+                async def get_backtest():
+                    response = await client.get(f"/api/v1/backtests/{backtest_id}")
+                    response.raise_for_status()
+                    return 1
+
+                with contextlib.redirect_stdout(devnull):
+                    results["backtest_get"] = await time_calls(get_backtest, args.iterations, args.warmup)
+                report("backtest_get", results["backtest_get"])
+
+        if not pattern or pattern.search("load_platform_stats"):
+            async def stats():
+                await main.load_platform_stats()
+                return 1
+
+            with contextlib.redirect_stdout(devnull):
+                results["load_platform_stats"] = await time_calls(stats, args.iterations, args.warmup)
+            report("load_platform_stats", results["load_platform_stats"])
+
+        if data["user_id"] and (not pattern or pattern.search("calculate_backtest_results")):
+            backtest_data = {
+                "start_date": (data["newest"] - timedelta(days=args.days)).date().isoformat(),
+                "end_date": data["newest"].date().isoformat(),
+                "min_spread_pct": 1.0, "min_liquidity_usd": 500.0,
+            }
+            conn = await asyncpg.connect(database_url, timeout=30.0)
+            try:
+                backtest_id = backtest_id or await conn.fetchval(
+                    "INSERT INTO backtests (user_id, name, start_date, end_date) VALUES ($1, $2, $3, $4) RETURNING id",
+                    data["user_id"], BENCH_BACKTEST_NAME,
+                    datetime.fromisoformat(backtest_data["start_date"]).date(),
+                    datetime.fromisoformat(backtest_data["end_date"]).date()
+                )
+                start, end = main.parse_backtest_range(backtest_data)
+                rows = await conn.fetchval(
+                    "SELECT COUNT(*) FROM arbitrage_opportunities WHERE created_at >= $1 AND created_at <= $2 "
+                    "AND net_spread_pct >= $3 AND max_tradable_amount >= $4",
+                    start, end, 1.0, 500.0
+                )
+            finally:
+                await conn.close()
+
+            async def backtest():
+                await main.calculate_backtest_results(backtest_id, backtest_data)
+                return rows
+
+            iterations = max(1, args.iterations // 10)
+            with contextlib.redirect_stdout(devnull):
+                results["calculate_backtest_results"] = await time_calls(backtest, iterations, 1)
+            report("calculate_backtest_results", results["calculate_backtest_results"])
+    finally:
+        await main.app.router.shutdown()
+        devnull.close()
+        if data["user_id"]:
+            conn = await asyncpg.connect(database_url, timeout=30.0)
+            try:
+                await conn.execute("DELETE FROM backtests WHERE name = $1", BENCH_BACKTEST_NAME)
+            finally:
+                await conn.close()
+
+    if not data["user_id"]:
+        print("Skipped backtest cases: no user_profiles row to own them")
+    return data, results
+
+
+def compare(baseline, results, tolerance):
+    """Names of cases that regressed beyond the tolerance, with the reason"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p90_ms"):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {previous[metric]:.2f} -> {current[metric]:.2f}")
+        if current["rows_per_s"] < previous["rows_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: rows/s {previous['rows_per_s']:,.0f} -> {current['rows_per_s']:,.0f}"
+            )
+    return regressions
+
+
+async def run(args):
+    database_url = args.database_url or os.getenv("BENCH_DATABASE_URL")
+    if not database_url:
+        raise SystemExit("Set --database-url or BENCH_DATABASE_URL to a local benchmark database")
+
+    data, results = await run_suite(args, database_url)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({
+                "meta": {
+                    "opportunities": data["opportunities"],
+                    "iterations": args.iterations,
+                    "python": platform.python_version(),
+                    "recorded_at": datetime.now(timezone.utc).isoformat(),
+                },
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["opportunities"] != data["opportunities"]:
+            print(f"⚠️ Baseline was recorded with {baseline['meta']['opportunities']:,} opportunities, "
+                  f"this database has {data['opportunities']:,}")
+        regressions = compare(baseline["results"], results, args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every API route against synthetic data")
+    parser.add_argument("--database-url", help="Target database (default: BENCH_DATABASE_URL)")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--days", type=int, default=90, help="Backtest range, ending at the newest opportunity")
+    parser.add_argument("--settle", type=float, default=2.0, help="Seconds to wait for background listeners")
+    parser.add_argument("--only", help="Regex selecting case names")
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
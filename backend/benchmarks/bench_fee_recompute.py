@@ -0,0 +1,92 @@
+"""Fee change benchmark: time to re-price every active opportunity of a venue
+
+Uses the synthetic venue with the most active opportunities (load them with
+benchmarks.synthetic_data first), raises its fee_bps, runs the batched
+recompute, checks every affected row against the new fee and restores the
+original fee. Takes the same advisory lock as the API, so a running server
+skips the notifications this triggers.
+
+Run from the backend directory:
+    python -m benchmarks.bench_fee_recompute --batch-size 5000 --fee-step 25
+"""
+import argparse
+import asyncio
+import os
+
+import asyncpg
+
+from benchmarks.synthetic_data import VENUE_PREFIX
+from utils.fee_recompute import FeeRecomputer
+
+BUSIEST_VENUE_QUERY = """
+SELECT v.id, v.name, v.fee_bps, COUNT(*) AS active
+FROM venues v
+JOIN markets m ON m.venue_id = v.id
+JOIN market_pairs mp ON mp.market_a_id = m.id OR mp.market_b_id = m.id
+JOIN arbitrage_opportunities ao ON ao.pair_id = mp.id AND ao.status = 'active'
+WHERE v.name LIKE $1
+GROUP BY v.id, v.name, v.fee_bps
+ORDER BY active DESC
+LIMIT 1
+"""
+
+# Active opportunities of the venue whose stored net spread disagrees with current fees
+MISMATCH_QUERY = """
+SELECT COUNT(*)
+FROM arbitrage_opportunities ao
+JOIN market_pairs mp ON ao.pair_id = mp.id
+JOIN markets ma ON mp.market_a_id = ma.id
+JOIN markets mb ON mp.market_b_id = mb.id
+LEFT JOIN venues va ON ma.venue_id = va.id
+LEFT JOIN venues vb ON mb.venue_id = vb.id
+WHERE ao.status = 'active'
+  AND (ma.venue_id = $1 OR mb.venue_id = $1)
+  AND ao.net_spread_pct <> ROUND(ao.gross_spread_pct - (COALESCE(va.fee_bps, 0) + COALESCE(vb.fee_bps, 0)) / 100.0, 4)
+"""
+
+
+async def timed_change(recomputer, conn, venue_id, fee_bps):
+    await conn.execute("UPDATE venues SET fee_bps = $2 WHERE id = $1", venue_id, fee_bps)
+    result = await recomputer.recompute(str(venue_id))
+    if result is None:
+        raise SystemExit("Another process holds the recompute lock for this venue; try again")
+    mismatched = await conn.fetchval(MISMATCH_QUERY, venue_id)
+    rate = result['updated'] / result['seconds'] if result['seconds'] else 0
+    print(f"  fee_bps -> {fee_bps}: {result['updated']:,} of {result['affected']:,} rows in "
+          f"{result['seconds']:.2f} s ({result['batches']} batches, {rate:,.0f} rows/s), {mismatched} stale")
+    return mismatched
+
+
+async def run(args):
+    database_url = args.database_url or os.getenv("BENCH_DATABASE_URL")
+    if not database_url:
+        raise SystemExit("Set --database-url or BENCH_DATABASE_URL to a local benchmark database")
+
+    conn = await asyncpg.connect(database_url)
+    try:
+        venue = await conn.fetchrow(BUSIEST_VENUE_QUERY, f"{VENUE_PREFIX}%")
+        if venue is None:
+            raise SystemExit("No synthetic venue with active opportunities; run benchmarks.synthetic_data first")
+        print(f"{venue['name']}: {venue['active']:,} active opportunities, fee_bps {venue['fee_bps']}")
+
+        recomputer = FeeRecomputer(batch_size=args.batch_size)
+        recomputer.conn = conn
+        original = venue['fee_bps'] or 0
+        stale = await timed_change(recomputer, conn, venue['id'], original + args.fee_step)
+        stale += await timed_change(recomputer, conn, venue['id'], original)
+        if stale:
+            raise SystemExit(f"{stale} opportunities left with a stale net spread")
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the venue fee recompute over synthetic data")
+    parser.add_argument("--database-url", help="Target database (default: BENCH_DATABASE_URL)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--fee-step", type=int, default=25, help="Basis points added to the venue's fee")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Price history ring buffer benchmark
+
+Run from the backend directory:
+    python -m benchmarks.bench_price_history --markets 1000 --ticks 1000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.price_history import PriceHistoryStore, TICK_BYTES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the in-memory price tick store")
+    parser.add_argument("--markets", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=1000, help="Ticks per market")
+    parser.add_argument("--lookups", type=int, default=10000)
+    args = parser.parse_args()
+
+    store = PriceHistoryStore(window_hours=24.0, capacity_per_market=args.ticks)
+    now_ms = int(time.time() * 1000)
+    step_ms = int(24 * 3600 * 1000 / args.ticks)
+    ts = now_ms - step_ms * np.arange(args.ticks, 0, -1, dtype=np.int64)
+    rng = np.random.default_rng(42)
+
+    start = time.perf_counter()
+    for m in range(args.markets):
+        yes = rng.uniform(0.01, 0.99, args.ticks).astype(np.float32)
+        store._ring(f"market-{m}").extend(ts, yes, (1 - yes).astype(np.float32))
+    load_s = time.perf_counter() - start
+
+    total = store.tick_count
+    print(f"Ticks held:            {total:,}")
+    print(f"Buffer memory:         {store.nbytes / 1e6:.1f} MB")
+    print(f"Memory per 1M ticks:   {store.nbytes / total:.1f} MB (expected {TICK_BYTES} MB)")
+    print(f"Bulk load rate:        {total / load_s:,.0f} ticks/s")
+
+    ids = rng.integers(0, args.markets, args.lookups)
+    latencies = np.empty(args.lookups)
+    for i, m in enumerate(ids):
+        t0 = time.perf_counter()
+        store.path(f"market-{m}", hours=6)
+        latencies[i] = time.perf_counter() - t0
+    p50, p99 = np.percentile(latencies * 1e6, [50, 99])
+    print(f"6h path lookup:        p50 {p50:.1f} us, p99 {p99:.1f} us")
+
+    start = time.perf_counter()
+    appends = 100000
+    for i in range(appends):
+        store._ring(f"market-{i % args.markets}").append(now_ms + 1 + i, 0.5, 0.5)
+    print(f"Single tick appends:   {appends / (time.perf_counter() - start):,.0f} ticks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Replay backtest detector benchmark
+
+Feeds synthetic ticks through ReplayDetector the same way replay_backtest
+does with database chunks. Run from the backend directory:
+    python -m benchmarks.bench_replay --markets 2000 --days 30 --tick-minutes 5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.backtest import ReplayDetector, compute_backtest_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark re-detection over price history")
+    parser.add_argument("--markets", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--tick-minutes", type=float, default=5.0, help="Average minutes between ticks per market")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    pairs = [
+        {"id": f"pair-{i}", "market_a_id": f"m-{2 * i}", "market_b_id": f"m-{2 * i + 1}",
+         "venue_a_fee": 200, "venue_b_fee": 100}
+        for i in range(args.markets // 2)
+    ]
+    detector = ReplayDetector(pairs, min_spread_pct=1.0, min_liquidity_usd=500.0)
+
+    span_ms = args.days * 86400 * 1000
+    total_ticks = int(args.markets * args.days * 1440 / args.tick_minutes)
+    print(f"Generating {total_ticks:,} ticks for {args.markets} markets over {args.days} days...")
+    ts_ms = np.sort(rng.integers(0, span_ms, total_ticks))
+    market_idx = rng.integers(0, args.markets, total_ticks)
+    yes = np.clip(rng.normal(0.5, 0.08, total_ticks), 0.01, 0.99)
+    values = np.column_stack((
+        yes, 1 - yes + rng.normal(0, 0.01, total_ticks),
+        rng.uniform(100, 50000, total_ticks), rng.uniform(100, 50000, total_ticks)
+    ))
+
+    start = time.perf_counter()
+    for lo in range(0, total_ticks, args.chunk_size):
+        hi = lo + args.chunk_size
+        detector.feed(market_idx[lo:hi], ts_ms[lo:hi], values[lo:hi])
+    detector.finish()
+    found = detector.opportunities()
+    days = found['ts_ms'].astype('datetime64[ms]').astype('datetime64[D]')
+    metrics = compute_backtest_metrics(found['net_spread_pct'], found['expected_profit_usd'], days)
+    elapsed = time.perf_counter() - start
+
+    print(f"Replay time:           {elapsed:.1f} s")
+    print(f"Throughput:            {total_ticks / elapsed:,.0f} ticks/s")
+    print(f"Opportunities found:   {metrics['total_opportunities']:,}")
+    print(f"Sharpe / max DD:       {metrics['sharpe_ratio']} / {metrics['max_drawdown_pct']}%")
+
+
+if __name__ == "__main__":
+    main()
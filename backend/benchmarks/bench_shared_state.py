@@ -0,0 +1,67 @@
+"""Shared cache benchmark with simulated workers
+
+Run from the backend directory:
+    python -m benchmarks.bench_shared_state --workers 4 --requests 50000 --keys 50
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from utils.shared_state import SharedState, InMemoryBackend
+
+
+async def run(args):
+    backend = InMemoryBackend()
+    workers = []
+    for _ in range(args.workers):
+        worker = SharedState(local_ttl=args.local_ttl)
+        worker.use_backend(backend)
+        workers.append(worker)
+
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(args.load_ms / 1000)
+        return {"rows": list(range(20))}
+
+    rng = np.random.default_rng(args.seed)
+    picks = rng.integers(0, args.keys, args.requests)
+    owners = rng.integers(0, args.workers, args.requests)
+
+    start = time.perf_counter()
+    for offset in range(0, args.requests, args.concurrency):
+        await asyncio.gather(*(
+            workers[owner].get_or_load(f"key:{key}", loader, ttl=args.ttl)
+            for key, owner in zip(picks[offset:offset + args.concurrency], owners[offset:offset + args.concurrency])
+        ))
+    elapsed = time.perf_counter() - start
+
+    local_hits = sum(w.stats["local_hits"] for w in workers)
+    shared_hits = sum(w.stats["shared_hits"] for w in workers)
+    print(f"Requests:              {args.requests:,} over {args.workers} workers, {args.keys} keys")
+    print(f"Loader calls:          {loads} (one per key with single-flight)")
+    print(f"Local tier hits:       {local_hits:,}")
+    print(f"Shared tier hits:      {shared_hits:,}")
+    print(f"Per request:           {elapsed / args.requests * 1e6:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the two-tier shared cache")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--keys", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--ttl", type=float, default=60.0)
+    parser.add_argument("--local-ttl", type=float, default=2.0)
+    parser.add_argument("--load-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Capital-constrained execution simulator benchmark
+
+Run from the backend directory:
+    python -m benchmarks.bench_simulator --events 2000000 --pairs 5000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.simulator import simulate_execution
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the execution simulator")
+    parser.add_argument("--events", type=int, default=2000000)
+    parser.add_argument("--pairs", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--capital", type=float, default=1000000.0)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    entry = np.sort(rng.uniform(0, args.days * 86400, args.events))
+    release = entry + rng.exponential(3 * 86400, args.events)
+    pair = rng.integers(0, args.pairs, args.events)
+    size = rng.lognormal(8, 1, args.events)
+    spread = rng.normal(1.5, 1.0, args.events)
+
+    start = time.perf_counter()
+    result = simulate_execution(entry, release, pair, size, spread, initial_capital_usd=args.capital)
+    elapsed = time.perf_counter() - start
+
+    print(f"Events:                {args.events:,}")
+    print(f"Simulation time:       {elapsed:.2f} s")
+    print(f"Throughput:            {args.events / elapsed * 60 / 1e6:.1f} M events/min")
+    for key, value in result.items():
+        print(f"  {key:<28} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Load generator for the API with mixed traffic profiles
+
+Drives main.app in-process over ASGI (default) or a running server with
+--url, using --concurrency virtual users for --duration seconds. Each user
+picks requests by the profile's weights. Reports throughput, latency
+percentiles and histograms, error rates and event-loop lag per request
+kind. Runs can be saved with --output and compared with --compare.
+
+Run from the backend directory:
+    python -m benchmarks.load_test --profile mixed --concurrency 50 --duration 30 --output before.json
+    python -m benchmarks.load_test --url http://localhost:8000 --profile dashboard --concurrency 200
+    python -m benchmarks.load_test --compare before.json after.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+LOAD_TEST_BACKTEST_NAME = "load-test"
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf")]
+
+# Request kind -> weight, per profile
+PROFILES = {
+    "dashboard": {"opportunities": 6, "stats": 2, "venues": 1, "markets": 1},
+    "detail": {"opportunity_detail": 4, "opportunities_batch": 1},
+    "backtest": {"backtest_submit": 1},
+    "health": {"health": 1},
+    "mixed": {
+        "opportunities": 40, "stats": 10, "venues": 5, "markets": 5,
+        "opportunity_detail": 20, "opportunities_batch": 5, "backtest_submit": 1, "health": 14,
+    },
+}
+
+
+class RunStats:
+    """Per-kind latencies and errors, plus event-loop lag samples"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.status_codes = {}
+        self.loop_lag = []
+
+    def record(self, kind, elapsed, status):
+        self.latencies.setdefault(kind, []).append(elapsed)
+        codes = self.status_codes.setdefault(kind, {})
+        codes[str(status)] = codes.get(str(status), 0) + 1
+        if status == "error" or int(status) >= 500:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def summary(self, duration):
+        kinds = {}
+        for kind, samples in sorted(self.latencies.items()):
+            kinds[kind] = summarize(np.array(samples), self.errors.get(kind, 0), duration)
+            kinds[kind]["status_codes"] = self.status_codes[kind]
+        total = np.concatenate([np.array(s) for s in self.latencies.values()]) if self.latencies else np.array([0.0])
+        lag = np.array(self.loop_lag or [0.0]) * 1000
+        return {
+            "duration_s": round(duration, 2),
+            "total": summarize(total, sum(self.errors.values()), duration),
+            "kinds": kinds,
+            "loop_lag_ms": {
+                "p50": round(float(np.percentile(lag, 50)), 2),
+                "p99": round(float(np.percentile(lag, 99)), 2),
+                "max": round(float(lag.max()), 2),
+            },
+        }
+
+
+def summarize(samples, errors, duration):
+    ms = samples * 1000
+    counts, _ = np.histogram(ms, bins=[0] + HISTOGRAM_BUCKETS_MS)
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "requests": int(len(samples)),
+        "throughput_rps": round(len(samples) / duration, 1),
+        "error_rate": round(errors / max(len(samples), 1), 4),
+        "p50_ms": round(float(p50), 2),
+        "p90_ms": round(float(p90), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(ms.max()), 2),
+        "histogram": [int(c) for c in counts],
+    }
+
+
+async def monitor_loop_lag(stats, interval, stop):
+    """Sample how late the event loop wakes a sleeper; in-process this is the API's loop"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        stats.loop_lag.append(max(0.0, loop.time() - expected))
+
+
+def build_request(kind, rng, context):
+    """(method, path, params, json body) for one request of a kind"""
+    ids = context["ids"]
+    if kind == "opportunities":
+        params = {"limit": int(rng.choice([20, 50, 100]))}
+        if rng.random() < 0.3:
+            params["min_spread"] = float(rng.choice([0.5, 1.0, 2.0]))
+        return "GET", "/api/v1/opportunities", params, None
+    if kind == "stats":
+        return "GET", "/api/v1/stats", None, None
+    if kind == "venues":
+        return "GET", "/api/v1/venues", None, None
+    if kind == "markets":
+        return "GET", "/api/v1/markets", {"limit": 100}, None
+    if kind == "opportunity_detail":
+        return "GET", f"/api/v1/opportunities/{ids[rng.integers(len(ids))]}", None, None
+    if kind == "opportunities_batch":
+        picked = rng.choice(ids, min(len(ids), 50), replace=False)
+        return "POST", "/api/v1/opportunities/batch", None, {"ids": [str(i) for i in picked]}
+    if kind == "backtest_submit":
+        end = date.today() - timedelta(days=int(rng.integers(0, 30)))
+        return "POST", "/api/v1/backtests", None, {
+            "name": LOAD_TEST_BACKTEST_NAME, "user_id": context["user_id"],
+            "start_date": (end - timedelta(days=30)).isoformat(), "end_date": end.isoformat(),
+        }
+    return "GET", "/health", None, None
+
+
+async def user(client, kinds, weights, rng, context, stats, deadline, think_time):
+    while time.perf_counter() < deadline:
+        kind = kinds[rng.choice(len(kinds), p=weights)]
+        method, path, params, body = build_request(kind, rng, context)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, params=params, json=body)
+            status = response.status_code
+        except Exception:
+            status = "error"
+        stats.record(kind, time.perf_counter() - start, status)
+        if think_time:
+            await asyncio.sleep(rng.exponential(think_time))
+
+
+async def discover(client, args):
+    """Opportunity ids for detail lookups, read through the API itself"""
+    response = await client.get("/api/v1/opportunities", params={"limit": 500, "fields": "id", "status": "expired"})
+    ids = [row["id"] for row in response.json().get("opportunities", [])] if response.status_code == 200 else []
+    return {"ids": ids, "user_id": args.user_id}
+
+
+async def run_load(args):
+    import httpx
+
+    weights_by_kind = dict(PROFILES[args.profile])
+    if not args.user_id:
+        weights_by_kind.pop("backtest_submit", None)
+
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        import main as api
+        transport, base_url = httpx.ASGITransport(app=api.app), "http://load-test"
+        await api.app.router.startup()
+        while not api.startup_warmup.ready and api.startup_warmup.error is None:
+            await asyncio.sleep(0.1)
+
+    stats = RunStats()
+    stop = asyncio.Event()
+    devnull = open(os.devnull, "w")
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout,
+                                     limits=limits) as client:
+            with contextlib.redirect_stdout(devnull):
+                context = await discover(client, args)
+            if not context["ids"]:
+                weights_by_kind.pop("opportunity_detail", None)
+                weights_by_kind.pop("opportunities_batch", None)
+            if not weights_by_kind:
+                raise SystemExit(f"Profile {args.profile} has no runnable requests (need opportunities or --user-id)")
+            kinds = list(weights_by_kind)
+            weights = np.array([weights_by_kind[k] for k in kinds], dtype=float)
+            weights /= weights.sum()
+
+            rng = np.random.default_rng(args.seed)
+            seeds = rng.integers(0, 2**32, args.concurrency)
+            monitor = asyncio.create_task(monitor_loop_lag(stats, args.lag_interval, stop))
+            started = time.perf_counter()
+            deadline = started + args.duration
+            # The API logs every request and connection; keep the report readable
+            with contextlib.redirect_stdout(devnull):
+                await asyncio.gather(*(
+                    user(client, kinds, weights, np.random.default_rng(seed), context, stats, deadline,
+                         args.think_time)
+                    for seed in seeds
+                ))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await monitor
+    finally:
+        devnull.close()
+        if not args.url:
+            await api.app.router.shutdown()
+
+    summary = stats.summary(elapsed)
+    summary["config"] = {
+        "profile": args.profile, "concurrency": args.concurrency, "duration": args.duration,
+        "target": args.url or "asgi", "think_time": args.think_time, "seed": args.seed,
+    }
+    return summary
+
+
+def histogram_lines(histogram, width=40):
+    peak = max(histogram) or 1
+    lower = 0
+    for upper, count in zip(HISTOGRAM_BUCKETS_MS, histogram):
+        label = f"{lower:g}-{upper:g} ms" if upper != float("inf") else f">{lower:g} ms"
+        yield f"    {label:<14}{count:>9,} {'#' * round(count / peak * width)}"
+        lower = upper
+
+
+def print_summary(summary):
+    config = summary["config"]
+    total = summary["total"]
+    print(f"Profile:               {config['profile']} @ {config['concurrency']} users against {config['target']}")
+    print(f"Requests:              {total['requests']:,} in {summary['duration_s']} s "
+          f"({total['throughput_rps']:,.1f} req/s, {total['error_rate']:.2%} errors)")
+    print(f"Latency:               p50 {total['p50_ms']} ms, p90 {total['p90_ms']} ms, p99 {total['p99_ms']} ms")
+    lag = summary["loop_lag_ms"]
+    print(f"Event-loop lag:        p50 {lag['p50']} ms, p99 {lag['p99']} ms, max {lag['max']} ms")
+    print()
+    print(f"{'kind':<22}{'req/s':>9}{'errors':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for kind, result in summary["kinds"].items():
+        print(f"{kind:<22}{result['throughput_rps']:>9.1f}{result['error_rate']:>9.2%}"
+              f"{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+    print()
+    print("Latency histogram (all requests):")
+    for line in histogram_lines(total["histogram"]):
+        print(line)
+
+
+def change(before, after):
+    if not before:
+        return "    n/a"
+    return f"{(after - before) / before:>+7.1%}"
+
+
+def print_comparison(before, after):
+    """Side-by-side throughput, error and latency changes between two saved runs"""
+    print(f"{'kind':<22}{'metric':<16}{'before':>12}{'after':>12}{'change':>10}")
+    rows = [("total", before["total"], after["total"])] + [
+        (kind, before["kinds"][kind], after["kinds"][kind])
+        for kind in before["kinds"] if kind in after["kinds"]
+    ]
+    for kind, old, new in rows:
+        for metric in ("throughput_rps", "error_rate", "p50_ms", "p90_ms", "p99_ms"):
+            print(f"{kind:<22}{metric:<16}{old[metric]:>12,.2f}{new[metric]:>12,.2f}"
+                  f"{change(old[metric], new[metric]):>10}")
+    old_lag, new_lag = before["loop_lag_ms"], after["loop_lag_ms"]
+    print(f"{'event loop':<22}{'lag_p99_ms':<16}{old_lag['p99']:>12,.2f}{new_lag['p99']:>12,.2f}"
+          f"{change(old_lag['p99'], new_lag['p99']):>10}")
+    if before["config"] != after["config"]:
+        print(f"⚠️ Runs used different settings: {before['config']} vs {after['config']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate mixed API load and report latency and throughput")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean seconds between a user's requests")
+    parser.add_argument("--url", help="Target a running server instead of main.app in-process")
+    parser.add_argument("--user-id", help="user_profiles id for backtest submissions (skipped when unset)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--lag-interval", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Save the run summary as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two saved runs")
+    args = parser.parse_args()
+
+    if args.compare:
+        runs = []
+        for path in args.compare:
+            with open(path) as f:
+                runs.append(json.load(f))
+        print_comparison(*runs)
+        return
+
+    summary = asyncio.run(run_load(args))
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
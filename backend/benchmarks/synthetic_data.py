@@ -0,0 +1,254 @@
+"""Seeded synthetic data for benchmarking against a local Postgres
+
+Fills venues, markets, market_pairs and arbitrage_opportunities with
+realistic volumes. Venue and category popularity follow a Zipf law, as do
+the pairs opportunities are found on, so joins and filters see the same
+skew as production. The same seed and --end always produce the same rows.
+
+Rows are tagged (venue names start with "Synthetic Venue", market
+external ids with "synth-") and --reset deletes only tagged rows. Triggers
+are disabled during the load, so restart the API afterwards.
+
+Run from the backend directory:
+    python -m benchmarks.synthetic_data --opportunities 1000000 --days 90 --seed 42
+"""
+import argparse
+import asyncio
+import io
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+import asyncpg
+import numpy as np
+import pandas as pd
+
+VENUE_PREFIX = "Synthetic Venue"
+MARKET_PREFIX = "synth-"
+
+CATEGORIES = [
+    "politics", "sports", "crypto", "economics", "entertainment",
+    "science", "weather", "technology", "finance", "culture",
+]
+
+VENUE_TYPES = ["prediction_market", "sports_betting", "crypto_exchange"]
+VENUE_TYPE_WEIGHTS = [0.6, 0.25, 0.15]
+
+# Status of opportunities that are no longer live
+CLOSED_STATUSES = ["expired", "executed", "insufficient_liquidity"]
+CLOSED_STATUS_WEIGHTS = [0.85, 0.1, 0.05]
+
+OPPORTUNITY_COLUMNS = [
+    "id", "pair_id", "gross_spread_pct", "net_spread_pct", "expected_profit_pct", "expected_profit_usd",
+    "max_tradable_amount", "venue_a_side", "venue_b_side", "venue_a_price", "venue_b_price",
+    "venue_a_liquidity", "venue_b_liquidity", "risk_level", "status", "expires_at", "created_at", "updated_at",
+]
+
+
+def zipf_weights(n, skew):
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+def seeded_uuids(rng, n):
+    """Version 4 UUID strings drawn from the generator, so ids are reproducible"""
+    raw = np.frombuffer(rng.bytes(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    return [str(uuid.UUID(bytes=row.tobytes())) for row in raw]
+
+
+def generate_venues(rng, count):
+    fees = rng.choice([0, 50, 100, 150, 200], count)
+    return pd.DataFrame({
+        "id": seeded_uuids(rng, count),
+        "name": [f"{VENUE_PREFIX} {i + 1:02d}" for i in range(count)],
+        "venue_type": rng.choice(VENUE_TYPES, count, p=VENUE_TYPE_WEIGHTS),
+        "fee_bps": fees,
+        "supports_websocket": rng.random(count) < 0.7,
+        "status": np.where(rng.random(count) < 0.9, "active", "paused"),
+    })
+
+
+def generate_markets(rng, venues, count, skew, end):
+    venue_index = rng.choice(len(venues), count, p=zipf_weights(len(venues), skew))
+    category_index = rng.choice(len(CATEGORIES), count, p=zipf_weights(len(CATEGORIES), skew))
+    resolution = (pd.Timestamp(end) + pd.to_timedelta(rng.uniform(-30, 180, count), unit="D")).floor("us")
+    yes_price = rng.uniform(0.02, 0.98, count).round(4)
+    categories = np.array(CATEGORIES)[category_index]
+    return pd.DataFrame({
+        "id": seeded_uuids(rng, count),
+        "venue_id": venues["id"].to_numpy()[venue_index],
+        "external_id": [f"{MARKET_PREFIX}{i:07d}" for i in range(count)],
+        "title": [f"Synthetic {category} market {i}" for i, category in enumerate(categories)],
+        "category": categories,
+        "resolution_date": resolution,
+        "yes_price": yes_price,
+        "no_price": (1 - yes_price + rng.normal(0, 0.01, count)).clip(0.01, 0.99).round(4),
+        "yes_liquidity": rng.lognormal(8, 1.5, count).round(2),
+        "no_liquidity": rng.lognormal(8, 1.5, count).round(2),
+        "volume_24h": rng.lognormal(9, 2, count).round(2),
+        "status": np.where(resolution > pd.Timestamp(end), "active", "settled"),
+    })
+
+
+def generate_pairs(rng, markets, count):
+    """Pairs of same-category markets on different venues"""
+    by_category = {
+        category: group.index.to_numpy()
+        for category, group in markets.groupby("category") if len(group) > 1
+    }
+    categories = list(by_category)
+    weights = np.array([len(by_category[c]) for c in categories], dtype=float)
+    weights /= weights.sum()
+    venue_ids = markets["venue_id"].to_numpy()
+    seen = set()
+    rows_a, rows_b = [], []
+    attempts = 0
+    while len(rows_a) < count and attempts < count * 20:
+        attempts += 1
+        members = by_category[categories[rng.choice(len(categories), p=weights)]]
+        a, b = rng.choice(members, 2, replace=False)
+        if venue_ids[a] == venue_ids[b] or (a, b) in seen or (b, a) in seen:
+            continue
+        seen.add((a, b))
+        rows_a.append(a)
+        rows_b.append(b)
+    ids = markets["id"].to_numpy()
+    return pd.DataFrame({
+        "id": seeded_uuids(rng, len(rows_a)),
+        "market_a_id": ids[rows_a],
+        "market_b_id": ids[rows_b],
+        "confidence_score": rng.integers(60, 101, len(rows_a)),
+        "is_manual_override": rng.random(len(rows_a)) < 0.05,
+    })
+
+
+def generate_opportunities(rng, pairs, pair_fees, pair_weights, count, days, end):
+    """One chunk of opportunities; rows whose expiry is still ahead of `end` are active"""
+    pair_index = rng.choice(len(pairs), count, p=pair_weights)
+    created = (pd.Timestamp(end) - pd.to_timedelta(rng.uniform(0, days * 86400, count), unit="s")).floor("us")
+    expires = (created + pd.to_timedelta(rng.uniform(5, 120, count), unit="m")).floor("us")
+    # Recorded opportunities clear the fees of both venues
+    gross = (rng.exponential(2.0, count) + 0.1 + pair_fees[pair_index] / 100).clip(max=99).round(4)
+    net = (gross - pair_fees[pair_index] / 100).round(4)
+    amount = rng.lognormal(7, 1.2, count).round(2)
+    a_side_yes = rng.random(count) < 0.5
+    price_a = rng.uniform(0.05, 0.9, count).round(4)
+    live = expires > pd.Timestamp(end)
+    return pd.DataFrame({
+        "id": seeded_uuids(rng, count),
+        "pair_id": pairs["id"].to_numpy()[pair_index],
+        "gross_spread_pct": gross,
+        "net_spread_pct": net,
+        "expected_profit_pct": net,
+        "expected_profit_usd": (amount * net / 100).round(2),
+        "max_tradable_amount": amount,
+        "venue_a_side": np.where(a_side_yes, "yes", "no"),
+        "venue_b_side": np.where(a_side_yes, "no", "yes"),
+        "venue_a_price": price_a,
+        "venue_b_price": (1 - price_a - gross / 100).clip(0.01, 0.99).round(4),
+        "venue_a_liquidity": rng.lognormal(8, 1.5, count).round(2),
+        "venue_b_liquidity": rng.lognormal(8, 1.5, count).round(2),
+        "risk_level": np.where(gross > 5, "high", np.where(gross > 1.5, "medium", "low")),
+        "status": np.where(live, "active", rng.choice(CLOSED_STATUSES, count, p=CLOSED_STATUS_WEIGHTS)),
+        "expires_at": expires,
+        "created_at": created,
+        "updated_at": created,
+    })[OPPORTUNITY_COLUMNS]
+
+
+async def copy_frame(conn, table, frame):
+    """COPY a DataFrame in CSV form; Postgres parses enums, decimals and timestamps"""
+    buffer = io.BytesIO(frame.to_csv(index=False, header=False).encode())
+    await conn.copy_to_table(table, source=buffer, columns=list(frame.columns), format="csv")
+
+
+async def reset(conn):
+    # Markets, pairs and opportunities cascade from their venues
+    result = await conn.execute("DELETE FROM venues WHERE name LIKE $1", f"{VENUE_PREFIX}%")
+    print(f"Removed synthetic venues:   {result.split()[-1]}")
+
+
+async def run(args):
+    database_url = args.database_url or os.getenv("BENCH_DATABASE_URL")
+    if not database_url:
+        raise SystemExit("Set --database-url or BENCH_DATABASE_URL to a local benchmark database")
+    end = datetime.fromisoformat(args.end) if args.end else datetime.now(timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    rng = np.random.default_rng(args.seed)
+
+    conn = await asyncpg.connect(database_url, timeout=30.0,
+                                 server_settings={'application_name': 'arblens_synthetic_data'})
+    try:
+        if args.reset:
+            await reset(conn)
+
+        start = time.perf_counter()
+        venues = generate_venues(rng, args.venues)
+        markets = generate_markets(rng, venues, args.markets, args.skew, end)
+        pairs = generate_pairs(rng, markets, args.pairs)
+        fees = venues.set_index("id")["fee_bps"]
+        venue_of = markets.set_index("id")["venue_id"]
+        pair_fees = (
+            fees[venue_of[pairs["market_a_id"]].to_numpy()].to_numpy()
+            + fees[venue_of[pairs["market_b_id"]].to_numpy()].to_numpy()
+        )
+        # Hot pairs are spread at random rather than following insertion order
+        pair_weights = zipf_weights(len(pairs), args.pair_skew)[rng.permutation(len(pairs))]
+
+        async with conn.transaction():
+            # Skip row-level NOTIFY triggers; a million alert and expiry events
+            # would only flood listeners
+            await conn.execute("SET LOCAL session_replication_role = replica")
+            await copy_frame(conn, "venues", venues)
+            await copy_frame(conn, "markets", markets)
+            await copy_frame(conn, "market_pairs", pairs)
+            written = 0
+            while written < args.opportunities:
+                size = min(args.chunk, args.opportunities - written)
+                chunk = generate_opportunities(rng, pairs, pair_fees, pair_weights, size, args.days, end)
+                await copy_frame(conn, "arbitrage_opportunities", chunk)
+                written += size
+                print(f"  opportunities: {written:,}/{args.opportunities:,}", end="\r")
+        print()
+
+        for table in ("venues", "markets", "market_pairs", "arbitrage_opportunities"):
+            await conn.execute(f"ANALYZE {table}")
+        elapsed = time.perf_counter() - start
+        active = await conn.fetchval(
+            "SELECT COUNT(*) FROM arbitrage_opportunities WHERE status = 'active' AND pair_id = ANY($1::uuid[])",
+            list(pairs["id"])
+        )
+    finally:
+        await conn.close()
+
+    print(f"Venues:                     {len(venues):,}")
+    print(f"Markets:                    {len(markets):,}")
+    print(f"Market pairs:               {len(pairs):,}")
+    print(f"Opportunities:              {args.opportunities:,} over {args.days} days ({active:,} active)")
+    print(f"Loaded in:                  {elapsed:.1f} s ({args.opportunities / elapsed:,.0f} opportunities/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load seeded synthetic venues, markets, pairs and opportunities")
+    parser.add_argument("--database-url", help="Target database (default: BENCH_DATABASE_URL)")
+    parser.add_argument("--venues", type=int, default=12)
+    parser.add_argument("--markets", type=int, default=20000)
+    parser.add_argument("--pairs", type=int, default=5000)
+    parser.add_argument("--opportunities", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for venues and categories")
+    parser.add_argument("--pair-skew", type=float, default=0.8, help="Zipf exponent for opportunities per pair")
+    parser.add_argument("--end", help="ISO timestamp the data ends at (default: now)")
+    parser.add_argument("--chunk", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Delete previously generated rows first")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
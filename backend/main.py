@@ -1,12 +1,55 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, BackgroundTasks, Request
+import time
+# Measured for the cold-start report
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import asyncio
+import contextvars
+from contextlib import asynccontextmanager
 import os
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 import asyncpg
+from pydantic import ValidationError
 import json
+import base64
+import uuid
+import numpy as np
+
+from utils.dutch_book import dutch_book_detector
+from utils.expiry import expiry_scheduler
+from utils.fee_recompute import fee_recomputer
+from utils.price_history import price_history
+from utils.backtest import (
+    compute_recorded_backtest, store_backtest_metrics, parse_backtest_range,
+    get_backtest_executor, shutdown_backtest_executor, run_replay_backtest,
+    store_backtest_simulation, store_backtest_confidence_intervals
+)
+from utils.bootstrap import bootstrap_confidence_intervals_parallel
+from utils.alerts import alert_engine
+from utils.alert_delivery import alert_dispatcher
+from utils.shared_state import shared_state
+from utils.reference_data import reference_data
+from utils.http_cache import (
+    resource_versions, CACHEABLE_ROUTES, VERSIONS_WRITE_KEY, is_not_modified, validator_headers
+)
+from utils.compression import CompressionMiddleware
+from utils.exports import (
+    EXPORT_MEDIA_TYPES, export_range, iter_opportunity_chunks, ndjson_chunk, csv_chunk
+)
+from utils.projection import parse_fields, OpportunityProjection
+from models.schemas import OpportunityResponse, OpportunityDetailResponse, OpportunityBatchRequest, BacktestRequest
+from utils.api_keys import api_key_auth, extract_api_key, PUBLIC_PATHS
+from utils.profiling import ProfilingMiddleware, request_profiler, track_connection, PROFILE_TOKEN_HEADER
+from utils.database import db_manager
+from utils.startup import startup_warmup, asgi_request
+from utils.admission import AdmissionMiddleware, admission
+from utils.deadlines import DeadlineMiddleware, query_deadlines, current_deadline
+# utils.arrow_export (pyarrow) is imported by the Arrow routes on first use
+
+startup_warmup.import_seconds = time.perf_counter() - _import_started
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -53,8 +96,22 @@ app.add_middleware(
     max_age=86400,  # 24 hours
 )
 
+# Per-route deadlines and statement timeouts; queries are cancelled when the client goes away
+app.add_middleware(DeadlineMiddleware)
+
+# Per-route-class in-flight budgets, fail-fast 503s and stale fallbacks while the
+# database circuit breaker is open; inside compression so cached bodies are uncompressed
+app.add_middleware(AdmissionMiddleware)
+
+# Negotiated brotli/gzip for bodies over 1 KB
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# On-demand profiling of single requests (X-Profile-Token); a pass-through when PROFILING_TOKEN is unset
+app.add_middleware(ProfilingMiddleware)
+
 # Add explicit OPTIONS handler for problematic routes
 @app.options("/api/v1/opportunities")
+@app.options("/api/v1/opportunities/batch")
 @app.options("/api/v1/venues")
 @app.options("/api/v1/markets")
 @app.options("/api/v1/stats")
@@ -75,8 +132,17 @@ async def handle_options():
 # Enhanced database connection with better error logging
 DATABASE_URL = os.getenv("SUPABASE_DB_URL") or os.getenv("DATABASE_URL")
 
-async def get_db_connection():
-    """Get database connection with enhanced error handling"""
+# Seconds platform stats are served from the shared cache
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "10"))
+
+async def get_db_connection(dedicated: bool = False, readonly: bool = False, after: Optional[str] = None):
+    """Get a pooled database connection with enhanced error handling
+
+    close() returns a pooled connection to the pool. Long-running streams
+    pass dedicated=True to open their own connection instead of holding a
+    pool slot for minutes. readonly connections may come from a read
+    replica; after names a write (see db_manager.note_write) the read must see.
+    """
     if not DATABASE_URL:
         print("❌ No database URL found. Checking environment variables...")
         print(f"SUPABASE_DB_URL: {os.getenv('SUPABASE_DB_URL', 'NOT SET')}")
@@ -86,20 +152,36 @@ async def get_db_connection():
             detail="Database configuration missing. Please set SUPABASE_DB_URL environment variable."
         )
     
+    # Fail fast while the database is known to be down instead of stacking up connect attempts
+    if not admission.breaker.allow():
+        raise HTTPException(
+            status_code=503,
+            detail="Database temporarily unavailable",
+            headers={"Retry-After": str(int(admission.breaker.retry_after + 0.999))}
+        )
+
+    connected = False
     try:
         print(f"🔗 Attempting database connection...")
-        # Add connection timeout and better error handling
-        connection = await asyncpg.connect(
-            DATABASE_URL,
-            timeout=30.0,  # Increased timeout
-            server_settings={
-                'application_name': 'arblens_api'
-            }
-        )
-        
-        # Test the connection
-        test_result = await connection.fetchval("SELECT 1")
-        print(f"✅ Database connection successful. Test query result: {test_result}")
+        connect_started = time.perf_counter()
+        if dedicated:
+            connection = await asyncpg.connect(
+                db_manager.read_url(after) if readonly else DATABASE_URL,
+                timeout=db_manager.connect_timeout,
+                server_settings={
+                    'application_name': 'arblens_api'
+                }
+            )
+        else:
+            connection = await db_manager.acquire(
+                timeout=db_manager.connect_timeout, readonly=readonly, after=after
+            )
+        admission.breaker.record_success()
+        connected = True
+        track_connection(connection, time.perf_counter() - connect_started)
+        deadline = current_deadline()
+        if deadline is not None:
+            await deadline.attach(connection, None if dedicated else db_manager.statement_timeout)
         return connection
         
     except asyncpg.InvalidAuthorizationSpecificationError as e:
@@ -115,36 +197,58 @@ async def get_db_connection():
             detail=f"Database not found. Check your Supabase project URL and database name: {str(e)}"
         )
     except asyncpg.PostgresConnectionError as e:
+        admission.breaker.record_failure()
         print(f"❌ PostgreSQL connection error: {str(e)}")
         raise HTTPException(
             status_code=500, 
             detail=f"Cannot connect to Supabase database. Check network connectivity and Supabase status: {str(e)}"
         )
+    except (asyncio.TimeoutError, OSError, asyncpg.TooManyConnectionsError) as e:
+        admission.breaker.record_failure()
+        print(f"❌ Database connection timed out or was refused: {type(e).__name__}: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail="Database unavailable, retry shortly",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         print(f"❌ Unexpected database error: {str(e)}")
         raise HTTPException(
             status_code=500, 
             detail=f"Database connection failed: {str(e)}"
         )
+    finally:
+        if not connected:
+            admission.breaker.release_probe()
+
+@asynccontextmanager
+async def db_connection(**kwargs):
+    """get_db_connection whose connection is closed however the block exits"""
+    conn = await get_db_connection(**kwargs)
+    try:
+        yield conn
+    finally:
+        await conn.close()
 
 # Enhanced health check endpoint
 @app.get("/health")
 async def health_check():
     """Enhanced health check endpoint for deployment monitoring"""
     try:
-        conn = await get_db_connection()
-        
-        # Test database query
-        result = await conn.fetchval("SELECT COUNT(*) FROM arbitrage_opportunities WHERE status = 'active'")
-        await conn.close()
-        
+        # /health has no route deadline to reclaim a connection a failed query leaves behind
+        async with db_connection() as conn:
+            result = await conn.fetchval("SELECT COUNT(*) FROM arbitrage_opportunities WHERE status = 'active'")
+
         return {
             "status": "healthy",
             "timestamp": datetime.utcnow().isoformat(),
             "database": "connected",
             "active_opportunities": result or 0,
             "environment": os.getenv("ENVIRONMENT", "development"),
-            "cors_origins": len(origins)
+            "cors_origins": len(origins),
+            "admission": admission.snapshot(),
+            "queries": query_deadlines.snapshot(),
+            "database_nodes": db_manager.status()
         }
     except Exception as e:
         return JSONResponse(
@@ -154,7 +258,9 @@ async def health_check():
                 "error": str(e), 
                 "timestamp": datetime.utcnow().isoformat(),
                 "database": "disconnected",
-                "environment": os.getenv("ENVIRONMENT", "development")
+                "environment": os.getenv("ENVIRONMENT", "development"),
+                "admission": admission.snapshot(),
+                "queries": query_deadlines.snapshot()
             }
         )
 
@@ -181,72 +287,77 @@ async def get_arbitrage_opportunities(
     venues: Optional[str] = Query(None, description="Comma-separated venue names"),
     category: Optional[str] = Query(None, description="Market category filter"),
     limit: Optional[int] = Query(50, description="Maximum number of results", ge=1, le=1000),
-    status: Optional[str] = Query("active", description="Opportunity status")
+    status: Optional[str] = Query("active", description="Opportunity status"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all)")
 ):
     """Get current arbitrage opportunities with filtering and enhanced error handling"""
     try:
-        conn = await get_db_connection()
-        
-        # Build query with proper error handling
         try:
-            query = """
-            SELECT ao.*, 
-                   mp.confidence_score,
-                   ma.title as market_a_title, ma.category as market_a_category,
-                   mb.title as market_b_title, mb.category as market_b_category,
-                   va.name as venue_a_name, va.venue_type as venue_a_type,
-                   vb.name as venue_b_name, vb.venue_type as venue_b_type
-            FROM arbitrage_opportunities ao
-            JOIN market_pairs mp ON ao.pair_id = mp.id
-            JOIN markets ma ON mp.market_a_id = ma.id
-            JOIN markets mb ON mp.market_b_id = mb.id  
-            JOIN venues va ON ma.venue_id = va.id
-            JOIN venues vb ON mb.venue_id = vb.id
-            WHERE ao.status = $1
-            """
+            projection = OpportunityProjection(
+                parse_fields(fields, OpportunityResponse), filtering=bool(category or venues)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Build query with proper error handling
+        async with db_connection(readonly=True, after=VERSIONS_WRITE_KEY) as conn:
+            try:
+                await reference_data.ensure_loaded(conn)
+
+                # Market and venue details come from the reference cache after the fetch
+                query = f"""
+                SELECT {projection.select}
+                FROM arbitrage_opportunities ao
+                {projection.joins}
+                WHERE ao.status = $1
+                """
             
-            params = [status]
-            param_count = 1
+                params = [status]
+                param_count = 1
             
-            if min_spread is not None:
-                param_count += 1
-                query += f" AND ao.net_spread_pct >= ${param_count}"
-                params.append(min_spread)
+                if min_spread is not None:
+                    param_count += 1
+                    query += f" AND ao.net_spread_pct >= ${param_count}"
+                    params.append(min_spread)
                 
-            if min_liquidity is not None:
-                param_count += 1
-                query += f" AND ao.max_tradable_amount >= ${param_count}"
-                params.append(min_liquidity)
+                if min_liquidity is not None:
+                    param_count += 1
+                    query += f" AND ao.max_tradable_amount >= ${param_count}"
+                    params.append(min_liquidity)
                 
-            if category:
-                param_count += 1
-                query += f" AND (ma.category = ${param_count} OR mb.category = ${param_count})"
-                params.append(category)
+                # Filters stay semi-joins in SQL: two primary-key probes per pair,
+                # and markets the reference cache has not seen yet still match
+                if category:
+                    param_count += 1
+                    query += f""" AND EXISTS (
+                        SELECT 1 FROM markets m
+                        WHERE m.id IN (mp.market_a_id, mp.market_b_id) AND m.category = ${param_count})"""
+                    params.append(category)
                 
-            if venues:
-                venue_list = [v.strip() for v in venues.split(',')]
-                param_count += 1
-                query += f" AND (va.name = ANY(${param_count}) OR vb.name = ANY(${param_count}))"
-                params.append(venue_list)
+                if venues:
+                    venue_list = [v.strip() for v in venues.split(',')]
+                    param_count += 1
+                    query += f""" AND EXISTS (
+                        SELECT 1 FROM markets m JOIN venues v ON m.venue_id = v.id
+                        WHERE m.id IN (mp.market_a_id, mp.market_b_id) AND v.name = ANY(${param_count}::text[]))"""
+                    params.append(venue_list)
             
-            query += f" ORDER BY ao.net_spread_pct DESC LIMIT ${param_count + 1}"
-            params.append(limit)
+                query += f" ORDER BY ao.net_spread_pct DESC LIMIT ${param_count + 1}"
+                params.append(limit)
             
-            rows = await conn.fetch(query, *params)
+                rows = await conn.fetch(query, *params)
+                await reference_data.fill_markets(conn, projection.market_ids(rows))
             
-        except asyncpg.PostgresError as e:
-            await conn.close()
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Database query failed: {str(e)}"
-            )
-        
-        await conn.close()
+            except asyncpg.PostgresError as e:
+                raise HTTPException(
+                    status_code=500, 
+                    detail=f"Database query failed: {str(e)}"
+                )
         
         # Convert to list of dicts
         opportunities = []
         for row in rows:
-            opp = dict(row)
+            opp = projection.shape(dict(row))
             # Convert decimal to float for JSON serialization
             for key, value in opp.items():
                 if hasattr(value, '__float__'):
@@ -265,7 +376,8 @@ async def get_arbitrage_opportunities(
                 "venues": venues,
                 "category": category,
                 "status": status,
-                "limit": limit
+                "limit": limit,
+                "fields": fields
             },
             "timestamp": datetime.utcnow().isoformat()
         }
@@ -279,6 +391,181 @@ async def get_arbitrage_opportunities(
             detail=f"Unexpected error retrieving opportunities: {str(e)}"
         )
 
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque keyset cursor for the client to send back"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("malformed cursor")
+    if not (isinstance(values, list) and len(values) == 2 and isinstance(values[0], (int, float))
+            and isinstance(values[1], str) and is_uuid(values[1])):
+        raise ValueError("malformed cursor")
+    return [float(values[0]), values[1]]
+
+def is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+async def fetch_opportunity_details(conn, projection: OpportunityProjection,
+                                    opportunity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Resolve opportunities by id in one query, keyed by id"""
+    await reference_data.ensure_loaded(conn)
+    rows = await conn.fetch(
+        f"""
+        SELECT {projection.select}, ao.id as lookup_id
+        FROM arbitrage_opportunities ao
+        {projection.joins}
+        WHERE ao.id = ANY($1::uuid[])
+        """,
+        opportunity_ids
+    )
+    await reference_data.fill_markets(conn, projection.market_ids(rows))
+
+    details = {}
+    for row in rows:
+        opportunity = dict(row)
+        lookup_id = str(opportunity.pop('lookup_id'))
+        opportunity = projection.shape(opportunity)
+        for key, value in opportunity.items():
+            if hasattr(value, '__float__'):
+                opportunity[key] = float(value)
+            elif isinstance(value, datetime):
+                opportunity[key] = value.isoformat()
+        details[lookup_id] = opportunity
+    return details
+
+@app.post("/api/v1/opportunities/batch")
+async def get_opportunity_details_batch(request: Request, batch: OpportunityBatchRequest):
+    """Resolve many opportunities with nested leg details in one round trip"""
+    try:
+        try:
+            projection = OpportunityProjection(parse_fields(batch.fields, OpportunityDetailResponse), detail=True)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        invalid = [opportunity_id for opportunity_id in batch.ids if not is_uuid(opportunity_id)]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid opportunity ids: {', '.join(invalid[:10])}")
+        ids = list(dict.fromkeys(str(uuid.UUID(opportunity_id)) for opportunity_id in batch.ids))
+
+        async with db_connection(readonly=True) as conn:
+            details = await fetch_opportunity_details(conn, projection, ids)
+
+        return {
+            "opportunities": [details[opportunity_id] for opportunity_id in ids if opportunity_id in details],
+            "missing": [opportunity_id for opportunity_id in ids if opportunity_id not in details],
+            "total": len(details)
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch opportunities: {str(e)}")
+
+@app.get("/api/v1/opportunities/multi-leg")
+async def get_multi_leg_opportunities(
+    request: Request,
+    kind: Optional[str] = Query(None, description="binary, yes_cover or no_cover"),
+    min_spread: Optional[float] = Query(None, description="Minimum net spread percentage", ge=0),
+    limit: Optional[int] = Query(50, description="Maximum number of results", ge=1, le=1000),
+    status: Optional[str] = Query("active", description="Opportunity status")
+):
+    """Get Dutch-book opportunities spanning three or more venues or a whole outcome group, with their legs"""
+    try:
+        if kind is not None and kind not in ("binary", "yes_cover", "no_cover"):
+            raise HTTPException(status_code=400, detail="kind must be binary, yes_cover or no_cover")
+
+        async with db_connection(readonly=True) as conn:
+            rows = await conn.fetch(
+                """
+                SELECT mlo.*, og.name as group_name
+                FROM multi_leg_opportunities mlo
+                LEFT JOIN outcome_groups og ON mlo.group_id = og.id
+                WHERE mlo.status = $1
+                  AND ($2::text IS NULL OR mlo.kind = $2)
+                  AND ($3::numeric IS NULL OR mlo.net_spread_pct >= $3)
+                ORDER BY mlo.net_spread_pct DESC
+                LIMIT $4
+                """,
+                status, kind, min_spread, limit
+            )
+            legs = await conn.fetch(
+                """
+                SELECT l.*, m.title as market_title, v.name as venue_name
+                FROM multi_leg_opportunity_legs l
+                JOIN markets m ON l.market_id = m.id
+                LEFT JOIN venues v ON l.venue_id = v.id
+                WHERE l.opportunity_id = ANY($1::uuid[])
+                ORDER BY l.opportunity_id, l.leg_index
+                """,
+                [row['id'] for row in rows]
+            )
+
+        def to_json(row):
+            item = dict(row)
+            for key, value in item.items():
+                if isinstance(value, uuid.UUID):
+                    item[key] = str(value)
+                elif hasattr(value, '__float__') and not isinstance(value, int):
+                    item[key] = float(value)
+                elif isinstance(value, datetime):
+                    item[key] = value.isoformat()
+            return item
+
+        legs_by_opportunity = {}
+        for leg in legs:
+            leg = to_json(leg)
+            legs_by_opportunity.setdefault(leg.pop('opportunity_id'), []).append(leg)
+        opportunities = []
+        for row in rows:
+            opportunity = to_json(row)
+            opportunity['legs'] = legs_by_opportunity.get(opportunity['id'], [])
+            opportunities.append(opportunity)
+
+        return {
+            "opportunities": opportunities,
+            "total": len(opportunities),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch multi-leg opportunities: {str(e)}")
+
+@app.get("/api/v1/opportunities/{opportunity_id}")
+async def get_opportunity_detail(
+    request: Request,
+    opportunity_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all)")
+):
+    """Get one opportunity with each leg's market and venue as nested objects"""
+    try:
+        try:
+            projection = OpportunityProjection(parse_fields(fields, OpportunityDetailResponse), detail=True)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not is_uuid(opportunity_id):
+            raise HTTPException(status_code=404, detail="Opportunity not found")
+        opportunity_id = str(uuid.UUID(opportunity_id))
+
+        async with db_connection(readonly=True) as conn:
+            details = await fetch_opportunity_details(conn, projection, [opportunity_id])
+
+        if opportunity_id not in details:
+            raise HTTPException(status_code=404, detail="Opportunity not found")
+        return details[opportunity_id]
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch opportunity: {str(e)}")
+
 # Enhanced Venue Endpoints with better validation
 @app.get("/api/v1/venues")
 async def get_venues(
@@ -288,36 +575,11 @@ async def get_venues(
 ):
     """Get list of trading venues"""
     try:
-        conn = await get_db_connection()
-        
-        query = "SELECT * FROM venues WHERE 1=1"
-        params = []
-        param_count = 0
-        
-        if status:
-            param_count += 1
-            query += f" AND status = ${param_count}"
-            params.append(status)
-            
-        if venue_type:
-            param_count += 1
-            query += f" AND venue_type = ${param_count}"
-            params.append(venue_type)
-            
-        query += " ORDER BY name"
-        
-        rows = await conn.fetch(query, *params)
-        await conn.close()
-        
-        venues = []
-        for row in rows:
-            venue = dict(row)
-            for key, value in venue.items():
-                if hasattr(value, '__float__'):
-                    venue[key] = float(value)
-                elif isinstance(value, datetime):
-                    venue[key] = value.isoformat()
-            venues.append(venue)
+        if reference_data.stale:
+            async with db_connection(readonly=True, after=VERSIONS_WRITE_KEY) as conn:
+                await reference_data.ensure_loaded(conn)
+
+        venues = reference_data.list_venues(status=status, venue_type=venue_type)
         
         return {
             "venues": venues, 
@@ -325,6 +587,8 @@ async def get_venues(
             "timestamp": datetime.utcnow().isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch venues: {str(e)}")
 
@@ -335,21 +599,42 @@ async def get_markets(
     venue_id: Optional[str] = Query(None, description="Filter by venue ID"),
     category: Optional[str] = Query(None, description="Filter by category"),
     status: Optional[str] = Query("active", description="Market status filter"),
-    limit: Optional[int] = Query(100, description="Maximum number of results", ge=1, le=1000)
+    limit: Optional[int] = Query(100, description="Maximum number of results", ge=1, le=1000),
+    q: Optional[str] = Query(None, description="Search titles and descriptions, ranked by similarity", min_length=3, max_length=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous search page")
 ):
-    """Get list of markets"""
+    """Get list of markets, or search them with q"""
     try:
-        conn = await get_db_connection()
-        
+        after = None
+        if cursor:
+            if not q:
+                raise HTTPException(status_code=400, detail="cursor requires q")
+            try:
+                after = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        # Venue name/type are filled in from the reference cache
         query = """
-        SELECT m.*, v.name as venue_name, v.venue_type 
+        SELECT m.*
         FROM markets m
-        JOIN venues v ON m.venue_id = v.id
         WHERE 1=1
         """
         params = []
         param_count = 0
         
+        if q:
+            # <% (word similarity) is served by the trigram GIN indexes
+            param_count += 1
+            query = f"""
+            SELECT m.*,
+                   GREATEST(word_similarity(${param_count}, m.title)::float8,
+                            0.8 * word_similarity(${param_count}, COALESCE(m.description, ''))::float8) AS score
+            FROM markets m
+            WHERE (${param_count} <% m.title OR ${param_count} <% m.description)
+            """
+            params.append(q)
+        
         if status:
             param_count += 1
             query += f" AND m.status = ${param_count}"
@@ -365,15 +650,31 @@ async def get_markets(
             query += f" AND m.category = ${param_count}"
             params.append(category)
             
-        query += f" ORDER BY m.last_updated DESC LIMIT ${param_count + 1}"
-        params.append(limit)
+        if q:
+            # Keyset pagination over (score DESC, id)
+            query = f"SELECT * FROM ({query}) ranked"
+            if after:
+                query += f" WHERE score < ${param_count + 1} OR (score = ${param_count + 1} AND id > ${param_count + 2}::uuid)"
+                params.extend(after)
+                param_count += 2
+            query += f" ORDER BY score DESC, id LIMIT ${param_count + 1}"
+            params.append(limit + 1)
+        else:
+            query += f" ORDER BY m.last_updated DESC LIMIT ${param_count + 1}"
+            params.append(limit)
         
-        rows = await conn.fetch(query, *params)
-        await conn.close()
+        async with db_connection(readonly=True, after=VERSIONS_WRITE_KEY) as conn:
+            await reference_data.ensure_loaded(conn)
+            rows = await conn.fetch(query, *params)
+        
+        next_cursor = None
+        if q and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1]['score'], str(rows[-1]['id'])])
         
         markets = []
         for row in rows:
-            market = dict(row)
+            market = reference_data.enrich_market(dict(row))
             for key, value in market.items():
                 if hasattr(value, '__float__'):
                     market[key] = float(value)
@@ -381,22 +682,94 @@ async def get_markets(
                     market[key] = value.isoformat()
             markets.append(market)
         
-        return {
+        response = {
             "markets": markets, 
             "total": len(markets),
             "timestamp": datetime.utcnow().isoformat()
         }
+        if q:
+            response["next_cursor"] = next_cursor
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch markets: {str(e)}")
 
+@app.get("/api/v1/markets/{market_id}/prices")
+async def get_market_prices(
+    request: Request,
+    market_id: str,
+    hours: float = Query(1.0, description="How far back to return ticks", gt=0, le=24 * 30)
+):
+    """Get a market's recent price path as columnar arrays (ts in epoch ms)"""
+    try:
+        if not is_uuid(market_id):
+            raise HTTPException(status_code=404, detail="Market not found")
+        market_id = str(uuid.UUID(market_id))
+
+        # Recent windows come from the in-memory rings; longer ones from the table
+        if price_history.covers(market_id, hours):
+            path = price_history.path(market_id, hours)
+            source = "memory"
+        else:
+            async with db_connection(readonly=True) as conn:
+                rows = await conn.fetch(
+                    """
+                    SELECT ts, yes_price, no_price
+                    FROM market_price_ticks
+                    WHERE market_id = $1 AND ts >= CURRENT_TIMESTAMP - make_interval(secs => $2)
+                    ORDER BY ts
+                    """,
+                    market_id, hours * 3600
+                )
+            path = {
+                "ts": np.array([int(row['ts'].timestamp() * 1000) for row in rows], dtype=np.int64),
+                "yes_price": np.array([np.nan if row['yes_price'] is None else float(row['yes_price']) for row in rows]),
+                "no_price": np.array([np.nan if row['no_price'] is None else float(row['no_price']) for row in rows]),
+            }
+            source = "database"
+
+        prices = {
+            key: [None if np.isnan(p) else p for p in np.round(path[key].astype(np.float64), 4).tolist()]
+            for key in ("yes_price", "no_price")
+        }
+        return {
+            "market_id": market_id,
+            "hours": hours,
+            "ts": path["ts"].tolist(),
+            **prices,
+            "source": source,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch market prices: {str(e)}")
+
 # Platform Statistics with fallback
 @app.get("/api/v1/stats")
 async def get_platform_stats(request: Request):
     """Get platform-wide statistics"""
     try:
-        conn = await get_db_connection()
+        # Keyed by data version so a change is never hidden behind the TTL
+        cache_key = f"stats:{resource_versions.version_key(CACHEABLE_ROUTES['/api/v1/stats'])}"
+        stats = await shared_state.get_or_load(cache_key, load_platform_stats, ttl=STATS_CACHE_TTL)
         
+        return {
+            "stats": stats,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch stats: {str(e)}")
+
+async def load_platform_stats() -> Dict[str, Any]:
+    """Run the platform stats aggregates; cached across workers by shared_state"""
+    async with db_connection(readonly=True, after=VERSIONS_WRITE_KEY) as conn:
         # Get various stats
         stats_queries = {
             'active_opportunities': "SELECT COUNT(*) FROM arbitrage_opportunities WHERE status = 'active'",
@@ -416,95 +789,246 @@ async def get_platform_stats(request: Request):
                     stats[key] = result
             else:
                 stats[key] = 0
-        
+        return stats
+
+# Streaming exports
+@app.get("/api/v1/exports/opportunities")
+async def export_opportunities(
+    request: Request,
+    start_date: date = Query(..., description="First day of the range (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="Last day of the range, inclusive (YYYY-MM-DD)"),
+    format: str = Query("ndjson", description="Export format: ndjson, csv or arrow"),
+    status: Optional[str] = Query(None, description="Opportunity status filter")
+):
+    """Stream historical opportunities with pair and venue details as NDJSON, CSV or Arrow IPC"""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid format '{format}'. Use one of: {', '.join(EXPORT_MEDIA_TYPES)}")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    start, end = export_range(start_date, end_date)
+    conn = await get_db_connection(dedicated=True, readonly=True)
+
+    if format == "arrow":
+        from utils.arrow_export import iter_opportunity_batches
+        try:
+            schema, batches = await iter_opportunity_batches(conn, start, end, status)
+        except Exception as e:
+            await conn.close()
+            raise HTTPException(status_code=500, detail=f"Failed to start Arrow export: {str(e)}")
+        body = arrow_export_stream(request, conn, schema, batches)
+    else:
+        body = text_export_stream(request, conn, start, end, status, format)
+
+    filename = f"opportunities_{start_date}_{end_date}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+async def text_export_stream(request: Request, conn, start: datetime, end: datetime,
+                             status: Optional[str], format: str):
+    """NDJSON/CSV chunks from a server-side cursor; stops when the client goes away"""
+    chunks = iter_opportunity_chunks(conn, start, end, status)
+    rows_sent = 0
+    try:
+        async for rows in chunks:
+            if await request.is_disconnected():
+                print(f"⚠️  Export cancelled by client after {rows_sent} rows")
+                break
+            if format == "csv":
+                yield csv_chunk(rows, header=rows_sent == 0)
+            else:
+                yield ndjson_chunk(rows)
+            rows_sent += len(rows)
+        else:
+            if format == "csv" and rows_sent == 0:
+                yield csv_chunk([], header=True)
+    finally:
+        await chunks.aclose()
         await conn.close()
-        
-        return {
-            "stats": stats,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        
+
+async def arrow_export_stream(request: Request, conn, schema, batches):
+    """Arrow IPC stream from record batches; stops when the client goes away"""
+    from utils.arrow_export import ipc_stream
+    stream = ipc_stream(schema, batches)
+    try:
+        async for data in stream:
+            if await request.is_disconnected():
+                print("⚠️  Arrow export cancelled by client")
+                break
+            yield data
+    finally:
+        await stream.aclose()
+        await batches.aclose()
+        await conn.close()
+
+@app.get("/api/v1/exports/market-ticks")
+async def export_market_ticks(
+    request: Request,
+    start_date: date = Query(..., description="First day of the range (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="Last day of the range, inclusive (YYYY-MM-DD)"),
+    market_id: Optional[str] = Query(None, description="Restrict to one market")
+):
+    """Stream market price ticks as an Arrow IPC stream"""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    from utils.arrow_export import iter_tick_batches
+    start, end = export_range(start_date, end_date)
+    conn = await get_db_connection(dedicated=True, readonly=True)
+    try:
+        schema, batches = await iter_tick_batches(conn, start, end, market_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch stats: {str(e)}")
+        await conn.close()
+        raise HTTPException(status_code=500, detail=f"Failed to start Arrow export: {str(e)}")
+
+    filename = f"market_ticks_{start_date}_{end_date}.arrow"
+    return StreamingResponse(
+        arrow_export_stream(request, conn, schema, batches),
+        media_type=EXPORT_MEDIA_TYPES["arrow"],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # Enhanced Backtest Endpoints  
 @app.post("/api/v1/backtests")
 async def create_backtest(
     request: Request,
-    backtest_data: Dict[str, Any],
-    background_tasks: BackgroundTasks
+    backtest_data: Dict[str, Any]
 ):
     """Create and queue a new backtest"""
     try:
-        # Validate required fields
-        required_fields = ['name', 'start_date', 'end_date', 'user_id']
-        for field in required_fields:
-            if field not in backtest_data:
-                raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
-        
-        conn = await get_db_connection()
-        
-        # Insert backtest record
-        query = """
-        INSERT INTO backtests (
-            user_id, name, start_date, end_date, min_spread_pct, 
-            min_liquidity_usd, venue_filter, total_opportunities,
-            profitable_opportunities, total_profit_pct, total_profit_usd,
-            max_drawdown_pct, sharpe_ratio
-        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
-        RETURNING id, created_at
-        """
-        
-        row = await conn.fetchrow(
-            query,
-            backtest_data['user_id'],
-            backtest_data['name'],
-            backtest_data['start_date'],
-            backtest_data['end_date'],
-            backtest_data.get('min_spread_pct', 1.0),
-            backtest_data.get('min_liquidity_usd', 500.0),
-            backtest_data.get('venue_filter', []),
-            0,  # Will be calculated
-            0,  # Will be calculated  
-            0.0,  # Will be calculated
-            0.0,  # Will be calculated
-            0.0,  # Will be calculated
-            0.0   # Will be calculated
-        )
+        # Bounds on resamples and simulation sizes protect the backtest pool
+        try:
+            params = BacktestRequest.model_validate(backtest_data)
+        except ValidationError as e:
+            problems = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'body'}: {error['msg']}" for error in e.errors()
+            )
+            raise HTTPException(status_code=400, detail=f"Invalid backtest: {problems}")
+        backtest_data = params.model_dump(mode="json")
+        mode = backtest_data['mode']
+        start_date = params.start_date
+        end_date = params.end_date
         
-        await conn.close()
+        async with db_connection() as conn:
+            # Insert backtest record
+            query = """
+            INSERT INTO backtests (
+                user_id, name, start_date, end_date, min_spread_pct, 
+                min_liquidity_usd, venue_filter, total_opportunities,
+                profitable_opportunities, total_profit_pct, total_profit_usd,
+                max_drawdown_pct, sharpe_ratio, mode, fee_adjustment_bps,
+                min_confidence_score
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
+            RETURNING id, created_at
+            """
         
-        backtest_id = row['id']
+            row = await conn.fetchrow(
+                query,
+                backtest_data['user_id'],
+                backtest_data['name'],
+                start_date,
+                end_date,
+                backtest_data.get('min_spread_pct', 1.0),
+                backtest_data.get('min_liquidity_usd', 500.0),
+                backtest_data.get('venue_filter', []),
+                0,  # Will be calculated
+                0,  # Will be calculated  
+                0.0,  # Will be calculated
+                0.0,  # Will be calculated
+                0.0,  # Will be calculated
+                0.0,  # Will be calculated
+                mode,
+                backtest_data.get('fee_adjustment_bps', 0),
+                backtest_data.get('min_confidence_score', 0)
+            )
         
-        # Queue background task to calculate backtest results
-        background_tasks.add_task(calculate_backtest_results, backtest_id, backtest_data)
+            backtest_id = row['id']
+            # So an immediate GET of this backtest is not served by a lagging replica
+            await note_backtest_write(conn, backtest_id)
+
+        # Calculate backtest results outside the request
+        if mode == 'replay':
+            launch_backtest(calculate_replay_backtest_results(backtest_id, backtest_data))
+        else:
+            launch_backtest(calculate_backtest_results(backtest_id, backtest_data))
         
         return {
             "id": backtest_id,
             "status": "queued",
+            "mode": mode,
             "message": "Backtest created and queued for processing",
             "created_at": row['created_at'].isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create backtest: {str(e)}")
 
+# Running backtest calculations, kept referenced until they finish
+backtest_tasks: set = set()
+
+def launch_backtest(coroutine):
+    """Run a backtest calculation detached from the request that queued it
+
+    A fresh context leaves the request's deadline behind, so the calculation
+    is neither cancelled with the request nor holds its admission slot.
+    """
+    task = asyncio.create_task(coroutine, context=contextvars.Context())
+    backtest_tasks.add(task)
+    task.add_done_callback(backtest_tasks.discard)
+
+def backtest_key(backtest_id) -> str:
+    """Read-your-writes key of a backtest row"""
+    return f"backtest:{str(backtest_id).lower()}"
+
+# How long a backtest write position is shared with other workers; a replica
+# that far behind is out of rotation long before (DB_REPLICA_MAX_LAG)
+BACKTEST_WRITE_TTL = 300.0
+
+async def note_backtest_write(conn, backtest_id):
+    """note_write for a backtest row, shared so a poll on any worker sees it"""
+    key = backtest_key(backtest_id)
+    lsn = await db_manager.note_write(conn, key)
+    if lsn is not None:
+        await shared_state.set(f"write:{key}", lsn, ttl=BACKTEST_WRITE_TTL)
+
+async def learn_backtest_write(backtest_id):
+    """Pick up a backtest write position noted by another worker"""
+    key = backtest_key(backtest_id)
+    lsn = await shared_state.get(f"write:{key}")
+    if lsn is not None:
+        db_manager.record_write(key, max(int(lsn), db_manager.write_lsn(key) or 0))
+
+# JSONB columns returned by asyncpg as text
+BACKTEST_JSON_COLUMNS = ('simulation', 'confidence_intervals')
+
 @app.get("/api/v1/backtests/{backtest_id}")
 async def get_backtest_results(request: Request, backtest_id: str):
     """Get backtest results"""
     try:
-        conn = await get_db_connection()
-        
+        if db_manager.replicas:
+            await learn_backtest_write(backtest_id)
         query = "SELECT * FROM backtests WHERE id = $1"
-        row = await conn.fetchrow(query, backtest_id)
-        await conn.close()
+        async with db_connection(readonly=True, after=backtest_key(backtest_id)) as conn:
+            row = await conn.fetchrow(query, backtest_id)
+        
+        if not row and db_manager.replicas:
+            # A replica may not have replayed a write it was never told about
+            async with db_connection() as conn:
+                row = await conn.fetchrow(query, backtest_id)
         
         if not row:
             raise HTTPException(status_code=404, detail="Backtest not found")
         
         backtest = dict(row)
         for key, value in backtest.items():
-            if hasattr(value, '__float__'):
+            if key in BACKTEST_JSON_COLUMNS and isinstance(value, str):
+                backtest[key] = json.loads(value)
+            elif hasattr(value, '__float__'):
                 backtest[key] = float(value)
             elif isinstance(value, datetime):
                 backtest[key] = value.isoformat()
@@ -522,109 +1046,95 @@ async def get_backtest_results(request: Request, backtest_id: str):
 async def calculate_backtest_results(backtest_id: str, backtest_data: Dict[str, Any]):
     """Calculate backtest results in background"""
     try:
-        conn = await get_db_connection()
+        # Own connection: no pool statement_timeout, no pool slot held for the run
+        async with db_connection(dedicated=True) as conn:
+            start, end = parse_backtest_range(backtest_data)
         
-        # Get historical opportunities for the backtest period
-        query = """
-        SELECT ao.net_spread_pct, ao.expected_profit_usd, ao.max_tradable_amount,
-               ao.created_at
-        FROM arbitrage_opportunities ao
-        JOIN market_pairs mp ON ao.pair_id = mp.id
-        JOIN markets ma ON mp.market_a_id = ma.id
-        JOIN markets mb ON mp.market_b_id = mb.id
-        WHERE ao.created_at >= $1 AND ao.created_at <= $2
-        AND ao.net_spread_pct >= $3
-        AND ao.max_tradable_amount >= $4
-        ORDER BY ao.created_at
-        """
-        
-        rows = await conn.fetch(
-            query,
-            backtest_data['start_date'],
-            backtest_data['end_date'] + ' 23:59:59',
-            backtest_data.get('min_spread_pct', 1.0),
-            backtest_data.get('min_liquidity_usd', 500.0)
-        )
+            # Get historical opportunities for the backtest period
+            query = """
+            SELECT ao.net_spread_pct, ao.expected_profit_usd, ao.max_tradable_amount,
+                   ao.created_at, ao.pair_id,
+                   GREATEST(ma.resolution_date, mb.resolution_date) as resolves_at
+            FROM arbitrage_opportunities ao
+            JOIN market_pairs mp ON ao.pair_id = mp.id
+            JOIN markets ma ON mp.market_a_id = ma.id
+            JOIN markets mb ON mp.market_b_id = mb.id
+            WHERE ao.created_at >= $1 AND ao.created_at <= $2
+            AND ao.net_spread_pct >= $3
+            AND ao.max_tradable_amount >= $4
+            ORDER BY ao.created_at
+            """
         
-        if not rows:
-            # Update with zero results
-            await conn.execute(
-                "UPDATE backtests SET total_opportunities = 0 WHERE id = $1",
-                backtest_id
+            rows = await conn.fetch(
+                query,
+                start,
+                end,
+                backtest_data.get('min_spread_pct', 1.0),
+                backtest_data.get('min_liquidity_usd', 500.0)
             )
-            await conn.close()
-            return
         
-        # Calculate metrics
-        total_opportunities = len(rows)
-        profitable_opportunities = len([r for r in rows if float(r['net_spread_pct']) > 0])
+            if not rows:
+                # Update with zero results
+                await conn.execute(
+                    "UPDATE backtests SET total_opportunities = 0 WHERE id = $1",
+                    backtest_id
+                )
+                await note_backtest_write(conn, backtest_id)
+                return
         
-        total_profit_pct = sum(float(r['net_spread_pct']) for r in rows) / 100
-        total_profit_usd = sum(float(r['expected_profit_usd'] or 0) for r in rows)
+            # Metrics and the optional capital-constrained simulation run in the
+            # backtest process pool, off the API event loop
+            metrics, simulation = await asyncio.get_running_loop().run_in_executor(
+                get_backtest_executor(),
+                compute_recorded_backtest,
+                backtest_data,
+                np.array([float(r['net_spread_pct']) for r in rows]),
+                np.array([float(r['expected_profit_usd'] or 0) for r in rows]),
+                np.array([r['created_at'].date() for r in rows], dtype='datetime64[D]'),
+                np.array([r['created_at'].timestamp() for r in rows]),
+                np.array([r['resolves_at'].timestamp() if r['resolves_at'] else np.nan for r in rows]),
+                np.array([str(r['pair_id']) for r in rows]),
+                np.array([float(r['max_tradable_amount'] or 0) for r in rows])
+            )
         
-        # Simplified Sharpe ratio calculation
-        daily_returns = {}
-        for row in rows:
-            date_key = row['created_at'].date()
-            if date_key not in daily_returns:
-                daily_returns[date_key] = []
-            daily_returns[date_key].append(float(row['net_spread_pct']) / 100)
-        
-        daily_avg_returns = [sum(returns) / len(returns) for returns in daily_returns.values()]
-        
-        if len(daily_avg_returns) > 1:
-            avg_return = sum(daily_avg_returns) / len(daily_avg_returns)
-            variance = sum((r - avg_return) ** 2 for r in daily_avg_returns) / len(daily_avg_returns)
-            volatility = variance ** 0.5
-            sharpe_ratio = avg_return / volatility if volatility > 0 else 0
-        else:
-            sharpe_ratio = 0
-        
-        # Simple max drawdown calculation
-        cumulative_returns = []
-        cumulative = 0
-        for returns in daily_avg_returns:
-            cumulative += returns
-            cumulative_returns.append(cumulative)
-        
-        max_drawdown = 0
-        peak = 0
-        for ret in cumulative_returns:
-            if ret > peak:
-                peak = ret
-            drawdown = peak - ret
-            if drawdown > max_drawdown:
-                max_drawdown = drawdown
-        
-        # Update backtest with calculated results
-        update_query = """
-        UPDATE backtests 
-        SET total_opportunities = $1,
-            profitable_opportunities = $2,
-            total_profit_pct = $3,
-            total_profit_usd = $4,
-            max_drawdown_pct = $5,
-            sharpe_ratio = $6
-        WHERE id = $7
-        """
+            # Update backtest with calculated results
+            await store_backtest_metrics(conn, backtest_id, metrics)
+            if simulation is not None:
+                await store_backtest_simulation(conn, backtest_id, simulation)
         
-        await conn.execute(
-            update_query,
-            total_opportunities,
-            profitable_opportunities,
-            round(total_profit_pct, 4),
-            round(total_profit_usd, 2),
-            round(max_drawdown * 100, 4),
-            round(sharpe_ratio, 2),
-            backtest_id
-        )
+            # Optional block bootstrap of the daily return series
+            if backtest_data.get('bootstrap_resamples'):
+                confidence_intervals = await bootstrap_confidence_intervals_parallel(
+                    metrics['daily_returns'],
+                    get_backtest_executor(),
+                    n_resamples=int(backtest_data['bootstrap_resamples']),
+                    block_size=backtest_data.get('bootstrap_block_size')
+                )
+                if confidence_intervals is not None:
+                    await store_backtest_confidence_intervals(conn, backtest_id, confidence_intervals)
         
-        await conn.close()
+            await note_backtest_write(conn, backtest_id)
         
     except Exception as e:
         print(f"Error calculating backtest {backtest_id}: {e}")
         # Update backtest with error status could be added here
 
+async def calculate_replay_backtest_results(backtest_id: str, backtest_data: Dict[str, Any]):
+    """Re-run detection over price history in the backtest process pool"""
+    try:
+        loop = asyncio.get_running_loop()
+        metrics = await loop.run_in_executor(
+            get_backtest_executor(),
+            run_replay_backtest,
+            DATABASE_URL,
+            str(backtest_id),
+            backtest_data
+        )
+        print(f"✅ Replay backtest {backtest_id}: {metrics['total_opportunities']} opportunities "
+              f"across {metrics['pairs_evaluated']} pairs")
+    except Exception as e:
+        print(f"Error replaying backtest {backtest_id}: {e}")
+
 # Enhanced error handlers with CORS support
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
@@ -666,21 +1176,196 @@ async def internal_error_handler(request, exc):
         }
     )
 
-# Add startup event to test database connection
+# Request profiles (see X-Profile-Token); admin only
+def require_profiling_token(request: Request):
+    if not request_profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not request_profiler.authorized(request.headers.get(PROFILE_TOKEN_HEADER.decode())):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+@app.get("/api/v1/admin/profiles")
+async def list_request_profiles(request: Request):
+    """Summaries of recently profiled requests, newest first"""
+    require_profiling_token(request)
+    return {
+        "profiles": [profile.summary() for profile in reversed(request_profiler.profiles)],
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/api/v1/admin/profiles/{profile_id}")
+async def get_request_profile(
+    request: Request,
+    profile_id: str,
+    format: str = Query("json", description="json, or collapsed for flamegraph.pl / speedscope")
+):
+    """One stored profile as a summary or as collapsed stacks"""
+    require_profiling_token(request)
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return Response(content=profile.collapsed(), media_type="text/plain")
+    if format != "json":
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}. Use json or collapsed")
+    return profile.summary()
+
+# Startup warm-up: pool, reference data, active opportunities, hot statements
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() != "false"
+
+# Replayed in-process at startup, each on every pooled connection, so the
+# statements real traffic uses are already prepared (asyncpg caches them per
+# connection) and the caches behind these routes are filled
+WARMUP_REQUESTS = [
+    ("GET", "/api/v1/opportunities", b""),
+    ("GET", "/api/v1/opportunities", b"min_spread=1&limit=100"),
+    ("GET", "/api/v1/venues", b""),
+    ("GET", "/api/v1/markets", b""),
+    ("GET", "/api/v1/stats", b""),
+]
+
+ACTIVE_PAIR_MARKETS_QUERY = """
+SELECT DISTINCT mp.market_a_id, mp.market_b_id
+FROM arbitrage_opportunities ao
+JOIN market_pairs mp ON ao.pair_id = mp.id
+WHERE ao.status = 'active'
+"""
+
+async def warm_pool():
+    """Open min_size pooled connections"""
+    await db_manager.create_pool()
+    print(f"✅ Database pool ready ({db_manager.min_size}-{db_manager.max_size} connections)")
+
+async def warm_reference_data():
+    """Load venues and markets, then the markets behind every active opportunity"""
+    async with db_connection(readonly=True) as conn:
+        await reference_data.ensure_loaded(conn)
+        rows = await conn.fetch(ACTIVE_PAIR_MARKETS_QUERY)
+        await reference_data.fill_markets(
+            conn, [row['market_a_id'] for row in rows] + [row['market_b_id'] for row in rows]
+        )
+
+async def warm_statements():
+    """Run the hot routes concurrently, one copy per pooled connection"""
+    failures = 0
+    for method, path, query in WARMUP_REQUESTS:
+        # The router skips auth, compression and logging middleware
+        results = await asyncio.gather(
+            *(asgi_request(app.router, method, path, query) for _ in range(db_manager.min_size)),
+            return_exceptions=True
+        )
+        failures += sum(1 for result in results if isinstance(result, Exception) or result >= 500)
+    if failures:
+        print(f"⚠️  {failures} warm-up requests failed")
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the startup warm-up has finished"""
+    report = startup_warmup.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
 @app.on_event("startup")
 async def startup_event():
-    """Test database connection on startup"""
+    """Start background services and warm the process before reporting ready"""
+    shared_state.start()
     try:
         if DATABASE_URL:
-            conn = await get_db_connection()
-            await conn.close()
-            print("✅ Database connection successful")
             print(f"✅ CORS configured for {len(origins)} origins")
+            expiry_scheduler.start(DATABASE_URL)
+            price_history.start(DATABASE_URL)
+            alert_dispatcher.start(DATABASE_URL)
+            alert_engine.add_handler(alert_dispatcher.handle_matches)
+            alert_engine.start(DATABASE_URL)
+            api_key_auth.start(DATABASE_URL)
+            reference_data.start(DATABASE_URL)
+            resource_versions.start(DATABASE_URL)
+            fee_recomputer.start(DATABASE_URL)
+            dutch_book_detector.start(DATABASE_URL)
+            if STARTUP_WARMUP:
+                startup_warmup.start([
+                    ("pool", warm_pool),
+                    ("reference_data", warm_reference_data),
+                    ("hot_statements", warm_statements),
+                ])
+            else:
+                await warm_pool()
+                startup_warmup.mark_ready()
         else:
+            startup_warmup.error = "No database URL configured"
             print("⚠️  No database URL configured")
     except Exception as e:
+        startup_warmup.error = f"Database connection failed: {e}"
         print(f"❌ Database connection failed: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background services"""
+    await expiry_scheduler.stop()
+    await price_history.stop()
+    await alert_engine.stop()
+    await alert_dispatcher.stop()
+    await api_key_auth.stop()
+    await shared_state.stop()
+    await reference_data.stop()
+    await resource_versions.stop()
+    await fee_recomputer.stop()
+    await dutch_book_detector.stop()
+    await startup_warmup.stop()
+    for task in list(backtest_tasks):
+        task.cancel()
+    await db_manager.close_pool()
+    shutdown_backtest_executor()
+
+# Conditional GET: answer If-None-Match / If-Modified-Since from version tokens
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """Send ETag/Last-Modified and 304 without a database hit when nothing changed"""
+    resources = CACHEABLE_ROUTES.get(request.url.path)
+    if request.method != "GET" or resources is None:
+        return await call_next(request)
+
+    # Taken before the handler runs, and the handler reads with
+    # after=VERSIONS_WRITE_KEY, so the body is never older than its tag
+    validators = resource_versions.validators(resources, request.url.query)
+    if validators is None:
+        return await call_next(request)
+
+    etag, last_modified = validators
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request.headers, etag, last_modified):
+        # Built outside CORSMiddleware, like the 401/429 from authenticate_api_key
+        return Response(status_code=304, headers={**headers, "Access-Control-Allow-Origin": "*"})
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
+# API key authentication and per-key rate limiting
+@app.middleware("http")
+async def authenticate_api_key(request: Request, call_next):
+    """Verify X-API-Key / Bearer keys and enforce the key's rate limit"""
+    if request.method == "OPTIONS" or request.url.path in PUBLIC_PATHS:
+        return await call_next(request)
+
+    result = await api_key_auth.authenticate(extract_api_key(request.headers))
+    entry = result.entry
+    if result.status_code != 200:
+        headers = {"Access-Control-Allow-Origin": "*"}
+        if result.status_code == 401:
+            headers["WWW-Authenticate"] = "Bearer"
+        if result.status_code == 429:
+            headers["Retry-After"] = str(max(1, int(result.retry_after + 0.999)))
+            headers["X-RateLimit-Limit"] = str(entry.rate_limit_per_minute)
+            headers["X-RateLimit-Remaining"] = "0"
+        return JSONResponse(status_code=result.status_code, content={"detail": result.detail}, headers=headers)
+
+    request.state.api_key = entry
+    response = await call_next(request)
+    if entry is not None:
+        response.headers["X-RateLimit-Limit"] = str(entry.rate_limit_per_minute)
+        response.headers["X-RateLimit-Remaining"] = str(int(result.remaining))
+    return response
+
 # Add middleware to log requests for debugging
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -689,7 +1374,9 @@ async def log_requests(request: Request, call_next):
     
     if request.method == "OPTIONS": print(f"🔄 CORS preflight request detected")
         
+    started = time.perf_counter()
     response = await call_next(request)
+    startup_warmup.record_request(request.url.path, time.perf_counter() - started)
     
     print(f"📤 Response: {response.status_code}")
     return response
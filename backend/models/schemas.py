@@ -36,6 +36,10 @@ class ApiKeyTier(str, Enum):
     PRO = "pro"
     PARTNER = "partner"
 
+class BacktestMode(str, Enum):
+    RECORDED = "recorded"
+    REPLAY = "replay"
+
 # Request/Response Models
 
 class OpportunityFilter(BaseModel):
@@ -68,10 +72,16 @@ class OpportunityResponse(BaseModel):
     
     # Related data
     confidence_score: Optional[int]
+    market_a_id: Optional[str]
+    market_b_id: Optional[str]
     market_a_title: Optional[str]
     market_b_title: Optional[str]
+    market_a_category: Optional[str]
+    market_b_category: Optional[str]
     venue_a_name: Optional[str]
     venue_b_name: Optional[str]
+    venue_a_type: Optional[VenueType]
+    venue_b_type: Optional[VenueType]
 
 class VenueResponse(BaseModel):
     id: str
@@ -114,6 +124,25 @@ class MarketResponse(BaseModel):
     venue_name: Optional[str]
     venue_type: Optional[VenueType]
 
+class OpportunityLegResponse(MarketResponse):
+    venue_fee_bps: Optional[int]
+
+class OpportunityDetailResponse(OpportunityResponse):
+    is_manual_override: Optional[bool]
+    
+    # Each leg's market with its venue, kept apart so leg B never overwrites leg A
+    market_a: Optional[OpportunityLegResponse]
+    market_b: Optional[OpportunityLegResponse]
+
+class OpportunityBatchRequest(BaseModel):
+    ids: List[str] = Field(..., description="Opportunity ids to resolve", min_length=1, max_length=500)
+    fields: Optional[str] = Field(None, description="Comma-separated fields to return (default: all)")
+
+class OpportunityBatchResponse(BaseModel):
+    opportunities: List[OpportunityDetailResponse]
+    missing: List[str]
+    total: int
+
 class BacktestRequest(BaseModel):
     name: str = Field(..., description="Backtest name")
     start_date: date = Field(..., description="Start date for backtest")
@@ -122,11 +151,19 @@ class BacktestRequest(BaseModel):
     min_spread_pct: Optional[float] = Field(1.0, description="Minimum spread percentage", ge=0)
     min_liquidity_usd: Optional[float] = Field(500.0, description="Minimum liquidity in USD", ge=0)
     venue_filter: Optional[List[str]] = Field([], description="Filter by venue names")
+    mode: Optional[BacktestMode] = Field(BacktestMode.RECORDED, description="Aggregate recorded opportunities or replay price history")
+    fee_adjustment_bps: Optional[int] = Field(0, description="Replay only: added to each venue's fee_bps", ge=-10000, le=10000)
+    min_confidence_score: Optional[int] = Field(0, description="Replay only: minimum pair confidence score", ge=0, le=100)
+    initial_capital_usd: Optional[float] = Field(None, description="Enables the capital-constrained execution simulation", gt=0, le=1e12)
+    max_position_usd: Optional[float] = Field(None, description="Simulation: cap on capital per position", gt=0, le=1e12)
+    default_hold_days: Optional[float] = Field(30, description="Simulation: lock-up for markets without a resolution_date", gt=0, le=3650)
+    bootstrap_resamples: Optional[int] = Field(None, description="Block bootstrap resamples for metric confidence intervals", ge=100, le=20000)
+    bootstrap_block_size: Optional[int] = Field(None, description="Bootstrap block length in days (default: cube root of the day count)", ge=1, le=365)
     
     @validator('end_date')
     def end_date_after_start_date(cls, v, values):
-        if 'start_date' in values and v <= values['start_date']:
-            raise ValueError('end_date must be after start_date')
+        if 'start_date' in values and v < values['start_date']:
+            raise ValueError('end_date must not be before start_date')
         return v
     
     @validator('start_date', 'end_date')
@@ -150,6 +187,11 @@ class BacktestResponse(BaseModel):
     total_profit_usd: float
     max_drawdown_pct: float
     sharpe_ratio: float
+    mode: Optional[BacktestMode]
+    fee_adjustment_bps: Optional[int]
+    min_confidence_score: Optional[int]
+    simulation: Optional[Dict[str, Any]]
+    confidence_intervals: Optional[Dict[str, Any]]
     created_at: datetime
 
 class PlatformStats(BaseModel):
@@ -188,6 +230,7 @@ class MarketsListResponse(BaseModel):
 class BacktestCreateResponse(BaseModel):
     id: str
     status: str
+    mode: Optional[BacktestMode]
     message: str
     created_at: datetime
 
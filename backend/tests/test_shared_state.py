@@ -0,0 +1,116 @@
+"""Shared state against a minimal in-process Redis (RESP2) server
+
+Run from the backend directory:
+    python -m pytest -q tests
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("redis")
+
+from utils.shared_state import SharedState, INVALIDATION_CHANNEL
+
+
+class FakeRedis:
+    """Just enough of Redis for SharedState: PING, GET/SET, PUBLISH and SUBSCRIBE"""
+
+    def __init__(self):
+        self.values = {}
+        self.subscribers = {}
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(FakeRedis._encode(v) for v in value)
+        data = value.encode() if isinstance(value, str) else value
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2].decode())
+        return args
+
+    async def _serve(self, reader, writer):
+        subscribed = set()
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                command = args[0].upper()
+                if command == "PING":
+                    reply = self._encode(["pong", args[1] if len(args) > 1 else ""]) if subscribed else b"+PONG\r\n"
+                elif command == "GET":
+                    reply = self._encode(self.values.get(args[1]))
+                elif command == "SET":
+                    self.values[args[1]] = args[2]
+                    reply = b"+OK\r\n"
+                elif command == "SUBSCRIBE":
+                    subscribed.add(args[1])
+                    self.subscribers.setdefault(args[1], []).append(writer)
+                    reply = self._encode(["subscribe", args[1], len(subscribed)])
+                elif command == "PUBLISH":
+                    receivers = self.subscribers.get(args[1], [])
+                    for receiver in receivers:
+                        receiver.write(self._encode(["message", args[1], args[2]]))
+                    reply = self._encode(len(receivers))
+                else:
+                    reply = b"-ERR unknown command\r\n"
+                writer.write(reply)
+                await writer.drain()
+        finally:
+            for channel in subscribed:
+                self.subscribers[channel].remove(writer)
+            writer.close()
+
+
+def test_idle_invalidation_channel_keeps_redis_shared():
+    async def run():
+        redis = FakeRedis()
+        port = await redis.start()
+        state = SharedState(retry_interval=30.0)
+        state.start(f"redis://127.0.0.1:{port}/0")
+        try:
+            for _ in range(50):
+                if state.shared:
+                    break
+                await asyncio.sleep(0.05)
+            assert state.shared
+
+            # Longer than the client's 1 s socket_timeout with nothing published
+            await asyncio.sleep(2.5)
+            assert state.shared
+            assert state.stats["fallbacks"] == 0
+
+            # The subscription still delivers invalidations after the quiet period
+            state._tier["opportunities"] = ("cached", float("inf"))
+            await state.remote.publish(INVALIDATION_CHANNEL, "opportunities")
+            for _ in range(50):
+                if "opportunities" not in state._tier:
+                    break
+                await asyncio.sleep(0.05)
+            assert "opportunities" not in state._tier
+            assert state.shared
+        finally:
+            await state.stop()
+            await redis.stop()
+
+    asyncio.run(run())
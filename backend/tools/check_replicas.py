@@ -0,0 +1,83 @@
+"""Check read-replica routing, lag measurement and read-your-writes
+
+Run from the backend directory against a primary and one or more replicas,
+e.g. two local instances where the second is a streaming standby:
+    initdb -D /tmp/pg-primary && pg_ctl -D /tmp/pg-primary -o "-p 5432" start
+    pg_basebackup -D /tmp/pg-replica -R -p 5432 && pg_ctl -D /tmp/pg-replica -o "-p 5433" start
+    DATABASE_URL=postgresql://localhost:5432/postgres \
+    DB_REPLICA_URLS=postgresql://localhost:5433/postgres \
+    python -m tools.check_replicas --writes 20
+
+A second independent instance (not a standby) also works; it reports no
+replay position, so reads after a write wait out its lag instead.
+"""
+import argparse
+import asyncio
+import time
+
+from utils.database import db_manager
+
+SERVER_QUERY = "SELECT inet_server_port() AS port, pg_is_in_recovery() AS in_recovery"
+
+
+async def served_by(readonly: bool, after=None):
+    conn = await db_manager.acquire(timeout=db_manager.connect_timeout, readonly=readonly, after=after)
+    try:
+        row = await conn.fetchrow(SERVER_QUERY)
+        return row['port'], row['in_recovery']
+    finally:
+        await conn.close()
+
+
+async def run(args):
+    if not db_manager.replicas:
+        raise SystemExit("Set DB_REPLICA_URLS to one or more replica DSNs")
+    await db_manager.create_pool()
+    try:
+        for node, status in zip(db_manager.replicas, db_manager.status()["replicas"]):
+            print(f"Replica {status['host']}: in recovery={node.in_recovery}, "
+                  f"lag={status['lag_s']} s, healthy={status['healthy']}, error={status['error']}")
+
+        primary = await served_by(readonly=False)
+        reads = [await served_by(readonly=True) for _ in range(args.reads)]
+        on_replicas = sum(1 for port, _ in reads if port != primary[0])
+        print(f"Writes served by port {primary[0]}; {on_replicas}/{len(reads)} reads served by replicas")
+
+        # Each write advances the primary's WAL; time until a read keyed on it
+        # may leave the primary
+        waits = []
+        for i in range(args.writes):
+            key = f"check:{i}"
+            conn = await db_manager.acquire(timeout=db_manager.connect_timeout)
+            try:
+                await conn.fetchval("SELECT txid_current()")
+                await db_manager.note_write(conn, key)
+            finally:
+                await conn.close()
+            written = time.perf_counter()
+            if (await served_by(readonly=True, after=key))[0] != primary[0]:
+                raise SystemExit(f"Read after write {i} went to a replica before it could have replayed it")
+            while db_manager.read_node(after=key) is None:
+                if time.perf_counter() - written > args.timeout:
+                    raise SystemExit(f"No replica caught up with write {i} within {args.timeout} s")
+                await asyncio.sleep(0.01)
+            waits.append(time.perf_counter() - written)
+        if waits:
+            waits.sort()
+            print(f"Read-your-writes: reads right after a write hit the primary; replicas eligible after "
+                  f"p50 {waits[len(waits) // 2] * 1000:.0f} ms, max {waits[-1] * 1000:.0f} ms")
+        print(f"Routing stats: {db_manager.status()}")
+    finally:
+        await db_manager.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check replica routing and read-your-writes against live databases")
+    parser.add_argument("--reads", type=int, default=50)
+    parser.add_argument("--writes", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
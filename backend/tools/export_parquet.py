@@ -0,0 +1,68 @@
+"""Export opportunity or price tick history to date-partitioned Parquet
+
+Run from the backend directory with DATABASE_URL set:
+    python -m tools.export_parquet opportunities --start-date 2025-01-01 --end-date 2025-01-31 --out exports/opportunities
+    python -m tools.export_parquet market-ticks --start-date 2025-01-01 --end-date 2025-01-31 --out exports/ticks
+
+Load with pandas:
+    pd.read_parquet("exports/opportunities")
+
+If rows without a time were written (to date=__HIVE_DEFAULT_PARTITION__):
+    partitioning = pyarrow.dataset.partitioning(pyarrow.schema([("date", pyarrow.string())]), flavor="hive")
+    pd.read_parquet("exports/opportunities", partitioning=partitioning)
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import date
+
+import asyncpg
+
+from utils.arrow_export import iter_opportunity_batches, iter_tick_batches, write_parquet_partitions, NULL_PARTITION
+from utils.exports import export_range
+
+
+async def run(args):
+    database_url = os.getenv("SUPABASE_DB_URL") or os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("Set SUPABASE_DB_URL or DATABASE_URL")
+
+    start, end = export_range(date.fromisoformat(args.start_date), date.fromisoformat(args.end_date))
+    conn = await asyncpg.connect(database_url, timeout=30.0, server_settings={'application_name': 'arblens_export'})
+    try:
+        started = time.perf_counter()
+        if args.dataset == "opportunities":
+            schema, batches = await iter_opportunity_batches(conn, start, end, args.status)
+            time_column = "created_at"
+        else:
+            schema, batches = await iter_tick_batches(conn, start, end, args.market_id)
+            time_column = "ts"
+        counts = await write_parquet_partitions(schema, batches, args.out, time_column)
+        elapsed = time.perf_counter() - started
+    finally:
+        await conn.close()
+
+    total = sum(counts.values())
+    undated = counts.pop(NULL_PARTITION, 0)
+    print(f"Rows written:          {total:,} across {len(counts)} daily partitions")
+    if undated:
+        print(f"Rows without a time:   {undated:,} in date={NULL_PARTITION}")
+    print(f"Elapsed:               {elapsed:.1f} s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+    print(f"Output:                {args.out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export history to date-partitioned Parquet")
+    parser.add_argument("dataset", choices=["opportunities", "market-ticks"])
+    parser.add_argument("--start-date", required=True)
+    parser.add_argument("--end-date", required=True)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--status", default=None, help="Opportunity status filter")
+    parser.add_argument("--market-id", default=None, help="Restrict ticks to one market")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
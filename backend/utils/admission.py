@@ -0,0 +1,302 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, List
+
+# Path prefix -> route class; classes get separate in-flight budgets so a
+# burst of exports or backtests cannot starve the dashboard
+ROUTE_CLASSES: List[Tuple[str, str]] = [
+    ("/api/v1/exports/", "export"),
+    # Result polls are single-row reads; only creating a backtest is heavy
+    ("/api/v1/backtests/", "interactive"),
+    ("/api/v1/backtests", "backtest"),
+    ("/api/v1/opportunities", "interactive"),
+    ("/api/v1/venues", "interactive"),
+    ("/api/v1/markets", "interactive"),
+    ("/api/v1/stats", "interactive"),
+]
+
+DEFAULT_LIMITS = {"interactive": 32, "backtest": 4, "export": 4}
+
+# GET routes whose last good response may be served while the database is unavailable
+STALE_ROUTES = {"/api/v1/opportunities", "/api/v1/venues", "/api/v1/markets", "/api/v1/stats"}
+
+
+def route_class(path: str) -> Optional[str]:
+    for prefix, name in ROUTE_CLASSES:
+        if path.startswith(prefix):
+            return name
+    return None
+
+
+def parse_limits(spec: Optional[str]) -> Dict[str, int]:
+    """`interactive=32,backtest=4` on top of the defaults"""
+    limits = dict(DEFAULT_LIMITS)
+    for part in (spec or "").split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after consecutive connection failures, probes again after a cool-down
+
+    closed: everything passes. open: everything is refused until
+    reset_timeout has passed. half-open: one probe is let through; its
+    success closes the breaker, any other outcome opens it again (see
+    release_probe). A probe nobody reports on expires after reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+        self._probe_started = 0.0
+
+    def _probe_pending(self) -> bool:
+        return self._probing and time.monotonic() - self._probe_started < self.reset_timeout
+
+    @property
+    def retry_after(self) -> float:
+        if self.state == "closed":
+            return 0.0
+        return max(1.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open" and not self._probe_pending():
+            self._probing = True
+            self._probe_started = time.monotonic()
+            return True
+        return False
+
+    def is_open(self) -> bool:
+        """Whether requests would currently be refused, without claiming the probe"""
+        if self.state == "closed":
+            return False
+        if self.state == "open":
+            return time.monotonic() - self.opened_at < self.reset_timeout
+        return self._probe_pending()
+
+    def record_success(self):
+        self.failures = 0
+        self._probing = False
+        self.state = "closed"
+
+    def release_probe(self):
+        """Call when a connection attempt ends without record_success
+
+        A half-open probe that failed in a way record_failure does not cover
+        (authentication, cancellation, anything unexpected) reopens the
+        breaker instead of leaving the probe claimed forever.
+        """
+        if self.state == "half_open" and self._probing:
+            self.record_failure()
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                print(f"⚠️  Database circuit breaker opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class RouteBudget:
+    """In-flight limit for one route class with a bounded, time-limited queue"""
+
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self, max_wait: float):
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                raise AdmissionRejected("queue_full", 1.0)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), max_wait)
+            except asyncio.TimeoutError:
+                raise AdmissionRejected("queue_timeout", max(1.0, max_wait))
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+class StaleCache:
+    """Last good GET responses, bounded by entry count and body size"""
+
+    def __init__(self, max_entries: int = 256, max_body: int = 1_000_000):
+        self.max_entries = max_entries
+        self.max_body = max_body
+        self._entries: "OrderedDict[str, Tuple[list, bytes, float]]" = OrderedDict()
+
+    def put(self, key: str, headers: list, body: bytes):
+        if len(body) > self.max_body:
+            return
+        self._entries[key] = (headers, body, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Tuple[list, bytes, float]]:
+        return self._entries.get(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AdmissionController:
+    """Per-route-class admission, database circuit breaker and stale fallbacks"""
+
+    def __init__(self, limits: Dict[str, int], max_wait: float = 2.0, queue_factor: int = 4,
+                 failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.max_wait = max_wait
+        self.budgets = {name: RouteBudget(limit, limit * queue_factor) for name, limit in limits.items()}
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.stale = StaleCache()
+        self.stats: Dict[str, int] = {
+            "admitted": 0, "queue_full": 0, "queue_timeout": 0, "circuit_open": 0, "stale_served": 0,
+        }
+
+    def count(self, key: str):
+        self.stats[key] = self.stats.get(key, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+            "budgets": {
+                name: {"limit": b.limit, "in_flight": b.in_flight, "waiting": b.waiting}
+                for name, b in self.budgets.items()
+            },
+            "stale_entries": len(self.stale),
+            **self.stats,
+        }
+
+
+def _stale_key(scope) -> str:
+    return f"{scope['path']}?{scope.get('query_string', b'').decode('latin-1')}"
+
+
+class AdmissionMiddleware:
+    """Fail fast instead of queueing without bound when the database is slow
+
+    Each route class has an in-flight budget; requests beyond it wait at most
+    max_wait in a queue of bounded length, then get 503 with Retry-After.
+    While the database circuit breaker is open, requests are refused up front.
+    GETs on STALE_ROUTES fall back to their last good response, marked with
+    `Warning: 110` and `X-Cache: stale`, instead of a 503.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        name = route_class(scope["path"]) if scope["type"] == "http" else None
+        budget = admission.budgets.get(name) if name else None
+        if budget is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        cacheable = scope["method"] == "GET" and scope["path"] in STALE_ROUTES
+        if admission.breaker.is_open():
+            admission.count("circuit_open")
+            await self._refuse(scope, send, cacheable, admission.breaker.retry_after, "Database temporarily unavailable")
+            return
+
+        try:
+            await budget.acquire(admission.max_wait)
+        except AdmissionRejected as e:
+            admission.count(e.reason)
+            await self._refuse(scope, send, cacheable, e.retry_after, "Server busy, retry shortly")
+            return
+
+        admission.count("admitted")
+        start = None
+        chunks = []
+        try:
+            if not cacheable:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_recording(message):
+                nonlocal start
+                if message["type"] == "http.response.start":
+                    start = message
+                elif start is not None and start["status"] == 200:
+                    chunks.append(message.get("body", b""))
+                await send(message)
+
+            await self.app(scope, receive, send_recording)
+            if start is not None and start["status"] == 200:
+                admission.stale.put(_stale_key(scope), list(start.get("headers", [])), b"".join(chunks))
+        finally:
+            budget.release()
+
+    async def _refuse(self, scope, send, cacheable: bool, retry_after: float, detail: str):
+        cached = admission.stale.get(_stale_key(scope)) if cacheable else None
+        if cached is not None:
+            headers, body, stored_at = cached
+            admission.count("stale_served")
+            age = str(int(time.time() - stored_at))
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [h for h in headers if h[0].lower() not in (b"age", b"etag", b"last-modified")] + [
+                    (b"age", age.encode()),
+                    (b"warning", b'110 - "Response is Stale"'),
+                    (b"x-cache", b"stale"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        body = ('{"detail": "%s"}' % detail).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(int(retry_after + 0.999)).encode()),
+                (b"access-control-allow-origin", b"*"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Global admission controller
+admission = AdmissionController(
+    parse_limits(os.getenv("ADMISSION_LIMITS")),
+    max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "2.0")),
+    failure_threshold=int(os.getenv("DB_BREAKER_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("DB_BREAKER_RESET", "10.0")),
+)
@@ -0,0 +1,447 @@
+import asyncio
+import os
+import random
+import smtplib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from typing import Optional, List, Dict, Any, Tuple
+
+import asyncpg
+
+# alert_types value -> alert_rules column holding the recipient
+RECIPIENT_COLUMNS = {
+    "email": "email_address",
+    "telegram": "telegram_chat_id",
+    "webhook": "webhook_url",
+}
+
+# Every worker matches the same opportunities; whichever advances a rule's
+# last_triggered_at first delivers, the others see no row come back
+CLAIM_RULES_QUERY = """
+UPDATE alert_rules
+SET last_triggered_at = CURRENT_TIMESTAMP
+WHERE id = ANY($1::uuid[])
+  AND (last_triggered_at IS NULL OR last_triggered_at <= CURRENT_TIMESTAMP - make_interval(secs => $2))
+RETURNING id::text
+"""
+
+
+class DeliveryError(Exception):
+    """Raised by transports; retryable errors are retried with backoff"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def format_alert_text(rule: Dict[str, Any], opportunity: Dict[str, Any]) -> str:
+    return (
+        f"ArbLens alert '{rule.get('name')}': {float(opportunity['net_spread_pct']):.2f}% net spread\n"
+        f"{opportunity.get('venue_a_name')} ({opportunity.get('venue_a_side')}) vs "
+        f"{opportunity.get('venue_b_name')} ({opportunity.get('venue_b_side')})\n"
+        f"{opportunity.get('market_a_title')}\n"
+        f"Max tradable: ${float(opportunity.get('max_tradable_amount') or 0):,.2f}"
+    )
+
+
+def alert_payload(rule: Dict[str, Any], opportunity: Dict[str, Any]) -> Dict[str, Any]:
+    payload = {"alert_rule_id": str(rule['id']), "alert_name": rule.get('name')}
+    for key, value in opportunity.items():
+        if hasattr(value, '__float__'):
+            payload[key] = float(value)
+        elif isinstance(value, datetime):
+            payload[key] = value.isoformat()
+        else:
+            payload[key] = str(value) if value is not None and not isinstance(value, str) else value
+    return payload
+
+
+class AlertTransport:
+    """Delivers one alert to one recipient"""
+
+    alert_type = ""
+
+    async def send(self, recipient: str, rule: Dict[str, Any], opportunity: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class HttpTransport(AlertTransport):
+    """Shared aiohttp session with a per-host connection pool"""
+
+    def __init__(self, limit: int = 200, limit_per_host: int = 20, timeout: float = 10.0):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self._session = None
+
+    def session(self):
+        # aiohttp is imported on first delivery; it is slow to import and
+        # most API processes never send an HTTP alert
+        import aiohttp
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def post_json(self, url: str, payload: Dict[str, Any]):
+        import aiohttp
+        try:
+            async with self.session().post(url, json=payload) as response:
+                if response.status >= 500 or response.status == 429:
+                    raise DeliveryError(f"HTTP {response.status}")
+                if response.status >= 400:
+                    raise DeliveryError(f"HTTP {response.status}", retryable=False)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise DeliveryError(f"{type(e).__name__}: {e}")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class WebhookTransport(HttpTransport):
+    alert_type = "webhook"
+
+    async def send(self, recipient: str, rule: Dict[str, Any], opportunity: Dict[str, Any]):
+        await self.post_json(recipient, alert_payload(rule, opportunity))
+
+
+class TelegramTransport(HttpTransport):
+    alert_type = "telegram"
+
+    def __init__(self, bot_token: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.bot_token = bot_token or os.getenv("TELEGRAM_BOT_TOKEN")
+
+    async def send(self, recipient: str, rule: Dict[str, Any], opportunity: Dict[str, Any]):
+        if not self.bot_token:
+            raise DeliveryError("TELEGRAM_BOT_TOKEN not configured", retryable=False)
+        await self.post_json(
+            f"https://api.telegram.org/bot{self.bot_token}/sendMessage",
+            {"chat_id": recipient, "text": format_alert_text(rule, opportunity)}
+        )
+
+
+class EmailTransport(AlertTransport):
+    """SMTP delivery; the blocking smtplib call runs in a worker thread"""
+
+    alert_type = "email"
+
+    def __init__(self):
+        self.host = os.getenv("SMTP_HOST")
+        self.port = int(os.getenv("SMTP_PORT", 587))
+        self.username = os.getenv("SMTP_USERNAME")
+        self.password = os.getenv("SMTP_PASSWORD")
+        self.sender = os.getenv("ALERT_EMAIL_FROM", "alerts@arblens.com")
+
+    def _send_sync(self, recipient: str, subject: str, body: str):
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = recipient
+        message["Subject"] = subject
+        message.set_content(body)
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+    async def send(self, recipient: str, rule: Dict[str, Any], opportunity: Dict[str, Any]):
+        if not self.host:
+            raise DeliveryError("SMTP_HOST not configured", retryable=False)
+        try:
+            await asyncio.to_thread(
+                self._send_sync, recipient,
+                f"ArbLens alert: {rule.get('name')}",
+                format_alert_text(rule, opportunity)
+            )
+        except smtplib.SMTPRecipientsRefused as e:
+            raise DeliveryError(str(e), retryable=False)
+        except (smtplib.SMTPException, OSError) as e:
+            raise DeliveryError(str(e))
+
+
+class FakeTransport(AlertTransport):
+    """In-memory transport for local runs and tests
+
+    `fail_times` makes the first N sends to a recipient fail with a
+    retryable error.
+    """
+
+    def __init__(self, alert_type: str, fail_times: int = 0, latency: float = 0.0):
+        self.alert_type = alert_type
+        self.fail_times = fail_times
+        self.latency = latency
+        self.sent: List[Tuple[str, str, str]] = []
+        self._attempts: Dict[str, int] = {}
+
+    async def send(self, recipient: str, rule: Dict[str, Any], opportunity: Dict[str, Any]):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        attempts = self._attempts[recipient] = self._attempts.get(recipient, 0) + 1
+        if attempts <= self.fail_times:
+            raise DeliveryError(f"fake failure {attempts}")
+        self.sent.append((recipient, str(rule['id']), str(opportunity['id'])))
+
+
+class AlertDispatcher:
+    """Queues matched alerts and delivers them without blocking the API
+
+    Deliveries go through an asyncio queue drained by worker tasks, with a
+    concurrency cap per alert type and jittered exponential backoff on
+    retryable failures. Each rule is throttled by last_triggered_at, which
+    is claimed in the database before anything is queued, so with several
+    API workers only one of them sends each alert. Each (rule, opportunity)
+    pair is also sent at most once per process. Outcomes are buffered and
+    written to alert_triggers in bulk.
+    """
+
+    def __init__(self, transports: Optional[Dict[str, AlertTransport]] = None,
+                 workers: int = 256, concurrency_per_type: int = 128, max_attempts: int = 4,
+                 base_backoff: float = 0.5, max_backoff: float = 30.0,
+                 min_interval_seconds: float = 60.0, flush_interval: float = 1.0,
+                 flush_batch_size: int = 1000, queue_size: int = 100000):
+        self.transports = transports if transports is not None else {
+            "webhook": WebhookTransport(),
+            "telegram": TelegramTransport(),
+            "email": EmailTransport(),
+        }
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.min_interval = timedelta(seconds=min_interval_seconds)
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._limits = {name: asyncio.Semaphore(concurrency_per_type) for name in self.transports}
+        self._sent_pairs: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._max_sent_pairs = 100000
+        self._outcomes: List[Tuple] = []
+        self._tasks: List[asyncio.Task] = []
+        self._retries: set = set()
+        self.database_url: Optional[str] = None
+        self.pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "throttled": 0, "dropped": 0, "retries": 0}
+
+    def _throttled(self, rule: Dict[str, Any], now: datetime) -> bool:
+        last = rule.get('last_triggered_at')
+        return last is not None and now - last < self.min_interval
+
+    def _deliveries(self, rule: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """(alert_type, recipient) for every configured channel of a rule"""
+        deliveries = []
+        for alert_type in rule.get('alert_types') or ["email"]:
+            recipient = rule.get(RECIPIENT_COLUMNS.get(alert_type, ""))
+            if recipient and alert_type in self.transports:
+                deliveries.append((alert_type, recipient))
+        return deliveries
+
+    def enqueue(self, rule: Dict[str, Any], opportunity: Dict[str, Any]) -> int:
+        """Queue every configured channel of a claimed rule for one opportunity"""
+        queued = 0
+        for alert_type, recipient in self._deliveries(rule):
+            try:
+                self.queue.put_nowait((alert_type, recipient, rule, opportunity, 1))
+                queued += 1
+            except asyncio.QueueFull:
+                self.stats["dropped"] += 1
+        if queued:
+            # The database copy was advanced by the claim
+            rule['last_triggered_at'] = datetime.now(timezone.utc)
+            self._sent_pairs[(str(rule['id']), str(opportunity['id']))] = None
+            if len(self._sent_pairs) > self._max_sent_pairs:
+                self._sent_pairs.popitem(last=False)
+            self.stats["queued"] += queued
+        return queued
+
+    async def claim(self, rule_ids: List[str]) -> set:
+        """Rule ids whose last_triggered_at this process advanced, i.e. may alert on now
+
+        Without a database every rule is claimed. If the claim fails the
+        alerts are dropped rather than risk every worker sending them.
+        """
+        if not self.database_url:
+            return set(rule_ids)
+        try:
+            pool = await self._ensure_pool()
+            async with pool.acquire() as conn:
+                rows = await conn.fetch(CLAIM_RULES_QUERY, rule_ids, self.min_interval.total_seconds())
+        except Exception as e:
+            print(f"❌ Alert claim failed, dropping {len(rule_ids)} alerts: {e}")
+            self.stats["dropped"] += len(rule_ids)
+            return set()
+        return {row['id'] for row in rows}
+
+    async def handle_matches(self, opportunities: List[Dict[str, Any]], rules: List[List[Dict[str, Any]]]):
+        """AlertEngine handler: claim every matched rule, then queue its deliveries"""
+        now = datetime.now(timezone.utc)
+        candidates: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        for opportunity, matched in zip(opportunities, rules):
+            for rule in matched:
+                rule_id = str(rule['id'])
+                if rule_id in candidates or (rule_id, str(opportunity['id'])) in self._sent_pairs:
+                    continue
+                if self._throttled(rule, now):
+                    self.stats["throttled"] += 1
+                elif self._deliveries(rule):
+                    # One opportunity per rule and batch; the throttle covers the rest
+                    candidates[rule_id] = (rule, opportunity)
+        if not candidates:
+            return
+        claimed = await self.claim(list(candidates))
+        for rule_id, (rule, opportunity) in candidates.items():
+            if rule_id in claimed:
+                self.enqueue(rule, opportunity)
+            elif self.database_url:
+                # Another worker claimed it; throttle locally until the interval passes
+                rule['last_triggered_at'] = now
+                self.stats["throttled"] += 1
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retries from many deliveries from synchronizing
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1)))
+
+    async def _retry_later(self, item: Tuple, delay: float):
+        await asyncio.sleep(delay)
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            alert_type, recipient, rule, opportunity, attempt = item
+            self._record(rule, opportunity, alert_type, recipient, "failed", "dropped: delivery queue full")
+
+    def _record(self, rule, opportunity, alert_type, recipient, status, error=None):
+        self.stats["sent" if status == "sent" else "failed"] += 1
+        self._outcomes.append((
+            rule['id'], opportunity['id'], alert_type, recipient,
+            datetime.now(timezone.utc), status, error
+        ))
+
+    async def _deliver(self, item: Tuple):
+        alert_type, recipient, rule, opportunity, attempt = item
+        try:
+            async with self._limits[alert_type]:
+                await self.transports[alert_type].send(recipient, rule, opportunity)
+            self._record(rule, opportunity, alert_type, recipient, "sent")
+        except DeliveryError as e:
+            if e.retryable and attempt < self.max_attempts:
+                self.stats["retries"] += 1
+                task = asyncio.create_task(self._retry_later(
+                    (alert_type, recipient, rule, opportunity, attempt + 1), self._backoff(attempt)
+                ))
+                self._retries.add(task)
+                task.add_done_callback(self._retries.discard)
+            else:
+                self._record(rule, opportunity, alert_type, recipient, "failed", str(e))
+        except Exception as e:
+            self._record(rule, opportunity, alert_type, recipient, "failed", f"{type(e).__name__}: {e}")
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            try:
+                await self._deliver(item)
+            finally:
+                self.queue.task_done()
+
+    async def flush(self, conn: Optional[asyncpg.Connection] = None) -> int:
+        """Bulk-insert buffered outcomes"""
+        outcomes, self._outcomes = self._outcomes, []
+        if not outcomes:
+            return 0
+        if conn is None and self.pool is None:
+            return 0
+
+        async def write(connection: asyncpg.Connection):
+            columns = list(zip(*outcomes))
+            await connection.execute(
+                """
+                INSERT INTO alert_triggers (
+                    alert_rule_id, opportunity_id, alert_type, recipient,
+                    sent_at, delivery_status, error_message
+                )
+                SELECT * FROM unnest(
+                    $1::uuid[], $2::uuid[], $3::alert_type[], $4::text[],
+                    $5::timestamptz[], $6::text[], $7::text[]
+                )
+                """,
+                *[list(column) for column in columns]
+            )
+
+        try:
+            if conn is not None:
+                await write(conn)
+            else:
+                async with self.pool.acquire() as connection:
+                    await write(connection)
+        except Exception:
+            # Keep the outcomes for the next flush rather than losing the log
+            self._outcomes = outcomes + self._outcomes
+            raise
+        return len(outcomes)
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                while self._outcomes:
+                    await self.flush()
+                    if len(self._outcomes) < self.flush_batch_size:
+                        break
+            except Exception as e:
+                print(f"❌ Alert delivery flush error: {e}")
+
+    def start(self, database_url: Optional[str] = None):
+        """Start delivery workers and, with a database, the outcome flusher"""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if database_url:
+            self.database_url = database_url
+            self._tasks.append(asyncio.create_task(self._start_flusher()))
+
+    async def _ensure_pool(self) -> asyncpg.Pool:
+        async with self._pool_lock:
+            if self.pool is None:
+                self.pool = await asyncpg.create_pool(
+                    self.database_url, min_size=1, max_size=2,
+                    server_settings={'application_name': 'arblens_alert_delivery'}
+                )
+        return self.pool
+
+    async def _start_flusher(self):
+        while True:
+            try:
+                await self._ensure_pool()
+                break
+            except Exception as e:
+                print(f"❌ Alert delivery could not connect: {e}")
+                await asyncio.sleep(5.0)
+        await self._flusher()
+
+    async def stop(self):
+        tasks = self._tasks + list(self._retries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        if self.pool is not None:
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Alert delivery final flush failed: {e}")
+            await self.pool.close()
+            self.pool = None
+        for transport in self.transports.values():
+            await transport.close()
+
+
+# Global alert dispatcher instance
+alert_dispatcher = AlertDispatcher()
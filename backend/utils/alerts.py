@@ -0,0 +1,339 @@
+import asyncio
+from typing import Optional, List, Dict, Any, Callable, Awaitable
+
+import asyncpg
+import numpy as np
+
+ALERT_RULES_CHANNEL = "alert_rules_changed"
+OPPORTUNITY_CREATED_CHANNEL = "opportunity_created"
+
+RULE_COLUMNS = """
+    id, user_id, name, min_spread_pct, min_liquidity_usd, venue_filter, category_filter,
+    alert_types, email_address, telegram_chat_id, webhook_url, status, last_triggered_at
+"""
+
+OPPORTUNITY_MATCH_QUERY = """
+SELECT ao.id, ao.pair_id, ao.net_spread_pct, ao.max_tradable_amount, ao.expected_profit_usd,
+       ao.venue_a_side, ao.venue_b_side, ao.venue_a_price, ao.venue_b_price, ao.created_at,
+       ma.title as market_a_title, ma.category as market_a_category,
+       mb.title as market_b_title, mb.category as market_b_category,
+       va.name as venue_a_name, vb.name as venue_b_name
+FROM arbitrage_opportunities ao
+JOIN market_pairs mp ON ao.pair_id = mp.id
+JOIN markets ma ON mp.market_a_id = ma.id
+JOIN markets mb ON mp.market_b_id = mb.id
+JOIN venues va ON ma.venue_id = va.id
+JOIN venues vb ON mb.venue_id = vb.id
+WHERE ao.id = ANY($1::uuid[]) AND ao.status = 'active'
+"""
+
+
+class AlertRuleIndex:
+    """In-memory index of active alert rules, updated incrementally
+
+    Each rule lives in a slot of flat threshold arrays and per-value
+    venue/category posting masks. Rules with an empty filter match every
+    venue or category. Spread and liquidity thresholds are also kept
+    sorted, so the rules an opportunity clears on each bound are a prefix
+    found by binary search, and only the smaller prefix is scanned.
+
+    Changes never rebuild the index: a new or edited rule takes a fresh slot
+    that is scanned linearly until the next compaction, and the old slot is
+    tombstoned. Compaction re-sorts the live slots with numpy (no per-rule
+    Python) once max_pending slots are unsorted or a quarter of the slots
+    are dead, and only then are dead slots reused.
+    """
+
+    def __init__(self, capacity: int = 1024, max_pending: int = 512):
+        self.max_pending = max_pending
+        self.rules: Dict[str, Dict[str, Any]] = {}
+        self._slots: Dict[str, int] = {}
+        self._slot_ids = np.empty(capacity, dtype=object)
+        self.spread_threshold = np.zeros(capacity, dtype=np.float64)
+        self.liquidity_threshold = np.zeros(capacity, dtype=np.float64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.venue_any = np.zeros(capacity, dtype=bool)
+        self.category_any = np.zeros(capacity, dtype=bool)
+        self.venue_postings: Dict[str, np.ndarray] = {}
+        self.category_postings: Dict[str, np.ndarray] = {}
+        self._empty = np.zeros(capacity, dtype=bool)
+        self._used = 0
+        self._free: List[int] = []
+        self._dead: List[int] = []
+        self._pending: List[int] = []
+        self._pending_array = np.empty(0, dtype=np.int64)
+        self.spread_order = np.empty(0, dtype=np.int64)
+        self.spread_sorted = np.empty(0, dtype=np.float64)
+        self.liquidity_order = np.empty(0, dtype=np.int64)
+        self.liquidity_sorted = np.empty(0, dtype=np.float64)
+        self.compactions = 0
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def upsert(self, rule: Dict[str, Any]):
+        """Add or replace a rule; inactive rules are removed"""
+        rule_id = str(rule['id'])
+        self.remove(rule_id)
+        if rule.get('status', 'active') != 'active':
+            return
+        slot = self._allocate()
+        self.rules[rule_id] = rule
+        self._slots[rule_id] = slot
+        self._slot_ids[slot] = rule_id
+        self.spread_threshold[slot] = float(rule['min_spread_pct'] or 0)
+        self.liquidity_threshold[slot] = float(rule['min_liquidity_usd'] or 0)
+        self.alive[slot] = True
+        for key, any_mask, postings in (
+            ('venue_filter', self.venue_any, self.venue_postings),
+            ('category_filter', self.category_any, self.category_postings),
+        ):
+            values = rule.get(key) or []
+            any_mask[slot] = not values
+            for value in values:
+                mask = postings.get(value)
+                if mask is None:
+                    mask = postings[value] = np.zeros(len(self.alive), dtype=bool)
+                mask[slot] = True
+        self._pending.append(slot)
+        self._pending_array = None
+
+    def remove(self, rule_id: str):
+        rule_id = str(rule_id)
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return
+        slot = self._slots.pop(rule_id)
+        self.alive[slot] = False
+        self._slot_ids[slot] = None
+        for key, postings in (('venue_filter', self.venue_postings), ('category_filter', self.category_postings)):
+            for value in rule.get(key) or []:
+                postings[value][slot] = False
+        # Sorted arrays still point at the slot; it is reused after compaction
+        self._dead.append(slot)
+
+    def replace_all(self, rules: List[Dict[str, Any]]):
+        self.__init__(capacity=max(1024, len(rules)), max_pending=self.max_pending)
+        for rule in rules:
+            self.upsert(rule)
+        self._compact()
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._used == len(self.alive):
+            self._grow(2 * len(self.alive))
+        self._used += 1
+        return self._used - 1
+
+    def _grow(self, capacity: int):
+        def grown(array, fill):
+            out = np.full(capacity, fill, dtype=array.dtype)
+            out[:len(array)] = array
+            return out
+
+        self._slot_ids = grown(self._slot_ids, None)
+        self.spread_threshold = grown(self.spread_threshold, 0.0)
+        self.liquidity_threshold = grown(self.liquidity_threshold, 0.0)
+        self.alive = grown(self.alive, False)
+        self.venue_any = grown(self.venue_any, False)
+        self.category_any = grown(self.category_any, False)
+        for postings in (self.venue_postings, self.category_postings):
+            for value, mask in postings.items():
+                postings[value] = grown(mask, False)
+        self._empty = np.zeros(capacity, dtype=bool)
+
+    def _compact(self):
+        """Re-sort the live slots and release dead ones for reuse"""
+        live = np.flatnonzero(self.alive[:self._used])
+        self.spread_order = live[np.argsort(self.spread_threshold[live], kind="stable")]
+        self.spread_sorted = self.spread_threshold[self.spread_order]
+        self.liquidity_order = live[np.argsort(self.liquidity_threshold[live], kind="stable")]
+        self.liquidity_sorted = self.liquidity_threshold[self.liquidity_order]
+        self._free.extend(self._dead)
+        self._dead = []
+        self._pending = []
+        self._pending_array = np.empty(0, dtype=np.int64)
+        self.compactions += 1
+
+    def _filter_mask(self, candidates: np.ndarray, any_mask: np.ndarray,
+                     postings: Dict[str, np.ndarray], values: List[Optional[str]]) -> np.ndarray:
+        mask = any_mask[candidates]
+        for value in set(values):
+            if value is not None:
+                mask = mask | postings.get(value, self._empty)[candidates]
+        return mask
+
+    def match(self, opportunity: Dict[str, Any]) -> List[str]:
+        """Ids of rules matched by an opportunity"""
+        if len(self._pending) > self.max_pending or len(self._dead) > max(self.max_pending, len(self.rules) // 4):
+            self._compact()
+        if not self.rules:
+            return []
+
+        spread = float(opportunity['net_spread_pct'] or 0)
+        liquidity = float(opportunity['max_tradable_amount'] or 0)
+        k_spread = int(np.searchsorted(self.spread_sorted, spread, side="right"))
+        k_liquidity = int(np.searchsorted(self.liquidity_sorted, liquidity, side="right"))
+        if k_spread <= k_liquidity:
+            candidates = self.spread_order[:k_spread]
+        else:
+            candidates = self.liquidity_order[:k_liquidity]
+        if self._pending:
+            if self._pending_array is None:
+                self._pending_array = np.array(self._pending, dtype=np.int64)
+            candidates = np.concatenate((candidates, self._pending_array))
+        keep = (
+            self.alive[candidates]
+            & (self.spread_threshold[candidates] <= spread)
+            & (self.liquidity_threshold[candidates] <= liquidity)
+        )
+        candidates = candidates[keep]
+        if not len(candidates):
+            return []
+
+        keep = self._filter_mask(
+            candidates, self.venue_any, self.venue_postings,
+            [opportunity.get('venue_a_name'), opportunity.get('venue_b_name')]
+        )
+        keep &= self._filter_mask(
+            candidates, self.category_any, self.category_postings,
+            [opportunity.get('market_a_category'), opportunity.get('market_b_category')]
+        )
+        return self._slot_ids[candidates[keep]].tolist()
+
+    def match_batch(self, opportunities: List[Dict[str, Any]]) -> List[List[str]]:
+        """Matched rule ids for each opportunity in a batch"""
+        return [self.match(opportunity) for opportunity in opportunities]
+
+
+MatchHandler = Callable[[List[Dict[str, Any]], List[List[Dict[str, Any]]]], Awaitable[None]]
+
+
+class AlertEngine:
+    """Keeps the rule index current and evaluates newly created opportunities
+
+    Rule changes and opportunity inserts arrive on NOTIFY channels. Rule
+    changes only re-read the affected rows; new opportunities are collected
+    for a short window and matched as one batch.
+    """
+
+    def __init__(self, batch_window: float = 0.25, retry_delay: float = 5.0):
+        self.batch_window = batch_window
+        self.retry_delay = retry_delay
+        self.index = AlertRuleIndex()
+        self.conn: Optional[asyncpg.Connection] = None
+        self.handlers: List[MatchHandler] = []
+        self._changed_rules: set = set()
+        self._new_opportunities: List[str] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.matched_total = 0
+
+    def add_handler(self, handler: MatchHandler):
+        """Register a coroutine receiving (opportunities, matched rules per opportunity)"""
+        self.handlers.append(handler)
+
+    def _on_rule_change(self, connection, pid, channel, payload):
+        self._changed_rules.add(payload)
+        self._wakeup.set()
+
+    def _on_opportunity_created(self, connection, pid, channel, payload):
+        self._new_opportunities.append(payload)
+        self._wakeup.set()
+
+    async def load(self, conn: asyncpg.Connection) -> int:
+        """Load every active rule"""
+        rows = await conn.fetch(f"SELECT {RULE_COLUMNS} FROM alert_rules WHERE status = 'active'")
+        self.index.replace_all([dict(row) for row in rows])
+        return len(rows)
+
+    async def reload_rules(self, conn: asyncpg.Connection, rule_ids: List[str]):
+        """Re-read only the rules that changed; missing rows were deleted"""
+        rows = await conn.fetch(
+            f"SELECT {RULE_COLUMNS} FROM alert_rules WHERE id = ANY($1::uuid[])",
+            rule_ids
+        )
+        found = set()
+        for row in rows:
+            found.add(str(row['id']))
+            self.index.upsert(dict(row))
+        for rule_id in set(rule_ids) - found:
+            self.index.remove(rule_id)
+
+    async def evaluate(self, conn: asyncpg.Connection, opportunity_ids: List[str]) -> int:
+        """Match a batch of new opportunities and pass hits to the handlers"""
+        rows = await conn.fetch(OPPORTUNITY_MATCH_QUERY, opportunity_ids)
+        opportunities = [dict(row) for row in rows]
+        matches = self.index.match_batch(opportunities)
+        hits = [(opp, ids) for opp, ids in zip(opportunities, matches) if ids]
+        if not hits:
+            return 0
+        matched_opportunities = [opp for opp, _ in hits]
+        matched_rules = [[self.index.rules[rule_id] for rule_id in ids] for _, ids in hits]
+        self.matched_total += sum(len(ids) for _, ids in hits)
+        for handler in self.handlers:
+            try:
+                await handler(matched_opportunities, matched_rules)
+            except Exception as e:
+                print(f"❌ Alert handler error: {e}")
+        return len(hits)
+
+    async def _connect(self, database_url: str):
+        self.conn = await asyncpg.connect(
+            database_url,
+            timeout=30.0,
+            server_settings={'application_name': 'arblens_alerts'}
+        )
+        await self.conn.add_listener(ALERT_RULES_CHANNEL, self._on_rule_change)
+        await self.conn.add_listener(OPPORTUNITY_CREATED_CHANNEL, self._on_opportunity_created)
+        loaded = await self.load(self.conn)
+        print(f"🔔 Alert engine loaded {loaded} active rules")
+
+    async def _run(self, database_url: str):
+        while True:
+            try:
+                if self.conn is None or self.conn.is_closed():
+                    await self._connect(database_url)
+
+                await self._wakeup.wait()
+                # Let inserts from the same ingestion cycle accumulate
+                await asyncio.sleep(self.batch_window)
+                self._wakeup.clear()
+
+                if self._changed_rules:
+                    changed, self._changed_rules = list(self._changed_rules), set()
+                    await self.reload_rules(self.conn, changed)
+                if self._new_opportunities:
+                    new, self._new_opportunities = self._new_opportunities, []
+                    await self.evaluate(self.conn, new)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Alert engine error: {e}")
+                if self.conn is not None and not self.conn.is_closed():
+                    await self.conn.close()
+                self.conn = None
+                await asyncio.sleep(self.retry_delay)
+
+    def start(self, database_url: str):
+        """Start listening for rule changes and new opportunities"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(database_url))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.conn is not None and not self.conn.is_closed():
+            await self.conn.close()
+        self.conn = None
+
+
+# Global alert engine instance
+alert_engine = AlertEngine()
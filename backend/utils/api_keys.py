@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional, Dict
+
+import asyncpg
+
+from utils.shared_state import shared_state
+
+API_KEYS_CHANNEL = "api_keys_changed"
+
+# Paths that never require a key
+PUBLIC_PATHS = {"/", "/health", "/health/ready", "/docs", "/redoc", "/openapi.json"}
+
+
+def hash_api_key(raw_key: str) -> str:
+    """api_keys.key_hash is the hex SHA-256 of the raw key"""
+    return hashlib.sha256(raw_key.encode()).hexdigest()
+
+
+def extract_api_key(headers) -> Optional[str]:
+    """Read the key from X-API-Key or an `Authorization: Bearer arb_...` header"""
+    key = headers.get("x-api-key")
+    if key:
+        return key.strip()
+    authorization = headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+        if token.startswith("arb_"):
+            return token
+    return None
+
+
+class ApiKeyEntry:
+    """Verified api_keys row cached in memory"""
+
+    __slots__ = ("id", "user_id", "tier", "rate_limit_per_minute", "expires_at")
+
+    def __init__(self, row):
+        self.id = str(row['id'])
+        self.user_id = str(row['user_id']) if row['user_id'] else None
+        self.tier = row['tier']
+        self.rate_limit_per_minute = row['rate_limit_per_minute'] or 60
+        self.expires_at = row['expires_at'].timestamp() if row['expires_at'] else None
+
+    def expired(self, now: float) -> bool:
+        return self.expires_at is not None and now >= self.expires_at
+
+
+class AuthResult:
+    __slots__ = ("status_code", "detail", "entry", "retry_after", "remaining")
+
+    def __init__(self, status_code: int = 200, detail: str = "", entry: Optional[ApiKeyEntry] = None,
+                 retry_after: float = 0.0, remaining: float = 0.0):
+        self.status_code = status_code
+        self.detail = detail
+        self.entry = entry
+        self.retry_after = retry_after
+        self.remaining = remaining
+
+
+class ApiKeyAuthenticator:
+    """API-key verification with an LRU cache and token-bucket rate limiting
+
+    Verified key hashes stay cached so the hot path is a hash plus a dict
+    lookup. Unknown hashes are negatively cached briefly. last_used_at
+    updates are coalesced per key and flushed in one statement every few
+    seconds. Revocations and edits arrive on the `api_keys_changed` channel
+    and evict the cached entry. Buckets live in shared_state, so limits hold
+    across workers when Redis is configured.
+    """
+
+    def __init__(self, cache_size: int = 10000, negative_ttl: float = 30.0,
+                 flush_interval: float = 5.0, required: Optional[bool] = None):
+        self.cache_size = cache_size
+        self.negative_ttl = negative_ttl
+        self.flush_interval = flush_interval
+        self.required = (os.getenv("API_KEY_REQUIRED", "false").lower() == "true") if required is None else required
+        self._cache: "OrderedDict[str, ApiKeyEntry]" = OrderedDict()
+        self._negative: Dict[str, float] = {}
+        self._last_used: Dict[str, datetime] = {}
+        self.pool: Optional[asyncpg.Pool] = None
+        self.listener: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "misses": 0, "rejected": 0, "rate_limited": 0}
+
+    def invalidate(self, key_hash: str):
+        self._cache.pop(key_hash, None)
+        self._negative.pop(key_hash, None)
+
+    def _on_change(self, connection, pid, channel, payload):
+        self.invalidate(payload)
+
+    async def _lookup(self, key_hash: str) -> Optional[ApiKeyEntry]:
+        if self.pool is None:
+            return None
+        row = await self.pool.fetchrow(
+            """
+            SELECT id, user_id, tier, rate_limit_per_minute, expires_at
+            FROM api_keys
+            WHERE key_hash = $1 AND is_active = true
+            """,
+            key_hash
+        )
+        return ApiKeyEntry(row) if row else None
+
+    async def authenticate(self, raw_key: Optional[str]) -> AuthResult:
+        """Verify a key and charge one request against its bucket"""
+        if not raw_key:
+            if self.required:
+                self.stats["rejected"] += 1
+                return AuthResult(401, "API key required")
+            return AuthResult()
+
+        now = time.time()
+        key_hash = hash_api_key(raw_key)
+        entry = self._cache.get(key_hash)
+        if entry is not None:
+            self.stats["hits"] += 1
+            self._cache.move_to_end(key_hash)
+        else:
+            negative_until = self._negative.get(key_hash)
+            if negative_until is not None and negative_until > now:
+                self.stats["rejected"] += 1
+                return AuthResult(401, "Invalid API key")
+            if self.pool is None:
+                return AuthResult(503, "API key verification unavailable")
+            self.stats["misses"] += 1
+            entry = await self._lookup(key_hash)
+            if entry is None:
+                self._negative[key_hash] = now + self.negative_ttl
+                if len(self._negative) > self.cache_size:
+                    self._negative = {k: v for k, v in self._negative.items() if v > now}
+                self.stats["rejected"] += 1
+                return AuthResult(401, "Invalid API key")
+            self._cache[key_hash] = entry
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        if entry.expired(now):
+            self.invalidate(key_hash)
+            self.stats["rejected"] += 1
+            return AuthResult(401, "API key expired")
+
+        limit = entry.rate_limit_per_minute
+        allowed, retry_after, remaining = await shared_state.take_token(entry.id, limit, limit / 60.0)
+        if not allowed:
+            self.stats["rate_limited"] += 1
+            return AuthResult(429, "Rate limit exceeded", entry, retry_after, remaining)
+
+        self._last_used[entry.id] = datetime.now(timezone.utc)
+        return AuthResult(200, "", entry, 0.0, remaining)
+
+    async def flush_last_used(self) -> int:
+        """Write coalesced last_used_at values in a single UPDATE"""
+        if not self._last_used or self.pool is None:
+            return 0
+        pending, self._last_used = self._last_used, {}
+        try:
+            await self.pool.execute(
+                """
+                UPDATE api_keys ak
+                SET last_used_at = t.used_at
+                FROM unnest($1::uuid[], $2::timestamptz[]) AS t(id, used_at)
+                WHERE ak.id = t.id
+                """,
+                list(pending), list(pending.values())
+            )
+        except Exception:
+            for key_id, used_at in pending.items():
+                self._last_used.setdefault(key_id, used_at)
+            raise
+        return len(pending)
+
+    async def _run(self, database_url: str):
+        while True:
+            try:
+                if self.pool is None:
+                    self.pool = await asyncpg.create_pool(
+                        database_url, min_size=1, max_size=4,
+                        server_settings={'application_name': 'arblens_api_keys'}
+                    )
+                if self.listener is None or self.listener.is_closed():
+                    self.listener = await asyncpg.connect(database_url, timeout=30.0)
+                    await self.listener.add_listener(API_KEYS_CHANNEL, self._on_change)
+                    # Anything may have changed while we were not listening
+                    self._cache.clear()
+                    self._negative.clear()
+                await asyncio.sleep(self.flush_interval)
+                await self.flush_last_used()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ API key service error: {e}")
+                await asyncio.sleep(self.flush_interval)
+
+    def start(self, database_url: str):
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(database_url))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush_last_used()
+        except Exception as e:
+            print(f"❌ Final last_used_at flush failed: {e}")
+        if self.listener is not None and not self.listener.is_closed():
+            await self.listener.close()
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+
+# Global API key authenticator
+api_key_auth = ApiKeyAuthenticator()
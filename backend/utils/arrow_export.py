@@ -0,0 +1,230 @@
+import os
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+
+import asyncpg
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from utils.exports import EXPORT_CHUNK_SIZE, EXPORT_COLUMNS, export_query
+from utils.reference_data import reference_data
+
+# Output column -> (table, column) it is read from; None means a string
+# filled in from the reference cache
+OPPORTUNITY_SOURCES: Dict[str, Optional[Tuple[str, str]]] = {
+    column: ("arbitrage_opportunities", column) for column in EXPORT_COLUMNS
+}
+OPPORTUNITY_SOURCES.update({
+    "confidence_score": ("market_pairs", "confidence_score"),
+    "market_a_id": ("market_pairs", "market_a_id"),
+    "market_b_id": ("market_pairs", "market_b_id"),
+    "market_a_title": None, "market_a_category": None, "venue_a_name": None, "venue_a_type": None,
+    "market_b_title": None, "market_b_category": None, "venue_b_name": None, "venue_b_type": None,
+})
+
+TICK_COLUMNS = ["market_id", "ts", "yes_price", "no_price", "yes_liquidity", "no_liquidity"]
+
+TICK_SOURCES: Dict[str, Optional[Tuple[str, str]]] = {
+    column: ("market_price_ticks", column) for column in TICK_COLUMNS
+}
+
+TICK_QUERY = """
+SELECT market_id, ts, yes_price, no_price, yes_liquidity, no_liquidity
+FROM market_price_ticks
+WHERE ts BETWEEN $1 AND $2
+"""
+
+COLUMN_TYPES_QUERY = """
+SELECT column_name, data_type, numeric_precision, numeric_scale
+FROM information_schema.columns
+WHERE table_schema = 'public' AND table_name = $1
+"""
+
+_column_types: Dict[str, Dict[str, Any]] = {}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed; install it to use Arrow/Parquet exports")
+
+
+def arrow_type(data_type: str, precision: Optional[int] = None, scale: Optional[int] = None):
+    """Arrow type for an information_schema data_type
+
+    DECIMAL(p,s) keeps its exact precision; unconstrained numeric falls back
+    to float64. UUIDs and enums become strings.
+    """
+    if data_type == "numeric":
+        return pa.decimal128(precision, scale or 0) if precision else pa.float64()
+    if data_type == "timestamp with time zone":
+        return pa.timestamp("us", tz="UTC")
+    return {
+        "timestamp without time zone": pa.timestamp("us"),
+        "date": pa.date32(),
+        "integer": pa.int32(),
+        "bigint": pa.int64(),
+        "smallint": pa.int16(),
+        "boolean": pa.bool_(),
+        "double precision": pa.float64(),
+        "real": pa.float32(),
+    }.get(data_type, pa.string())
+
+
+async def table_column_types(conn: asyncpg.Connection, table: str) -> Dict[str, Any]:
+    """Arrow types for a table's columns, read once from information_schema"""
+    types = _column_types.get(table)
+    if types is None:
+        rows = await conn.fetch(COLUMN_TYPES_QUERY, table)
+        types = _column_types[table] = {
+            row['column_name']: arrow_type(row['data_type'], row['numeric_precision'], row['numeric_scale'])
+            for row in rows
+        }
+    return types
+
+
+async def build_schema(conn: asyncpg.Connection, sources: Dict[str, Optional[Tuple[str, str]]]):
+    require_pyarrow()
+    fields = []
+    for name, source in sources.items():
+        if source is None:
+            fields.append(pa.field(name, pa.string()))
+        else:
+            types = await table_column_types(conn, source[0])
+            fields.append(pa.field(name, types.get(source[1], pa.string())))
+    return pa.schema(fields)
+
+
+def record_batch(rows: List[Dict[str, Any]], schema) -> Any:
+    """Column-wise Arrow batch; Decimal and datetime values are stored as-is"""
+    return pa.record_batch(
+        [pa.array([row[field.name] for row in rows], type=field.type) for field in schema],
+        schema=schema
+    )
+
+
+async def _use_text_uuids(conn: asyncpg.Connection):
+    # Skips building uuid.UUID objects that Arrow would only turn back into strings
+    await conn.set_type_codec('uuid', encoder=str, decoder=str, schema='pg_catalog', format='text')
+
+
+async def iter_opportunity_batches(conn: asyncpg.Connection, start: datetime, end: datetime,
+                                   status: Optional[str] = None, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Arrow schema and an async iterator of record batches of enriched opportunities"""
+    schema = await build_schema(conn, OPPORTUNITY_SOURCES)
+    await _use_text_uuids(conn)
+    await reference_data.ensure_loaded(conn)
+
+    async def batches() -> AsyncIterator[Any]:
+        query = export_query(status)
+        params = [start, end] + ([status] if status else [])
+        async with conn.transaction(readonly=True):
+            cursor = await conn.cursor(query, *params)
+            while True:
+                rows = await cursor.fetch(chunk_size)
+                if not rows:
+                    break
+                await reference_data.fill_markets(
+                    conn, [row['market_a_id'] for row in rows] + [row['market_b_id'] for row in rows]
+                )
+                yield record_batch([reference_data.enrich_opportunity(dict(row)) for row in rows], schema)
+
+    return schema, batches()
+
+
+async def iter_tick_batches(conn: asyncpg.Connection, start: datetime, end: datetime,
+                            market_id: Optional[str] = None, chunk_size: int = 50000):
+    """Arrow schema and an async iterator of record batches of market price ticks"""
+    schema = await build_schema(conn, TICK_SOURCES)
+    await _use_text_uuids(conn)
+
+    async def batches() -> AsyncIterator[Any]:
+        query = TICK_QUERY
+        params = [start, end]
+        if market_id:
+            query += " AND market_id = $3::uuid"
+            params.append(market_id)
+        query += " ORDER BY ts"
+        async with conn.transaction(readonly=True):
+            cursor = await conn.cursor(query, *params)
+            while True:
+                rows = await cursor.fetch(chunk_size)
+                if not rows:
+                    break
+                yield record_batch(rows, schema)
+
+    return schema, batches()
+
+
+class _ChunkSink:
+    """File-like sink that hands back what was written since the last take()"""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+async def ipc_stream(schema, batches: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    """Arrow IPC stream bytes: the schema, then one message per record batch"""
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    yield sink.take()
+    async for batch in batches:
+        writer.write_batch(batch)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+# Directory name Hive readers (pyarrow, Spark) map back to a null partition value
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+async def write_parquet_partitions(schema, batches: AsyncIterator[Any], root: str,
+                                   time_column: str) -> Dict[str, int]:
+    """Write batches as Hive-style date partitions: root/date=YYYY-MM-DD/part-0.parquet
+
+    Returns rows written per day. `pandas.read_parquet(root)` restores the
+    `date` column from the directory names. Rows without a time go to
+    root/date=__HIVE_DEFAULT_PARTITION__ and read back with a null date
+    (read with a string `date` partition field, see tools/export_parquet.py).
+    """
+    writers: Dict[str, Any] = {}
+    counts: Dict[str, int] = {}
+    try:
+        async for batch in batches:
+            days = pc.cast(batch.column(time_column), pa.date32())
+            for day in pc.unique(days).to_pylist():
+                if day is None:
+                    part = batch.filter(pc.is_null(days))
+                    key = NULL_PARTITION
+                else:
+                    part = batch.filter(pc.equal(days, pa.scalar(day, pa.date32())))
+                    key = day.isoformat()
+                writer = writers.get(key)
+                if writer is None:
+                    directory = os.path.join(root, f"date={key}")
+                    os.makedirs(directory, exist_ok=True)
+                    writer = writers[key] = pq.ParquetWriter(os.path.join(directory, "part-0.parquet"), schema)
+                writer.write_batch(part)
+                counts[key] = counts.get(key, 0) + part.num_rows
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return counts
@@ -0,0 +1,394 @@
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time as dt_time, timezone
+from typing import Optional, List, Dict, Any, Tuple
+
+import asyncpg
+import numpy as np
+
+from utils.detection import detect_spreads
+from utils.simulator import simulate_execution
+from utils.bootstrap import bootstrap_confidence_intervals
+
+# Positions on markets without a resolution_date are assumed to lock capital this long
+DEFAULT_HOLD_DAYS = 30
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_backtest_executor(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Shared process pool so CPU-heavy backtests never run on the API event loop"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max_workers)
+    return _executor
+
+
+def shutdown_backtest_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def parse_backtest_range(backtest_data: Dict[str, Any]) -> Tuple[datetime, datetime]:
+    """Convert start_date/end_date into an inclusive UTC timestamp range"""
+    start = date.fromisoformat(str(backtest_data['start_date']))
+    end = date.fromisoformat(str(backtest_data['end_date']))
+    return (
+        datetime.combine(start, dt_time.min, tzinfo=timezone.utc),
+        datetime.combine(end, dt_time.max, tzinfo=timezone.utc)
+    )
+
+
+def compute_backtest_metrics(net_spread_pct: np.ndarray, expected_profit_usd: np.ndarray,
+                             days: np.ndarray) -> Dict[str, Any]:
+    """Aggregate opportunity outcomes into the metrics stored on backtests
+
+    `days` holds the calendar day of each opportunity (datetime64[D]).
+    """
+    net_spread_pct = np.asarray(net_spread_pct, dtype=np.float64)
+    expected_profit_usd = np.nan_to_num(np.asarray(expected_profit_usd, dtype=np.float64))
+
+    if len(net_spread_pct) == 0:
+        return {
+            "total_opportunities": 0,
+            "profitable_opportunities": 0,
+            "total_profit_pct": 0.0,
+            "total_profit_usd": 0.0,
+            "max_drawdown_pct": 0.0,
+            "sharpe_ratio": 0.0,
+            "daily_returns": np.empty(0),
+        }
+
+    # Simplified Sharpe ratio on the average return of each day
+    returns = net_spread_pct / 100
+    _, day_index = np.unique(np.asarray(days), return_inverse=True)
+    daily_avg_returns = np.bincount(day_index, weights=returns) / np.bincount(day_index)
+
+    if len(daily_avg_returns) > 1:
+        volatility = daily_avg_returns.std()
+        sharpe_ratio = daily_avg_returns.mean() / volatility if volatility > 0 else 0.0
+    else:
+        sharpe_ratio = 0.0
+
+    # Drawdown of the cumulative daily return curve, peak starting at zero
+    cumulative = np.cumsum(daily_avg_returns)
+    peak = np.maximum.accumulate(np.maximum(cumulative, 0))
+    max_drawdown = float((peak - cumulative).max())
+
+    return {
+        "total_opportunities": int(len(net_spread_pct)),
+        "profitable_opportunities": int((net_spread_pct > 0).sum()),
+        "total_profit_pct": round(float(returns.sum()), 4),
+        "total_profit_usd": round(float(expected_profit_usd.sum()), 2),
+        "max_drawdown_pct": round(max_drawdown * 100, 4),
+        "sharpe_ratio": round(float(sharpe_ratio), 2),
+        "daily_returns": daily_avg_returns,
+    }
+
+
+async def store_backtest_metrics(conn: asyncpg.Connection, backtest_id: str, metrics: Dict[str, Any]):
+    """Write computed metrics back to the backtests row"""
+    await conn.execute(
+        """
+        UPDATE backtests
+        SET total_opportunities = $1,
+            profitable_opportunities = $2,
+            total_profit_pct = $3,
+            total_profit_usd = $4,
+            max_drawdown_pct = $5,
+            sharpe_ratio = $6
+        WHERE id = $7
+        """,
+        metrics['total_opportunities'],
+        metrics['profitable_opportunities'],
+        metrics['total_profit_pct'],
+        metrics['total_profit_usd'],
+        metrics['max_drawdown_pct'],
+        metrics['sharpe_ratio'],
+        backtest_id
+    )
+
+
+def run_capital_simulation(backtest_data: Dict[str, Any], entry_s: np.ndarray, resolves_s: np.ndarray,
+                           pair_index: np.ndarray, max_tradable_amount: np.ndarray,
+                           net_spread_pct: np.ndarray) -> Optional[Dict[str, Any]]:
+    """Run the capital-constrained simulator when the backtest sets initial_capital_usd
+
+    `resolves_s` is the epoch second the pair resolves, NaN when unknown.
+    """
+    initial_capital = backtest_data.get('initial_capital_usd')
+    if not initial_capital:
+        return None
+    hold_s = float(backtest_data.get('default_hold_days') or DEFAULT_HOLD_DAYS) * 86400
+    entry_s = np.asarray(entry_s, dtype=np.float64)
+    resolves_s = np.asarray(resolves_s, dtype=np.float64)
+    release_s = np.where(np.isnan(resolves_s), entry_s + hold_s, resolves_s)
+    simulation = simulate_execution(
+        entry_s, release_s, pair_index, max_tradable_amount, net_spread_pct,
+        initial_capital_usd=float(initial_capital),
+        max_position_usd=backtest_data.get('max_position_usd')
+    )
+    simulation['max_position_usd'] = backtest_data.get('max_position_usd')
+    simulation['default_hold_days'] = hold_s / 86400
+    return simulation
+
+
+def compute_recorded_backtest(backtest_data: Dict[str, Any], net_spread_pct: np.ndarray,
+                              expected_profit_usd: np.ndarray, days: np.ndarray, entry_s: np.ndarray,
+                              resolves_s: np.ndarray, pair_index: np.ndarray,
+                              max_tradable_amount: np.ndarray) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Metrics and optional capital simulation of a recorded-mode backtest
+
+    Runs in the backtest process pool; arguments are plain arrays so they
+    pickle cheaply.
+    """
+    metrics = compute_backtest_metrics(net_spread_pct, expected_profit_usd, days)
+    simulation = run_capital_simulation(
+        backtest_data, entry_s, resolves_s, pair_index, max_tradable_amount, net_spread_pct
+    )
+    return metrics, simulation
+
+
+async def store_backtest_simulation(conn: asyncpg.Connection, backtest_id: str, simulation: Dict[str, Any]):
+    """Write simulator output to the backtests row"""
+    await conn.execute(
+        "UPDATE backtests SET simulation = $1::jsonb WHERE id = $2",
+        json.dumps(simulation),
+        backtest_id
+    )
+
+
+async def store_backtest_confidence_intervals(conn: asyncpg.Connection, backtest_id: str,
+                                             confidence_intervals: Dict[str, Any]):
+    """Write bootstrap confidence intervals to the backtests row"""
+    await conn.execute(
+        "UPDATE backtests SET confidence_intervals = $1::jsonb WHERE id = $2",
+        json.dumps(confidence_intervals),
+        backtest_id
+    )
+
+
+class ReplayDetector:
+    """Re-runs spread detection over a time-ordered stream of price ticks
+
+    Market state is kept in dense arrays indexed by market; after each time
+    bucket every pair is evaluated in one vectorized call. An opportunity is
+    counted when a pair starts qualifying, not on every bucket it stays open.
+    """
+
+    def __init__(self, pairs: List[Dict[str, Any]], min_spread_pct: float,
+                 min_liquidity_usd: float, fee_adjustment_bps: float = 0.0,
+                 bucket_seconds: int = 60):
+        self.min_spread_pct = min_spread_pct
+        self.min_liquidity_usd = min_liquidity_usd
+        self.bucket_ms = bucket_seconds * 1000
+        self.current_bucket: Optional[int] = None
+
+        market_ids = sorted({str(p['market_a_id']) for p in pairs} | {str(p['market_b_id']) for p in pairs})
+        self.market_index = {market_id: i for i, market_id in enumerate(market_ids)}
+        n = len(market_ids)
+        self.yes = np.full(n, np.nan)
+        self.no = np.full(n, np.nan)
+        self.yes_liq = np.zeros(n)
+        self.no_liq = np.zeros(n)
+
+        self.pair_ids = [str(p['id']) for p in pairs]
+        self.a_idx = np.array([self.market_index[str(p['market_a_id'])] for p in pairs], dtype=np.int64)
+        self.b_idx = np.array([self.market_index[str(p['market_b_id'])] for p in pairs], dtype=np.int64)
+        self.fee_a = np.maximum(np.array([p['venue_a_fee'] or 0 for p in pairs], dtype=np.float64) + fee_adjustment_bps, 0)
+        self.fee_b = np.maximum(np.array([p['venue_b_fee'] or 0 for p in pairs], dtype=np.float64) + fee_adjustment_bps, 0)
+        self.open = np.zeros(len(pairs), dtype=bool)
+
+        self._ts: List[np.ndarray] = []
+        self._net: List[np.ndarray] = []
+        self._profit: List[np.ndarray] = []
+        self._size: List[np.ndarray] = []
+        self._pair: List[np.ndarray] = []
+
+    def apply(self, market_idx: np.ndarray, yes: np.ndarray, no: np.ndarray,
+              yes_liq: np.ndarray, no_liq: np.ndarray):
+        """Apply a time-ordered batch of ticks, keeping the last one per market"""
+        _, last_rev = np.unique(market_idx[::-1], return_index=True)
+        keep = len(market_idx) - 1 - last_rev
+        idx = market_idx[keep]
+        self.yes[idx] = yes[keep]
+        self.no[idx] = no[keep]
+        self.yes_liq[idx] = yes_liq[keep]
+        self.no_liq[idx] = no_liq[keep]
+
+    def evaluate(self, ts_ms: int):
+        """Detect on the current state and record newly opened opportunities"""
+        if not len(self.pair_ids):
+            return
+        a, b = self.a_idx, self.b_idx
+        result = detect_spreads(
+            self.yes[a], self.no[a], self.yes[b], self.no[b],
+            self.yes_liq[a], self.no_liq[a], self.yes_liq[b], self.no_liq[b],
+            self.fee_a, self.fee_b
+        )
+        detected = (
+            result['valid']
+            & (result['net_spread_pct'] >= self.min_spread_pct)
+            & (result['max_tradable_amount'] >= self.min_liquidity_usd)
+        )
+        opened = detected & ~self.open
+        self.open = detected
+        if opened.any():
+            self._ts.append(np.full(int(opened.sum()), ts_ms, dtype=np.int64))
+            self._net.append(result['net_spread_pct'][opened])
+            self._profit.append(result['expected_profit_usd'][opened])
+            self._size.append(result['max_tradable_amount'][opened])
+            self._pair.append(np.flatnonzero(opened))
+
+    def feed(self, market_idx: np.ndarray, ts_ms: np.ndarray, values: np.ndarray):
+        """Consume a time-ordered chunk of ticks (values: yes, no, yes_liq, no_liq)
+
+        Detection runs once per completed time bucket; a bucket that spans
+        two chunks is evaluated when the next bucket starts.
+        """
+        if not len(ts_ms):
+            return
+        buckets = ts_ms // self.bucket_ms
+        boundaries = np.flatnonzero(np.diff(buckets)) + 1
+        for lo, hi in zip(np.r_[0, boundaries], np.r_[boundaries, len(ts_ms)]):
+            bucket = int(buckets[lo])
+            if self.current_bucket is not None and bucket != self.current_bucket:
+                self.evaluate(self.current_bucket * self.bucket_ms)
+            self.current_bucket = bucket
+            block = values[lo:hi]
+            self.apply(
+                market_idx[lo:hi],
+                block[:, 0], block[:, 1],
+                np.nan_to_num(block[:, 2]), np.nan_to_num(block[:, 3])
+            )
+
+    def finish(self):
+        """Evaluate the final pending bucket"""
+        if self.current_bucket is not None:
+            self.evaluate(self.current_bucket * self.bucket_ms)
+            self.current_bucket = None
+
+    def opportunities(self) -> Dict[str, np.ndarray]:
+        """Detected opportunities as columnar arrays in time order"""
+        if not self._ts:
+            return {
+                "ts_ms": np.empty(0, dtype=np.int64),
+                "net_spread_pct": np.empty(0),
+                "expected_profit_usd": np.empty(0),
+                "max_tradable_amount": np.empty(0),
+                "pair_index": np.empty(0, dtype=np.int64),
+            }
+        return {
+            "ts_ms": np.concatenate(self._ts),
+            "net_spread_pct": np.concatenate(self._net),
+            "expected_profit_usd": np.concatenate(self._profit),
+            "max_tradable_amount": np.concatenate(self._size),
+            "pair_index": np.concatenate(self._pair),
+        }
+
+
+async def fetch_replay_pairs(conn: asyncpg.Connection, backtest_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Pairs eligible for replay under the backtest's confidence and venue filters"""
+    query = """
+    SELECT mp.id, mp.market_a_id, mp.market_b_id, mp.confidence_score,
+           va.fee_bps as venue_a_fee, vb.fee_bps as venue_b_fee,
+           GREATEST(ma.resolution_date, mb.resolution_date) as resolves_at
+    FROM market_pairs mp
+    JOIN markets ma ON mp.market_a_id = ma.id
+    JOIN markets mb ON mp.market_b_id = mb.id
+    JOIN venues va ON ma.venue_id = va.id
+    JOIN venues vb ON mb.venue_id = vb.id
+    WHERE COALESCE(mp.confidence_score, 0) >= $1
+    """
+    params = [int(backtest_data.get('min_confidence_score') or 0)]
+    venue_filter = backtest_data.get('venue_filter') or []
+    if venue_filter:
+        query += " AND va.name = ANY($2) AND vb.name = ANY($2)"
+        params.append(list(venue_filter))
+    rows = await conn.fetch(query, *params)
+    return [dict(row) for row in rows]
+
+
+async def replay_backtest(conn: asyncpg.Connection, backtest_data: Dict[str, Any],
+                          bucket_seconds: int = 60, chunk_size: int = 50000) -> Dict[str, Any]:
+    """Stream ticks in time order through the detector and compute metrics"""
+    start, end = parse_backtest_range(backtest_data)
+    pairs = await fetch_replay_pairs(conn, backtest_data)
+    detector = ReplayDetector(
+        pairs,
+        min_spread_pct=float(backtest_data.get('min_spread_pct', 1.0)),
+        min_liquidity_usd=float(backtest_data.get('min_liquidity_usd', 500.0)),
+        fee_adjustment_bps=float(backtest_data.get('fee_adjustment_bps') or 0),
+        bucket_seconds=bucket_seconds
+    )
+    market_ids = list(detector.market_index)
+
+    async with conn.transaction():
+        cursor = await conn.cursor(
+            """
+            SELECT market_id::text, ts, yes_price, no_price, yes_liquidity, no_liquidity
+            FROM market_price_ticks
+            WHERE ts >= $1 AND ts <= $2 AND market_id = ANY($3::uuid[])
+            ORDER BY ts
+            """,
+            start, end, market_ids
+        )
+        while True:
+            rows = await cursor.fetch(chunk_size)
+            if not rows:
+                break
+            market_idx = np.fromiter((detector.market_index[r[0]] for r in rows), dtype=np.int64, count=len(rows))
+            ts_ms = np.fromiter((r[1].timestamp() * 1000 for r in rows), dtype=np.float64, count=len(rows)).astype(np.int64)
+            values = np.array([(r[2], r[3], r[4], r[5]) for r in rows], dtype=np.float64)
+            detector.feed(market_idx, ts_ms, values)
+    detector.finish()
+
+    found = detector.opportunities()
+    days = found['ts_ms'].astype('datetime64[ms]').astype('datetime64[D]')
+    metrics = compute_backtest_metrics(found['net_spread_pct'], found['expected_profit_usd'], days)
+    metrics['pairs_evaluated'] = len(detector.pair_ids)
+
+    pair_resolves_s = np.array(
+        [p['resolves_at'].timestamp() if p['resolves_at'] else np.nan for p in pairs], dtype=np.float64
+    )
+    metrics['simulation'] = run_capital_simulation(
+        backtest_data,
+        found['ts_ms'] / 1000,
+        pair_resolves_s[found['pair_index']] if len(pairs) else np.empty(0),
+        found['pair_index'],
+        found['max_tradable_amount'],
+        found['net_spread_pct']
+    )
+
+    # Already inside a pool worker, so resample in-process
+    resamples = backtest_data.get('bootstrap_resamples')
+    metrics['confidence_intervals'] = bootstrap_confidence_intervals(
+        metrics['daily_returns'], n_resamples=int(resamples), block_size=backtest_data.get('bootstrap_block_size')
+    ) if resamples else None
+    return metrics
+
+
+async def _replay_and_store(database_url: str, backtest_id: str, backtest_data: Dict[str, Any]) -> Dict[str, Any]:
+    conn = await asyncpg.connect(
+        database_url,
+        timeout=30.0,
+        server_settings={'application_name': 'arblens_backtest'}
+    )
+    try:
+        metrics = await replay_backtest(conn, backtest_data)
+        await store_backtest_metrics(conn, backtest_id, metrics)
+        if metrics['simulation'] is not None:
+            await store_backtest_simulation(conn, backtest_id, metrics['simulation'])
+        if metrics['confidence_intervals'] is not None:
+            await store_backtest_confidence_intervals(conn, backtest_id, metrics['confidence_intervals'])
+        return {k: v for k, v in metrics.items() if k != 'daily_returns'}
+    finally:
+        await conn.close()
+
+
+def run_replay_backtest(database_url: str, backtest_id: str, backtest_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Process-pool entry point: replay a backtest on its own event loop"""
+    return asyncio.run(_replay_and_store(database_url, backtest_id, backtest_data))
@@ -0,0 +1,105 @@
+import asyncio
+import math
+from concurrent.futures import Executor
+from typing import Optional, List, Dict, Any
+
+import numpy as np
+
+# Daily series shorter than this give meaningless intervals
+MIN_BOOTSTRAP_DAYS = 5
+
+# Resamples per bootstrap_chunk call; its index and sample arrays are
+# (resamples, days), so this bounds memory however many are requested
+MAX_CHUNK_RESAMPLES = 2000
+
+
+def default_block_size(n: int) -> int:
+    """Block length ~ n^(1/3), the usual choice for moving block bootstraps"""
+    return max(1, int(math.ceil(n ** (1 / 3))))
+
+
+def bootstrap_chunk(daily_returns: np.ndarray, n_resamples: int, block_size: int, seed: int) -> np.ndarray:
+    """Circular block bootstrap of a daily return series
+
+    Returns a (3, n_resamples) array of Sharpe ratio, max drawdown and
+    cumulative daily return per resample. Sharpe and drawdown use the same
+    definitions as compute_backtest_metrics. The cumulative daily return is
+    the sum of daily average returns in percent (the end of the drawdown
+    curve), not total_profit_pct, which sums per-opportunity returns.
+    """
+    returns = np.asarray(daily_returns, dtype=np.float64)
+    n = len(returns)
+    rng = np.random.default_rng(seed)
+    n_blocks = -(-n // block_size)
+    starts = rng.integers(0, n, size=(n_resamples, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block_size)) % n
+    samples = returns[idx.reshape(n_resamples, -1)[:, :n]]
+
+    mean = samples.mean(axis=1)
+    std = samples.std(axis=1)
+    sharpe = np.divide(mean, std, out=np.zeros_like(mean), where=std > 0)
+
+    cumulative = np.cumsum(samples, axis=1)
+    peak = np.maximum.accumulate(np.maximum(cumulative, 0), axis=1)
+    max_drawdown = (peak - cumulative).max(axis=1)
+
+    return np.stack((sharpe, max_drawdown * 100, cumulative[:, -1] * 100))
+
+
+def summarize_bootstrap(samples: np.ndarray, confidence: float, block_size: int) -> Dict[str, Any]:
+    """Percentile confidence intervals from stacked bootstrap samples"""
+    alpha = (1 - confidence) / 2
+    lo, mid, hi = np.percentile(samples, [alpha * 100, 50, (1 - alpha) * 100], axis=1)
+    result = {
+        "resamples": int(samples.shape[1]),
+        "block_size": block_size,
+        "confidence": confidence,
+    }
+    for i, name in enumerate(("sharpe_ratio", "max_drawdown_pct", "cumulative_daily_return_pct")):
+        result[name] = {
+            "lower": round(float(lo[i]), 4),
+            "median": round(float(mid[i]), 4),
+            "upper": round(float(hi[i]), 4),
+        }
+    return result
+
+
+def _split(n_resamples: int, chunks: int) -> List[int]:
+    base, extra = divmod(n_resamples, chunks)
+    return [base + (1 if i < extra else 0) for i in range(chunks) if base or i < extra]
+
+
+def bootstrap_confidence_intervals(daily_returns: np.ndarray, n_resamples: int = 10000,
+                                   confidence: float = 0.95, block_size: Optional[int] = None,
+                                   seed: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Block bootstrap confidence intervals computed in the current process"""
+    n = len(daily_returns)
+    if n < MIN_BOOTSTRAP_DAYS:
+        return None
+    block_size = min(block_size or default_block_size(n), n)
+    sizes = _split(n_resamples, -(-n_resamples // MAX_CHUNK_RESAMPLES))
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(len(sizes))]
+    samples = np.concatenate([
+        bootstrap_chunk(daily_returns, size, block_size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)
+    ], axis=1)
+    return summarize_bootstrap(samples, confidence, block_size)
+
+
+async def bootstrap_confidence_intervals_parallel(daily_returns: np.ndarray, executor: Executor,
+                                                  n_resamples: int = 10000, confidence: float = 0.95,
+                                                  block_size: Optional[int] = None, chunks: int = 8,
+                                                  seed: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Block bootstrap confidence intervals spread across a process pool"""
+    daily_returns = np.asarray(daily_returns, dtype=np.float64)
+    n = len(daily_returns)
+    if n < MIN_BOOTSTRAP_DAYS:
+        return None
+    block_size = min(block_size or default_block_size(n), n)
+    sizes = _split(n_resamples, max(chunks, -(-n_resamples // MAX_CHUNK_RESAMPLES)))
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(len(sizes))]
+    loop = asyncio.get_running_loop()
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(executor, bootstrap_chunk, daily_returns, size, block_size, chunk_seed)
+        for size, chunk_seed in zip(sizes, seeds)
+    ))
+    return summarize_bootstrap(np.concatenate(parts, axis=1), confidence, block_size)
@@ -1,33 +1,301 @@
+import asyncio
 import asyncpg
 import os
-from typing import Optional, List, Dict, Any
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 import json
 
+
+class PooledConnection:
+    """A pool connection whose close() hands it back to the pool
+
+    Lets request handlers keep the `conn = await get_db_connection()` /
+    `await conn.close()` pattern while reusing warm connections. Query
+    loggers added through the wrapper are removed on release so they do
+    not follow the connection to its next user.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, connection):
+        self._pool = pool
+        self._connection = connection
+        self._query_loggers = []
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise asyncpg.InterfaceError("connection has been released back to the pool")
+        return getattr(self._connection, name)
+
+    def add_query_logger(self, callback):
+        self._query_loggers.append(callback)
+        self._connection.add_query_logger(callback)
+
+    def is_closed(self) -> bool:
+        return self._connection is None or self._connection.is_closed()
+
+    async def close(self):
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        for callback in self._query_loggers:
+            connection.remove_query_logger(callback)
+        await self._pool.release(connection)
+
+
+# Current WAL position as a number of bytes; pg_lsn has no asyncpg codec
+PRIMARY_LSN_QUERY = "SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')::bigint"
+
+# Stands in for a write whose WAL position is not known yet: no replica
+# counts as caught up with it, so reads go to the primary
+UNKNOWN_LSN = 2 ** 63 - 1
+
+# Replay position and age of the last replayed transaction on a standby;
+# both NULL on a server that is not in recovery
+REPLICA_LAG_QUERY = """
+SELECT pg_is_in_recovery() AS in_recovery,
+       pg_wal_lsn_diff(pg_last_wal_replay_lsn(), '0/0')::bigint AS replay_lsn,
+       EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8 AS replay_age
+"""
+
+
+class ReplicaNode:
+    """One read replica: its pool and last measured lag"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.pool: Optional[asyncpg.Pool] = None
+        self.healthy = False
+        self.in_recovery = False
+        self.replay_lsn: Optional[int] = None
+        self.lag_seconds: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.reads = 0
+
+    @property
+    def host(self) -> str:
+        return self.url.rsplit("@", 1)[-1]
+
+    def caught_up(self, write: Optional[Tuple[int, float]], interval: float) -> bool:
+        """Whether a read on this replica sees the given write
+
+        Standbys are compared by WAL position. Servers that are not in
+        recovery (logical replicas, local test instances) report no replay
+        position, so the write must be older than their lag plus one
+        measurement interval.
+        """
+        if write is None:
+            return True
+        lsn, written_at = write
+        if self.replay_lsn is not None:
+            return self.replay_lsn >= lsn
+        return time.monotonic() - written_at > (self.lag_seconds or 0.0) + interval
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "host": self.host,
+            "healthy": self.healthy,
+            "lag_s": round(self.lag_seconds, 3) if self.lag_seconds is not None else None,
+            "reads": self.reads,
+            "error": self.error,
+        }
+
+
 class DatabaseManager:
-    """Database utilities for ArbLens backend"""
+    """Database utilities for ArbLens backend
+
+    Writes go to the primary. With DB_REPLICA_URLS set, read-only requests
+    are spread over replicas whose measured lag is within max_replica_lag;
+    reads that must see a recent write (see note_write) only go to a
+    replica that has replayed it, otherwise to the primary.
+    """
     
     def __init__(self):
-        self.database_url = os.getenv("DATABASE_URL") or os.getenv("SUPABASE_DB_URL")
+        self.database_url = os.getenv("SUPABASE_DB_URL") or os.getenv("DATABASE_URL")
+        self.min_size = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+        self.max_size = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+        self.connect_timeout = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+        # Session default for pooled connections; RESET ALL on release restores it
+        self.statement_timeout = float(os.getenv("DB_STATEMENT_TIMEOUT", "10"))
         self.pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+        self.replicas = [
+            ReplicaNode(url.strip()) for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()
+        ]
+        self.max_replica_lag = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+        self.lag_interval = float(os.getenv("DB_REPLICA_LAG_INTERVAL", "1"))
+        self.primary_reads = 0
+        self._next_replica = 0
+        self._recent_writes: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._max_recent_writes = 10000
+        # Never evicted; e.g. the position behind the current resource versions
+        self._pinned_writes: Dict[str, Tuple[int, float]] = {}
+        self._lag_task: Optional[asyncio.Task] = None
+    
+    async def _new_pool(self, url: str) -> asyncpg.Pool:
+        return await asyncpg.create_pool(
+            url,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            command_timeout=60,
+            timeout=self.connect_timeout,
+            server_settings={
+                'application_name': 'arblens_api',
+                'statement_timeout': str(int(self.statement_timeout * 1000))
+            }
+        )
     
     async def create_pool(self):
-        """Create connection pool"""
+        """Create connection pools; min_size connections are opened up front
+
+        An unreachable replica does not fail startup; it stays out of
+        rotation until the lag monitor reaches it.
+        """
         if not self.database_url:
             raise ValueError("DATABASE_URL environment variable is required")
         
-        self.pool = await asyncpg.create_pool(
-            self.database_url,
-            min_size=1,
-            max_size=10,
-            command_timeout=60
-        )
+        async with self._pool_lock:
+            if self.pool is None:
+                self.pool = await self._new_pool(self.database_url)
+                if self.replicas:
+                    await asyncio.gather(*(self._check_replica(node) for node in self.replicas))
+                    self._lag_task = asyncio.create_task(self._monitor_lag())
         return self.pool
     
     async def close_pool(self):
-        """Close connection pool"""
+        """Close connection pools"""
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+            self._lag_task = None
+        for node in self.replicas:
+            if node.pool is not None:
+                await node.pool.close()
+                node.pool = None
+            node.healthy = False
         if self.pool:
             await self.pool.close()
+            self.pool = None
+    
+    async def _check_replica(self, node: ReplicaNode, primary_lsn: Optional[int] = None):
+        try:
+            if node.pool is None:
+                node.pool = await self._new_pool(node.url)
+            async with node.pool.acquire(timeout=self.connect_timeout) as conn:
+                row = await conn.fetchrow(REPLICA_LAG_QUERY, timeout=self.connect_timeout)
+            node.in_recovery = row['in_recovery']
+            node.replay_lsn = row['replay_lsn']
+            if not node.in_recovery:
+                node.lag_seconds = 0.0
+            elif primary_lsn is not None and node.replay_lsn is not None and node.replay_lsn >= primary_lsn:
+                # Replay timestamps age while the primary is idle; caught up is no lag
+                node.lag_seconds = 0.0
+            else:
+                node.lag_seconds = row['replay_age']
+            node.healthy = node.lag_seconds is not None and node.lag_seconds <= self.max_replica_lag
+            node.error = None
+        except Exception as e:
+            if node.healthy:
+                print(f"⚠️  Replica {node.host} out of rotation: {e}")
+            node.healthy = False
+            node.error = f"{type(e).__name__}: {e}"
+        node.checked_at = time.monotonic()
+    
+    async def _monitor_lag(self):
+        while True:
+            await asyncio.sleep(self.lag_interval)
+            primary_lsn = None
+            try:
+                async with self.pool.acquire(timeout=self.connect_timeout) as conn:
+                    primary_lsn = await conn.fetchval(PRIMARY_LSN_QUERY, timeout=self.connect_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Replica lag check could not read the primary WAL position: {e}")
+            await asyncio.gather(*(self._check_replica(node, primary_lsn) for node in self.replicas))
+    
+    async def note_write(self, conn, key: str) -> Optional[int]:
+        """Remember the primary's WAL position after a committed write to key
+
+        Later reads passing after=key are kept off replicas that have not
+        replayed it. Costs one round trip, and only when replicas exist.
+        Returns the position so other processes can be told about it.
+        """
+        if not self.replicas:
+            return None
+        lsn = await conn.fetchval(PRIMARY_LSN_QUERY)
+        self.record_write(key, lsn)
+        return lsn
+    
+    def record_write(self, key: str, lsn: int, written_at: Optional[float] = None, pinned: bool = False):
+        """Remember a WAL position read elsewhere (another worker, a NOTIFY listener)
+
+        pinned entries are never evicted by newer writes to other keys.
+        """
+        write = (lsn, time.monotonic() if written_at is None else written_at)
+        if pinned:
+            self._pinned_writes[key] = write
+            return
+        self._recent_writes[key] = write
+        self._recent_writes.move_to_end(key)
+        while len(self._recent_writes) > self._max_recent_writes:
+            self._recent_writes.popitem(last=False)
+    
+    def write_lsn(self, key: str) -> Optional[int]:
+        """WAL position last noted for key, if any"""
+        write = self._pinned_writes.get(key) or self._recent_writes.get(key)
+        return write[0] if write else None
+    
+    def read_node(self, after: Optional[str] = None) -> Optional[ReplicaNode]:
+        """Next healthy replica that has caught up with `after`, or None for the primary"""
+        write = (self._pinned_writes.get(after) or self._recent_writes.get(after)) if after else None
+        for offset in range(len(self.replicas)):
+            node = self.replicas[(self._next_replica + offset) % len(self.replicas)]
+            if node.healthy and node.pool is not None and node.caught_up(write, self.lag_interval):
+                self._next_replica = (self._next_replica + offset + 1) % len(self.replicas)
+                return node
+        return None
+    
+    def read_url(self, after: Optional[str] = None) -> str:
+        """DSN for a dedicated read-only connection"""
+        node = self.read_node(after)
+        return node.url if node is not None else self.database_url
+    
+    async def acquire(self, timeout: Optional[float] = None, readonly: bool = False,
+                      after: Optional[str] = None) -> PooledConnection:
+        """Pool connection that is released by close()
+
+        timeout bounds the wait for a free connection (asyncio.TimeoutError).
+        readonly connections come from a replica when one is in rotation;
+        a replica that fails to hand out a connection is taken out of
+        rotation and the primary serves the read.
+        """
+        if not self.pool:
+            await self.create_pool()
+        node = self.read_node(after) if readonly else None
+        if node is not None:
+            try:
+                connection = PooledConnection(node.pool, await node.pool.acquire(timeout=timeout))
+                node.reads += 1
+                return connection
+            except (asyncio.TimeoutError, OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                print(f"⚠️  Replica {node.host} unavailable, reading from primary: {e}")
+                node.healthy = False
+                node.error = f"{type(e).__name__}: {e}"
+        if readonly:
+            self.primary_reads += 1
+        return PooledConnection(self.pool, await self.pool.acquire(timeout=timeout))
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "replicas": [node.status() for node in self.replicas],
+            "primary_reads": self.primary_reads,
+            "max_replica_lag_s": self.max_replica_lag,
+        }
     
     async def get_connection(self):
         """Get database connection from pool"""
@@ -0,0 +1,207 @@
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List
+
+from utils.admission import route_class
+
+# Seconds each route class may run; exports stream for minutes on their own
+# connections and are left alone
+DEFAULT_TIMEOUTS = {"interactive": 10.0, "backtest": 120.0}
+
+# Extra time before the request task itself is cancelled, so the server-side
+# statement_timeout normally fires first and the handler can answer
+DEADLINE_GRACE = 1.0
+
+_current_deadline: ContextVar[Optional["RequestDeadline"]] = ContextVar("current_deadline", default=None)
+
+
+def parse_timeouts(spec: Optional[str]) -> Dict[str, float]:
+    """`interactive=10,backtest=120` on top of the defaults"""
+    timeouts = dict(DEFAULT_TIMEOUTS)
+    for part in (spec or "").split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            timeouts[name.strip()] = float(value)
+    return timeouts
+
+
+def current_deadline() -> Optional["RequestDeadline"]:
+    """Deadline of the running request; None once its response has been sent"""
+    deadline = _current_deadline.get()
+    if deadline is None or deadline.response_complete:
+        return None
+    return deadline
+
+
+class RequestDeadline:
+    """Time budget and database connections of one request"""
+
+    def __init__(self, controller: "QueryDeadlines", route: str, timeout: float):
+        self.controller = controller
+        self.route = route
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self.connections: List[Any] = []
+        self.statement_timed_out = False
+        self.cancelled_by: Optional[str] = None
+        self.response_complete = False
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    async def attach(self, connection, default_timeout: Optional[float]):
+        """Apply the route's statement_timeout and watch the connection's queries
+
+        Pool connections start with default_timeout, so routes using the
+        default cost no extra round trip; the pool's RESET ALL on release
+        undoes the SET for everything else.
+        """
+        self.connections.append(connection)
+        connection.add_query_logger(self.log_query)
+        if default_timeout != self.timeout:
+            await connection.execute(f"SET statement_timeout = {int(self.timeout * 1000)}")
+
+    def log_query(self, record):
+        if record.exception is None:
+            return
+        stats = self.controller.stats
+        if isinstance(record.exception, asyncio.CancelledError):
+            # asyncpg has already sent a cancel request to the server
+            stats["queries_cancelled"] += 1
+            stats["cancelled_query_seconds"] += record.elapsed
+        elif type(record.exception).__name__ == "QueryCanceledError":
+            self.statement_timed_out = True
+            stats["statement_timeouts"] += 1
+            stats["cancelled_query_seconds"] += record.elapsed
+
+    async def release(self):
+        """Return connections the handler never closed (it was cancelled mid-query)"""
+        for connection in self.connections:
+            if not connection.is_closed():
+                try:
+                    await connection.close()
+                except Exception as e:
+                    print(f"⚠️  Failed to release connection after cancellation: {e}")
+        self.connections.clear()
+
+
+class QueryDeadlines:
+    """Per-route deadlines and statement timeouts, with cancellation stats"""
+
+    def __init__(self, timeouts: Dict[str, float]):
+        self.timeouts = timeouts
+        self.stats: Dict[str, Any] = {
+            "requests": 0,
+            "client_disconnects": 0,
+            "deadline_exceeded": 0,
+            "queries_cancelled": 0,
+            "statement_timeouts": 0,
+            "cancelled_query_seconds": 0.0,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "timeouts_s": self.timeouts,
+            **self.stats,
+            "cancelled_query_seconds": round(self.stats["cancelled_query_seconds"], 3),
+        }
+
+
+class DeadlineMiddleware:
+    """Run each request against its route's deadline and stop work nobody will read
+
+    The handler runs in its own task while the middleware watches the
+    client. A disconnect before the response has been sent cancels the
+    task; asyncpg turns the cancellation into a server-side cancel of the
+    running query, and connections the handler left open are released. A
+    handler still running DEADLINE_GRACE seconds after its deadline is
+    cancelled the same way and answered with 504, as is a 500 caused by
+    statement_timeout. Once the response has been sent the deadline no
+    longer applies: work the handler does afterwards (Starlette background
+    tasks) is neither timed nor attached to the request's connections.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        name = route_class(scope["path"]) if scope["type"] == "http" else None
+        timeout = query_deadlines.timeouts.get(name) if name else None
+        if not timeout or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = RequestDeadline(query_deadlines, name, timeout)
+        query_deadlines.stats["requests"] += 1
+        messages: asyncio.Queue = asyncio.Queue()
+        response_started = False
+        completed = asyncio.Event()
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                if message["status"] == 500 and deadline.statement_timed_out:
+                    message = dict(message, status=504)
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                deadline.response_complete = True
+                _current_deadline.set(None)
+                completed.set()
+            await send(message)
+
+        context_token = _current_deadline.set(deadline)
+        try:
+            handler = asyncio.create_task(self.app(scope, messages.get, guarded_send))
+        finally:
+            _current_deadline.reset(context_token)
+
+        async def watch_client():
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    if not deadline.response_complete and not handler.done():
+                        query_deadlines.stats["client_disconnects"] += 1
+                        deadline.cancelled_by = "disconnect"
+                        handler.cancel()
+                    return
+
+        watcher = asyncio.create_task(watch_client())
+        response_sent = asyncio.create_task(completed.wait())
+        try:
+            await asyncio.wait({handler, response_sent}, timeout=timeout + DEADLINE_GRACE,
+                               return_when=asyncio.FIRST_COMPLETED)
+            if not handler.done() and not completed.is_set():
+                query_deadlines.stats["deadline_exceeded"] += 1
+                deadline.cancelled_by = "deadline"
+                handler.cancel()
+            try:
+                await handler
+            except asyncio.CancelledError:
+                if deadline.cancelled_by is None:
+                    raise
+                if deadline.cancelled_by == "deadline" and not response_started:
+                    body = b'{"detail": "Request exceeded its time limit"}'
+                    await send({
+                        "type": "http.response.start",
+                        "status": 504,
+                        "headers": [
+                            (b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                        ],
+                    })
+                    await send({"type": "http.response.body", "body": body})
+        except asyncio.CancelledError:
+            handler.cancel()
+            raise
+        finally:
+            watcher.cancel()
+            response_sent.cancel()
+            await deadline.release()
+
+
+# Global deadlines; STATEMENT_TIMEOUTS overrides the per-class seconds
+query_deadlines = QueryDeadlines(parse_timeouts(os.getenv("STATEMENT_TIMEOUTS")))
@@ -0,0 +1,47 @@
+from typing import Dict
+
+import numpy as np
+
+# Side combinations evaluated per pair, mirroring ArbitrageCalculator in
+# src/services/marketDataIngestion.js: (venue_a_side, venue_b_side)
+SIDE_COMBINATIONS = (("yes", "yes"), ("no", "no"), ("yes", "no"), ("no", "yes"))
+
+
+def detect_spreads(
+    a_yes: np.ndarray, a_no: np.ndarray, b_yes: np.ndarray, b_no: np.ndarray,
+    a_yes_liq: np.ndarray, a_no_liq: np.ndarray, b_yes_liq: np.ndarray, b_no_liq: np.ndarray,
+    fee_a_bps: np.ndarray, fee_b_bps: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Vectorized best-spread detection for arrays of market pairs
+
+    All inputs are aligned per pair. Missing prices should be NaN; such
+    pairs come back with valid=False. Spreads are in percent.
+    """
+    a_price = np.stack((a_yes, a_no, a_yes, a_no))
+    b_price = np.stack((b_yes, b_no, 1 - b_no, 1 - b_yes))
+    a_liq = np.stack((a_yes_liq, a_no_liq, a_yes_liq, a_no_liq))
+    b_liq = np.stack((b_yes_liq, b_no_liq, b_no_liq, b_yes_liq))
+
+    spread = np.nan_to_num(b_price - a_price, nan=-np.inf)
+    best = np.argmax(spread, axis=0)
+    cols = np.arange(spread.shape[1])
+    max_spread = spread[best, cols]
+    best_a_price = a_price[best, cols]
+
+    valid = (max_spread > 0) & (best_a_price > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gross_spread_pct = np.where(valid, max_spread / best_a_price * 100, 0.0)
+    net_spread_pct = gross_spread_pct - (fee_a_bps + fee_b_bps) / 100.0
+    max_tradable_amount = np.minimum(
+        np.nan_to_num(a_liq[best, cols]),
+        np.nan_to_num(b_liq[best, cols])
+    )
+
+    return {
+        "valid": valid,
+        "combination": best,
+        "gross_spread_pct": gross_spread_pct,
+        "net_spread_pct": net_spread_pct,
+        "max_tradable_amount": max_tradable_amount,
+        "expected_profit_usd": net_spread_pct / 100 * max_tradable_amount,
+    }
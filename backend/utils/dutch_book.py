@@ -0,0 +1,427 @@
+import asyncio
+import os
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+import asyncpg
+import numpy as np
+
+# Advisory lock key; one worker runs each detection cycle
+LOCK_KEY = 50_000
+
+PAIRS_QUERY = """
+SELECT mp.market_a_id::text, mp.market_b_id::text, ma.venue_id::text, mb.venue_id::text
+FROM market_pairs mp
+JOIN markets ma ON ma.id = mp.market_a_id
+JOIN markets mb ON mb.id = mp.market_b_id
+WHERE COALESCE(mp.confidence_score, 0) >= $1
+"""
+
+GROUP_MEMBERS_QUERY = """
+SELECT ogm.group_id::text, ogm.market_id::text, og.is_exhaustive
+FROM outcome_group_markets ogm
+JOIN outcome_groups og ON og.id = ogm.group_id
+ORDER BY ogm.group_id
+"""
+
+MARKET_QUOTES_QUERY = """
+SELECT m.id::text, m.venue_id, m.yes_price, m.no_price, m.yes_liquidity, m.no_liquidity,
+       COALESCE(v.fee_bps, 0) AS fee_bps
+FROM markets m
+LEFT JOIN venues v ON m.venue_id = v.id
+WHERE m.id = ANY($1::uuid[])
+  AND m.status = 'active'
+  AND m.last_updated >= CURRENT_TIMESTAMP - make_interval(secs => $2)
+"""
+
+UPSERT_OPPORTUNITIES_QUERY = """
+INSERT INTO multi_leg_opportunities (
+    signature, kind, group_id, leg_count, total_cost, payout, gross_spread_pct,
+    net_spread_pct, max_sets, stake_usd, expected_profit_usd
+)
+SELECT * FROM unnest(
+    $1::text[], $2::text[], $3::uuid[], $4::int[], $5::float8[], $6::float8[], $7::float8[],
+    $8::float8[], $9::float8[], $10::float8[], $11::float8[]
+)
+ON CONFLICT (signature) WHERE status = 'active' DO UPDATE SET
+    leg_count = EXCLUDED.leg_count,
+    total_cost = EXCLUDED.total_cost,
+    payout = EXCLUDED.payout,
+    gross_spread_pct = EXCLUDED.gross_spread_pct,
+    net_spread_pct = EXCLUDED.net_spread_pct,
+    max_sets = EXCLUDED.max_sets,
+    stake_usd = EXCLUDED.stake_usd,
+    expected_profit_usd = EXCLUDED.expected_profit_usd,
+    updated_at = CURRENT_TIMESTAMP
+RETURNING id, signature
+"""
+
+# Spreads beyond this come from stale or broken quotes, not arbitrage; it
+# also keeps them inside multi_leg_opportunities' DECIMAL(8,4) columns
+MAX_SPREAD_PCT = 1000.0
+
+LEG_COLUMNS = ["opportunity_id", "leg_index", "market_id", "venue_id", "side", "price", "liquidity", "fee_bps"]
+
+
+def equivalence_classes(a_idx: np.ndarray, b_idx: np.ndarray, n: int) -> np.ndarray:
+    """Connected-component label per node for the undirected edges (a_idx, b_idx)
+
+    Min-label propagation with pointer jumping: every round pulls both ends
+    of each edge to the smaller label, then lets labels follow each other.
+    Rounds grow with the log of the component diameter, and matched-market
+    graphs are shallow. Each node's label is the smallest node index in its
+    class.
+    """
+    labels = np.arange(n)
+    if not len(a_idx):
+        return labels
+    while True:
+        low = np.minimum(labels[a_idx], labels[b_idx])
+        new = labels.copy()
+        np.minimum.at(new, a_idx, low)
+        np.minimum.at(new, b_idx, low)
+        new = new[new]
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+def cheapest_covers(slot_cover: np.ndarray, cover_payout: np.ndarray, cand_slot: np.ndarray,
+                    cand_price: np.ndarray, cand_liquidity: np.ndarray, cand_fee_bps: np.ndarray) -> Dict[str, np.ndarray]:
+    """Cheapest leg per outcome slot and the resulting price of each cover
+
+    A cover buys one leg per slot (outcome) and pays cover_payout per set.
+    Candidates are the venue quotes that can fill a slot. The cheapest
+    quote wins, with lower fees breaking ties. Set counts are capped by the
+    thinnest leg's liquidity. Spreads follow utils/detection.py:
+    gross = (payout - cost) / cost * 100, and net subtracts every leg's
+    fee_bps / 100. Covers with a slot that has no usable quote come back
+    with complete=False.
+    """
+    n_slots = len(slot_cover)
+    n_covers = len(cover_payout)
+    usable = np.isfinite(cand_price) & (cand_price > 0) & (cand_price < 1) & (cand_liquidity > 0)
+    candidates = np.flatnonzero(usable)
+    order = candidates[np.lexsort((cand_fee_bps[candidates], cand_price[candidates], cand_slot[candidates]))]
+    sorted_slots = cand_slot[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_slots[1:] != sorted_slots[:-1]
+    best = order[first]
+    best_slot = cand_slot[best]
+
+    filled = np.zeros(n_slots, dtype=bool)
+    filled[best_slot] = True
+    complete = np.bincount(slot_cover, weights=~filled, minlength=n_covers) == 0
+
+    leg_cover = slot_cover[best_slot]
+    cost = np.bincount(leg_cover, weights=cand_price[best], minlength=n_covers)
+    fees_bps = np.bincount(leg_cover, weights=cand_fee_bps[best], minlength=n_covers)
+    max_sets = np.full(n_covers, np.inf)
+    np.minimum.at(max_sets, leg_cover, cand_liquidity[best] / cand_price[best])
+    max_sets[~complete] = 0.0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gross_spread_pct = np.where(complete & (cost > 0), (cover_payout - cost) / cost * 100, 0.0)
+    net_spread_pct = gross_spread_pct - fees_bps / 100.0
+    stake_usd = max_sets * cost
+    return {
+        "complete": complete,
+        "best": best,
+        "best_slot": best_slot,
+        "cost": cost,
+        "gross_spread_pct": gross_spread_pct,
+        "net_spread_pct": net_spread_pct,
+        "max_sets": max_sets,
+        "stake_usd": stake_usd,
+        "expected_profit_usd": net_spread_pct / 100 * stake_usd,
+    }
+
+
+class DutchBookDetector:
+    """Finds arbitrage that spans more than two markets
+
+    Markets linked through market_pairs (at or above min_confidence) form
+    equivalence classes: the same proposition quoted on several venues.
+    Each cycle prices three kinds of cover, each needing one leg per outcome
+    from the cheapest venue in that outcome's class:
+
+    - binary: YES and NO of a class spanning min_class_size+ venues, pays 1
+    - yes_cover: YES on every outcome of an exhaustive outcome group, pays 1
+    - no_cover: NO on every outcome of an outcome group, pays n - 1
+
+    Covers are priced chunk_size at a time, and only those chunks' quotes
+    are loaded, so memory is bounded by the chunk, not the market count.
+    Covers that clear min_spread_pct and min_stake_usd are upserted into
+    multi_leg_opportunities with their legs. Previously active covers that
+    no longer qualify are expired. Covers whose spread is not finite or
+    above MAX_SPREAD_PCT are skipped as implausible.
+    """
+
+    def __init__(self, interval: float = 30.0, chunk_size: int = 2000, min_spread_pct: float = 0.5,
+                 min_stake_usd: float = 100.0, min_confidence: int = 70, max_quote_age: float = 600.0,
+                 min_class_size: int = 3, retry_delay: float = 5.0):
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.min_spread_pct = min_spread_pct
+        self.min_stake_usd = min_stake_usd
+        self.min_confidence = min_confidence
+        self.max_quote_age = max_quote_age
+        self.min_class_size = min_class_size
+        self.retry_delay = retry_delay
+        self.database_url: Optional[str] = None
+        self.conn: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self.last_cycle: Optional[Dict[str, Any]] = None
+        self._implausible = 0
+
+    async def build_covers(self, conn: asyncpg.Connection) -> Tuple[List[str], List[Tuple[str, str, Optional[str], str, List[List[int]]]]]:
+        """Market ids and covers as (signature, kind, group_id, side, [[market index, ...] per outcome])"""
+        pairs = await conn.fetch(PAIRS_QUERY, self.min_confidence)
+        members = await conn.fetch(GROUP_MEMBERS_QUERY)
+
+        market_ids = np.unique(np.array(
+            [r[0] for r in pairs] + [r[1] for r in pairs] + [r['market_id'] for r in members], dtype=object
+        ).astype(str))
+        index = {market_id: i for i, market_id in enumerate(market_ids)}
+        a_idx = np.fromiter((index[r[0]] for r in pairs), dtype=np.int64, count=len(pairs))
+        b_idx = np.fromiter((index[r[1]] for r in pairs), dtype=np.int64, count=len(pairs))
+        labels = equivalence_classes(a_idx, b_idx, len(market_ids))
+
+        # Distinct venues per class; markets only in outcome groups have none here
+        venue_index: Dict[str, int] = {}
+        venues = np.full(len(market_ids), -1, dtype=np.int64)
+        for r in pairs:
+            for market_id, venue_id in ((r[0], r[2]), (r[1], r[3])):
+                if venue_id is not None:
+                    venues[index[market_id]] = venue_index.setdefault(venue_id, len(venue_index))
+        has_venue = venues >= 0
+        class_venues = np.unique(np.stack([labels[has_venue], venues[has_venue]]), axis=1)[0]
+        venue_counts = np.bincount(class_venues, minlength=len(market_ids))
+
+        order = np.argsort(labels, kind="stable")
+        roots, starts, sizes = np.unique(labels[order], return_index=True, return_counts=True)
+        class_members = {int(root): order[start:start + size].tolist()
+                         for root, start, size in zip(roots, starts, sizes)}
+
+        covers = []
+        for root in roots:
+            if venue_counts[root] >= self.min_class_size:
+                outcome = class_members[int(root)]
+                covers.append((f"binary:{market_ids[root]}", "binary", None, "both", [outcome, outcome]))
+
+        groups: Dict[str, Tuple[bool, List[int]]] = {}
+        for row in members:
+            exhaustive, outcome_roots = groups.setdefault(row['group_id'], (row['is_exhaustive'], []))
+            root = int(labels[index[row['market_id']]])
+            if root not in outcome_roots:
+                outcome_roots.append(root)
+        for group_id, (exhaustive, outcome_roots) in groups.items():
+            if len(outcome_roots) < 2:
+                continue
+            outcomes = [class_members[root] for root in outcome_roots]
+            covers.append((f"no_cover:{group_id}", "no_cover", group_id, "no", outcomes))
+            if exhaustive:
+                covers.append((f"yes_cover:{group_id}", "yes_cover", group_id, "yes", outcomes))
+        return market_ids.tolist(), covers
+
+    async def price_chunk(self, conn: asyncpg.Connection, market_ids: List[str],
+                          covers: List[Tuple]) -> List[Dict[str, Any]]:
+        """Price one chunk of covers against current quotes; qualifying covers with their legs"""
+        needed = sorted({m for cover in covers for outcome in cover[4] for m in outcome})
+        quotes = {row['id']: row for row in await conn.fetch(
+            MARKET_QUOTES_QUERY, [market_ids[m] for m in needed], self.max_quote_age
+        )}
+
+        slot_cover, cover_payout, slot_side = [], [], []
+        cand_slot, cand_market = [], []
+        for c, (_, kind, _, side, outcomes) in enumerate(covers):
+            cover_payout.append(len(outcomes) - 1.0 if kind == "no_cover" else 1.0)
+            for o, outcome in enumerate(outcomes):
+                slot = len(slot_cover)
+                slot_cover.append(c)
+                # Binary covers take YES for the first slot and NO for the second
+                slot_side.append(("yes", "no")[o] if side == "both" else side)
+                for m in outcome:
+                    if market_ids[m] in quotes:
+                        cand_slot.append(slot)
+                        cand_market.append(m)
+
+        cand_slot = np.array(cand_slot, dtype=np.int64)
+        sides = np.array(slot_side)[cand_slot] if len(cand_slot) else np.empty(0, dtype=str)
+        rows = [quotes[market_ids[m]] for m in cand_market]
+        yes = np.array([float(r['yes_price']) if r['yes_price'] is not None else np.nan for r in rows])
+        no = np.array([float(r['no_price']) if r['no_price'] is not None else np.nan for r in rows])
+        yes_liq = np.array([float(r['yes_liquidity'] or 0) for r in rows])
+        no_liq = np.array([float(r['no_liquidity'] or 0) for r in rows])
+        fee = np.array([float(r['fee_bps']) for r in rows])
+        is_yes = sides == "yes"
+
+        result = cheapest_covers(
+            np.array(slot_cover, dtype=np.int64), np.array(cover_payout),
+            cand_slot, np.where(is_yes, yes, no), np.where(is_yes, yes_liq, no_liq), fee
+        )
+        plausible = (
+            np.isfinite(result['gross_spread_pct'])
+            & np.isfinite(result['net_spread_pct'])
+            & np.isfinite(result['stake_usd'])
+            & (np.abs(result['gross_spread_pct']) <= MAX_SPREAD_PCT)
+        )
+        self._implausible += int(np.count_nonzero(result['complete'] & ~plausible))
+        qualifying = (
+            result['complete']
+            & plausible
+            & (result['net_spread_pct'] >= self.min_spread_pct)
+            & (result['stake_usd'] >= self.min_stake_usd)
+        )
+
+        legs: Dict[int, List[Tuple]] = {}
+        for j, slot in zip(result['best'], result['best_slot']):
+            c = slot_cover[slot]
+            if qualifying[c]:
+                row = rows[j]
+                legs.setdefault(c, []).append((
+                    row['id'], row['venue_id'], slot_side[slot],
+                    float(yes[j] if is_yes[j] else no[j]),
+                    float(yes_liq[j] if is_yes[j] else no_liq[j]),
+                    int(fee[j])
+                ))
+
+        found = []
+        for c in np.flatnonzero(qualifying):
+            signature, kind, group_id, _, _ = covers[c]
+            found.append({
+                "signature": signature,
+                "kind": kind,
+                "group_id": group_id,
+                "payout": float(cover_payout[c]),
+                "cost": float(result['cost'][c]),
+                "gross_spread_pct": float(result['gross_spread_pct'][c]),
+                "net_spread_pct": float(result['net_spread_pct'][c]),
+                "max_sets": float(result['max_sets'][c]),
+                "stake_usd": float(result['stake_usd'][c]),
+                "expected_profit_usd": float(result['expected_profit_usd'][c]),
+                "legs": legs[c],
+            })
+        return found
+
+    async def store(self, conn: asyncpg.Connection, found: List[Dict[str, Any]]):
+        """Upsert one chunk of qualifying covers and replace their legs"""
+        if not found:
+            return
+        async with conn.transaction():
+            rows = await conn.fetch(
+                UPSERT_OPPORTUNITIES_QUERY,
+                [f['signature'] for f in found],
+                [f['kind'] for f in found],
+                [f['group_id'] for f in found],
+                [len(f['legs']) for f in found],
+                [round(f['cost'], 4) for f in found],
+                [f['payout'] for f in found],
+                [round(f['gross_spread_pct'], 4) for f in found],
+                [round(f['net_spread_pct'], 4) for f in found],
+                [round(f['max_sets'], 2) for f in found],
+                [round(f['stake_usd'], 2) for f in found],
+                [round(f['expected_profit_usd'], 2) for f in found],
+            )
+            ids = {row['signature']: row['id'] for row in rows}
+            await conn.execute(
+                "DELETE FROM multi_leg_opportunity_legs WHERE opportunity_id = ANY($1::uuid[])",
+                list(ids.values())
+            )
+            await conn.copy_records_to_table(
+                "multi_leg_opportunity_legs",
+                columns=LEG_COLUMNS,
+                records=[
+                    (ids[f['signature']], i, market_id, venue_id, side, price, liquidity, fee_bps)
+                    for f in found
+                    for i, (market_id, venue_id, side, price, liquidity, fee_bps) in enumerate(f['legs'])
+                ]
+            )
+
+    async def run_cycle(self, conn: asyncpg.Connection) -> Dict[str, Any]:
+        started = time.perf_counter()
+        self._implausible = 0
+        market_ids, covers = await self.build_covers(conn)
+        signatures = []
+        for offset in range(0, len(covers), self.chunk_size):
+            found = await self.price_chunk(conn, market_ids, covers[offset:offset + self.chunk_size])
+            await self.store(conn, found)
+            signatures.extend(f['signature'] for f in found)
+        expired = await conn.execute(
+            """
+            UPDATE multi_leg_opportunities
+            SET status = 'expired', updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'active' AND signature <> ALL($1::text[])
+            """,
+            signatures
+        )
+        return {
+            "covers": len(covers),
+            "active": len(signatures),
+            "expired": int(expired.split()[-1]),
+            "implausible": self._implausible,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    async def _connect(self):
+        self.conn = await asyncpg.connect(
+            self.database_url,
+            timeout=30.0,
+            server_settings={'application_name': 'arblens_dutch_book'}
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                if self.conn is None or self.conn.is_closed():
+                    await self._connect()
+                if await self.conn.fetchval("SELECT pg_try_advisory_lock($1)", LOCK_KEY):
+                    try:
+                        self.last_cycle = await self.run_cycle(self.conn)
+                    finally:
+                        await self.conn.execute("SELECT pg_advisory_unlock($1)", LOCK_KEY)
+                    if self.last_cycle['active'] or self.last_cycle['expired']:
+                        print(f"📚 Dutch-book scan: {self.last_cycle['active']} active of "
+                              f"{self.last_cycle['covers']} covers, {self.last_cycle['expired']} expired, "
+                              f"{self.last_cycle['implausible']} implausible in {self.last_cycle['seconds']} s")
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Dutch-book detector error: {e}")
+                await self._close_connection()
+                await asyncio.sleep(self.retry_delay)
+
+    async def _close_connection(self):
+        if self.conn is not None and not self.conn.is_closed():
+            try:
+                await self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+    def start(self, database_url: str):
+        """Start the periodic detection loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self.database_url = database_url
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the loop and release its connection"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_connection()
+
+
+# Global detector
+dutch_book_detector = DutchBookDetector(
+    interval=float(os.getenv("DUTCH_BOOK_INTERVAL", "30")),
+    min_spread_pct=float(os.getenv("DUTCH_BOOK_MIN_SPREAD", "0.5")),
+    min_stake_usd=float(os.getenv("DUTCH_BOOK_MIN_STAKE", "100"))
+)
@@ -0,0 +1,206 @@
+import asyncio
+import heapq
+import json
+import time
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+
+import asyncpg
+
+EXPIRY_CHANNEL = "opportunity_expiry"
+
+
+class ExpiryScheduler:
+    """Min-heap scheduler that flips due arbitrage opportunities to 'expired'
+
+    The heap is loaded from active rows at startup and kept current through
+    the `opportunity_expiry` NOTIFY channel, so each opportunity costs one
+    O(log n) push and one pop instead of repeated full-table sweeps.
+    """
+
+    def __init__(self, batch_size: int = 500, max_sleep: float = 60.0, retry_delay: float = 5.0):
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self.retry_delay = retry_delay
+        self.database_url: Optional[str] = None
+        self.conn: Optional[asyncpg.Connection] = None
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._subscribers: List[asyncio.Queue] = []
+        self.expired_total = 0
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, opportunity_id: str, expires_at: datetime):
+        """Track an opportunity until its expires_at deadline"""
+        deadline = expires_at.timestamp()
+        opportunity_id = str(opportunity_id)
+        if self._deadlines.get(opportunity_id) == deadline:
+            return
+        # Superseded heap entries are skipped lazily when popped
+        self._deadlines[opportunity_id] = deadline
+        heapq.heappush(self._heap, (deadline, opportunity_id))
+        if self._heap[0][1] == opportunity_id:
+            self._wakeup.set()
+
+    def cancel(self, opportunity_id: str):
+        """Stop tracking an opportunity (executed, deleted, already expired)"""
+        self._deadlines.pop(str(opportunity_id), None)
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """Pop up to batch_size opportunity ids whose deadline has passed"""
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and len(due) < self.batch_size and self._heap[0][0] <= now:
+            deadline, opportunity_id = heapq.heappop(self._heap)
+            if self._deadlines.get(opportunity_id) != deadline:
+                continue
+            del self._deadlines[opportunity_id]
+            due.append(opportunity_id)
+        return due
+
+    def next_delay(self, now: Optional[float] = None) -> float:
+        """Seconds until the earliest live deadline, capped at max_sleep"""
+        now = time.time() if now is None else now
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return self.max_sleep
+        return min(max(self._heap[0][0] - now, 0.0), self.max_sleep)
+
+    def subscribe(self, maxsize: int = 1000) -> asyncio.Queue:
+        """Register a live consumer for expiry change events"""
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Remove a previously registered consumer"""
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def _publish(self, event: Dict[str, Any]):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumers miss events rather than stalling expiry
+                pass
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return
+        opportunity_id = data.get("id")
+        if not opportunity_id:
+            return
+        if data.get("status") != "active" or not data.get("expires_at"):
+            self.cancel(opportunity_id)
+            return
+        self.schedule(opportunity_id, datetime.fromisoformat(data["expires_at"]))
+
+    async def load(self, conn: asyncpg.Connection) -> int:
+        """Load every active opportunity that carries an expires_at"""
+        rows = await conn.fetch(
+            """
+            SELECT id, expires_at FROM arbitrage_opportunities
+            WHERE status = 'active' AND expires_at IS NOT NULL
+            """
+        )
+        self._heap = []
+        self._deadlines = {}
+        for row in rows:
+            opportunity_id = str(row['id'])
+            deadline = row['expires_at'].timestamp()
+            self._deadlines[opportunity_id] = deadline
+            self._heap.append((deadline, opportunity_id))
+        heapq.heapify(self._heap)
+        return len(rows)
+
+    async def expire(self, conn: asyncpg.Connection, opportunity_ids: List[str]) -> List[str]:
+        """Flip a batch of opportunities to expired in a single UPDATE"""
+        rows = await conn.fetch(
+            """
+            UPDATE arbitrage_opportunities
+            SET status = 'expired', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ANY($1::uuid[]) AND status = 'active'
+            RETURNING id
+            """,
+            opportunity_ids
+        )
+        expired = [str(row['id']) for row in rows]
+        if expired:
+            self.expired_total += len(expired)
+            self._publish({
+                "type": "opportunities_expired",
+                "ids": expired,
+                "timestamp": datetime.utcnow().isoformat()
+            })
+        return expired
+
+    async def _connect(self):
+        self.conn = await asyncpg.connect(
+            self.database_url,
+            timeout=30.0,
+            server_settings={'application_name': 'arblens_expiry'}
+        )
+        await self.conn.add_listener(EXPIRY_CHANNEL, self._on_notify)
+        loaded = await self.load(self.conn)
+        print(f"⏰ Expiry scheduler tracking {loaded} opportunities")
+
+    async def _run(self):
+        while True:
+            try:
+                if self.conn is None or self.conn.is_closed():
+                    await self._connect()
+
+                due = self.pop_due()
+                if due:
+                    await self.expire(self.conn, due)
+                    continue
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.next_delay())
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Expiry scheduler error: {e}")
+                await self._close_connection()
+                await asyncio.sleep(self.retry_delay)
+
+    async def _close_connection(self):
+        if self.conn is not None and not self.conn.is_closed():
+            try:
+                await self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+    def start(self, database_url: str):
+        """Start the background expiry loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self.database_url = database_url
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the expiry loop and release its connection"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_connection()
+
+
+# Global expiry scheduler instance
+expiry_scheduler = ExpiryScheduler()
@@ -0,0 +1,105 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time as dt_time, timezone
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+
+import asyncpg
+
+from utils.reference_data import reference_data
+
+EXPORT_CHUNK_SIZE = 5000
+
+# Column order for CSV exports; NDJSON rows carry the same keys
+EXPORT_COLUMNS = [
+    "id", "pair_id", "created_at", "updated_at", "expires_at", "status",
+    "gross_spread_pct", "net_spread_pct", "expected_profit_pct", "expected_profit_usd",
+    "max_tradable_amount", "venue_a_side", "venue_b_side", "venue_a_price", "venue_b_price",
+    "venue_a_liquidity", "venue_b_liquidity", "risk_level", "confidence_score",
+    "market_a_id", "market_a_title", "market_a_category", "venue_a_name", "venue_a_type",
+    "market_b_id", "market_b_title", "market_b_category", "venue_b_name", "venue_b_type",
+]
+
+EXPORT_QUERY = """
+SELECT ao.id, ao.pair_id, ao.created_at, ao.updated_at, ao.expires_at, ao.status,
+       ao.gross_spread_pct, ao.net_spread_pct, ao.expected_profit_pct, ao.expected_profit_usd,
+       ao.max_tradable_amount, ao.venue_a_side, ao.venue_b_side, ao.venue_a_price, ao.venue_b_price,
+       ao.venue_a_liquidity, ao.venue_b_liquidity, ao.risk_level,
+       mp.confidence_score, mp.market_a_id, mp.market_b_id
+FROM arbitrage_opportunities ao
+JOIN market_pairs mp ON ao.pair_id = mp.id
+WHERE ao.created_at BETWEEN $1 AND $2
+"""
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def export_range(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """Inclusive UTC timestamp range covering whole days"""
+    return (
+        datetime.combine(start_date, dt_time.min, tzinfo=timezone.utc),
+        datetime.combine(end_date, dt_time.max, tzinfo=timezone.utc)
+    )
+
+
+def export_query(status: Optional[str]) -> str:
+    """Export SELECT, ordered by created_at so partial exports are a clean prefix"""
+    query = EXPORT_QUERY
+    if status:
+        query += " AND ao.status = $3"
+    return query + " ORDER BY ao.created_at, ao.id"
+
+
+async def iter_opportunity_chunks(conn: asyncpg.Connection, start: datetime, end: datetime,
+                                  status: Optional[str] = None,
+                                  chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Read opportunities through a server-side cursor, enriched chunk by chunk
+
+    Only one chunk is held in memory at a time, whatever the size of the
+    range. Market and venue details come from the reference cache.
+    """
+    await reference_data.ensure_loaded(conn)
+    query = export_query(status)
+    params = [start, end] + ([status] if status else [])
+    async with conn.transaction(readonly=True):
+        cursor = await conn.cursor(query, *params)
+        while True:
+            rows = await cursor.fetch(chunk_size)
+            if not rows:
+                break
+            await reference_data.fill_markets(
+                conn, [row['market_a_id'] for row in rows] + [row['market_b_id'] for row in rows]
+            )
+            yield [reference_data.enrich_opportunity(dict(row)) for row in rows]
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, '__float__'):
+        return float(value)
+    return str(value)
+
+
+def ndjson_chunk(rows: List[Dict[str, Any]]) -> bytes:
+    return "".join(
+        json.dumps({column: row.get(column) for column in EXPORT_COLUMNS}, default=_json_value) + "\n"
+        for row in rows
+    ).encode()
+
+
+def csv_chunk(rows: List[Dict[str, Any]], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in (row.get(column) for column in EXPORT_COLUMNS)
+        ])
+    return buffer.getvalue().encode()
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import time
+from typing import Optional, Dict, Any, Set
+
+import asyncpg
+
+FEE_CHANNEL = "venue_fee_changed"
+
+# Advisory lock namespace; the second key is hashtext(venue_id), so one
+# worker recomputes a venue while the others skip the notification
+LOCK_NAMESPACE = 48_000
+
+AFFECTED_OPPORTUNITIES_QUERY = """
+SELECT ao.id
+FROM arbitrage_opportunities ao
+JOIN market_pairs mp ON ao.pair_id = mp.id
+WHERE ao.status = 'active'
+  AND (mp.market_a_id IN (SELECT id FROM markets WHERE venue_id = $1)
+       OR mp.market_b_id IN (SELECT id FROM markets WHERE venue_id = $1))
+ORDER BY ao.id
+"""
+
+# Same formula as utils/detection.py: net = gross - (fee_a + fee_b) / 100,
+# rounded to the column scales. Unchanged rows are skipped.
+RECOMPUTE_BATCH_QUERY = """
+UPDATE arbitrage_opportunities ao
+SET net_spread_pct = fees.net,
+    expected_profit_pct = fees.net,
+    expected_profit_usd = ROUND(fees.net / 100 * ao.max_tradable_amount, 2),
+    updated_at = CURRENT_TIMESTAMP
+FROM (
+    SELECT o.id,
+           ROUND(o.gross_spread_pct - (COALESCE(va.fee_bps, 0) + COALESCE(vb.fee_bps, 0)) / 100.0, 4) AS net
+    FROM arbitrage_opportunities o
+    JOIN market_pairs mp ON o.pair_id = mp.id
+    JOIN markets ma ON mp.market_a_id = ma.id
+    JOIN markets mb ON mp.market_b_id = mb.id
+    LEFT JOIN venues va ON ma.venue_id = va.id
+    LEFT JOIN venues vb ON mb.venue_id = vb.id
+    WHERE o.id = ANY($1::uuid[]) AND o.status = 'active'
+) fees
+WHERE ao.id = fees.id AND ao.net_spread_pct IS DISTINCT FROM fees.net
+"""
+
+
+async def recompute_venue(conn: asyncpg.Connection, venue_id: str, batch_size: int = 5000) -> Dict[str, Any]:
+    """Re-derive net spread and expected profit of every active opportunity touching a venue
+
+    The affected ids are read once, then updated batch_size rows per
+    statement, each in its own transaction so row locks and WAL stay
+    bounded while ingestion keeps writing. Every batch re-reads the
+    current fees. The statement-level resource_changed trigger bumps the
+    opportunities version per batch, which moves ETags and the /stats cache
+    key along with the data.
+    """
+    started = time.perf_counter()
+    ids = [row['id'] for row in await conn.fetch(AFFECTED_OPPORTUNITIES_QUERY, venue_id)]
+    updated = 0
+    batches = 0
+    for offset in range(0, len(ids), batch_size):
+        status = await conn.execute(RECOMPUTE_BATCH_QUERY, ids[offset:offset + batch_size])
+        updated += int(status.split()[-1])
+        batches += 1
+    return {
+        "venue_id": str(venue_id),
+        "affected": len(ids),
+        "updated": updated,
+        "batches": batches,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class FeeRecomputer:
+    """Re-derives opportunity spreads when a venue's fee_bps changes
+
+    Fee edits arrive on the `venue_fee_changed` NOTIFY channel. Every worker
+    hears them; a per-venue advisory lock picks the one that runs the
+    recompute. A change that arrives during a run is queued and applied
+    afterwards, so the last fee always wins.
+    """
+
+    def __init__(self, batch_size: int = 5000, retry_delay: float = 5.0):
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.database_url: Optional[str] = None
+        self.conn: Optional[asyncpg.Connection] = None
+        self._pending: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._pending.add(payload)
+        self._wakeup.set()
+
+    async def recompute(self, venue_id: str) -> Optional[Dict[str, Any]]:
+        """Run the recompute for one venue unless another worker holds its lock"""
+        locked = await self.conn.fetchval(
+            "SELECT pg_try_advisory_lock($1, hashtext($2))", LOCK_NAMESPACE, venue_id
+        )
+        if not locked:
+            return None
+        try:
+            result = await recompute_venue(self.conn, venue_id, self.batch_size)
+        finally:
+            await self.conn.execute("SELECT pg_advisory_unlock($1, hashtext($2))", LOCK_NAMESPACE, venue_id)
+        self.last_run = result
+        print(f"💱 Fee change on venue {venue_id}: {result['updated']} of {result['affected']} "
+              f"active opportunities re-priced in {result['seconds']} s ({result['batches']} batches)")
+        return result
+
+    async def _connect(self):
+        self.conn = await asyncpg.connect(
+            self.database_url,
+            timeout=30.0,
+            server_settings={'application_name': 'arblens_fee_recompute'}
+        )
+        await self.conn.add_listener(FEE_CHANNEL, self._on_notify)
+
+    async def _run(self):
+        while True:
+            try:
+                if self.conn is None or self.conn.is_closed():
+                    await self._connect()
+
+                if self._pending:
+                    venue_id = self._pending.pop()
+                    try:
+                        await self.recompute(venue_id)
+                    except Exception:
+                        self._pending.add(venue_id)
+                        raise
+                    continue
+
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Fee recompute error: {e}")
+                await self._close_connection()
+                await asyncio.sleep(self.retry_delay)
+
+    async def _close_connection(self):
+        if self.conn is not None and not self.conn.is_closed():
+            try:
+                await self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+    def start(self, database_url: str):
+        """Start listening for fee changes"""
+        if self._task is not None and not self._task.done():
+            return
+        self.database_url = database_url
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the loop and release its connection"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_connection()
+
+
+# Global fee recomputer
+fee_recomputer = FeeRecomputer(batch_size=int(os.getenv("FEE_RECOMPUTE_BATCH_SIZE", "5000")))
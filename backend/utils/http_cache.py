@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Dict, Tuple, Iterable
+
+import asyncpg
+
+from utils.database import db_manager, PRIMARY_LSN_QUERY, UNKNOWN_LSN
+
+RESOURCE_CHANNEL = "resource_changed"
+
+# Read-your-writes key (see db_manager.note_write) of the current versions;
+# reads behind ETags and version-keyed caches pass it as after=
+VERSIONS_WRITE_KEY = "resource_versions"
+
+# Tables whose writes change each cacheable GET route
+CACHEABLE_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "/api/v1/venues": ("venues",),
+    "/api/v1/markets": ("markets", "venues"),
+    "/api/v1/opportunities": ("arbitrage_opportunities", "market_pairs", "reference"),
+    "/api/v1/stats": ("arbitrage_opportunities", "markets", "venues"),
+}
+
+RESOURCES = ("venues", "markets", "arbitrage_opportunities", "market_pairs", "reference")
+
+
+class ResourceVersions:
+    """Version tokens per table, bumped by NOTIFY on every write
+
+    Triggers store each resource's version and change time in the
+    resource_versions table and send `<resource>:<n>:<epoch>` on
+    `resource_changed`, where n comes from one shared sequence. Workers load
+    the table on connect and follow the notifications, so tokens and
+    Last-Modified depend only on database state. ETags are derived from the versions of a route's tables
+    plus its query string, which makes If-None-Match checks a dict lookup.
+    Until the listener is connected no validators are issued.
+
+    With read replicas, each bump is stamped with the primary's WAL
+    position under VERSIONS_WRITE_KEY. Reads passing that key only go to
+    replicas that have replayed it, so a body is never older than the
+    versions in its ETag or cache key. Until the stamp query returns, the
+    position is UNKNOWN_LSN and those reads stay on the primary.
+    """
+
+    def __init__(self, retry_delay: float = 5.0):
+        self.retry_delay = retry_delay
+        self.versions: Dict[str, int] = {}
+        self.modified: Dict[str, float] = {}
+        self.conn: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._bumps = 0
+        self._bumped_at = 0.0
+        self._bumped = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.conn is not None and not self.conn.is_closed() and bool(self.versions)
+
+    def _on_change(self, connection, pid, channel, payload):
+        resource, _, rest = payload.partition(':')
+        version, _, modified_at = rest.partition(':')
+        try:
+            version = int(version)
+            modified_at = float(modified_at) if modified_at else time.time()
+        except ValueError:
+            return
+        self._set(resource, version, modified_at)
+
+    def _set(self, resource: str, version: int, modified_at: float):
+        if version > self.versions.get(resource, 0):
+            self.versions[resource] = version
+            self.modified[resource] = modified_at
+            self._note_bump()
+
+    def _note_bump(self):
+        if not db_manager.replicas:
+            return
+        self._bumps += 1
+        self._bumped_at = time.monotonic()
+        db_manager.record_write(VERSIONS_WRITE_KEY, UNKNOWN_LSN, self._bumped_at, pinned=True)
+        self._bumped.set()
+
+    async def _stamp(self):
+        """Record the primary WAL position covering every version seen so far"""
+        while self._bumped.is_set():
+            self._bumped.clear()
+            bumps, bumped_at = self._bumps, self._bumped_at
+            lsn = await self.conn.fetchval(PRIMARY_LSN_QUERY)
+            # A bump that arrived during the query may be newer than lsn; go again
+            if bumps == self._bumps:
+                db_manager.record_write(VERSIONS_WRITE_KEY, lsn, bumped_at, pinned=True)
+
+    def version_key(self, resources: Iterable[str]) -> str:
+        """Compact key of the current versions, usable in cache keys"""
+        return "-".join(str(self.versions.get(resource, 0)) for resource in resources)
+
+    def validators(self, resources: Iterable[str], query: str = "") -> Optional[Tuple[str, float]]:
+        """(ETag, Last-Modified timestamp) for a route, or None while not ready"""
+        if not self.ready:
+            return None
+        resources = tuple(resources)
+        digest = hashlib.blake2b(f"{self.version_key(resources)}?{query}".encode(), digest_size=12).hexdigest()
+        return f'W/"{digest}"', max(self.modified.get(resource, 0.0) for resource in resources)
+
+    async def load(self, conn: asyncpg.Connection):
+        """Current version and change time of every resource, as stored by the triggers"""
+        rows = await conn.fetch(
+            "SELECT resource, version, extract(epoch FROM modified_at)::float8 AS modified_at FROM resource_versions"
+        )
+        for row in rows:
+            self._set(row['resource'], row['version'], row['modified_at'])
+
+    async def _run(self, database_url: str):
+        while True:
+            try:
+                self.conn = await asyncpg.connect(
+                    database_url,
+                    timeout=30.0,
+                    server_settings={'application_name': 'arblens_resource_versions'}
+                )
+                await self.conn.add_listener(RESOURCE_CHANNEL, self._on_change)
+                await self.load(self.conn)
+                self._note_bump()
+                while not self.conn.is_closed():
+                    await self._stamp()
+                    try:
+                        await asyncio.wait_for(self._bumped.wait(), self.retry_delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Resource version listener error: {e}")
+            if self.conn is not None and not self.conn.is_closed():
+                await self.conn.close()
+            self.conn = None
+            # Changes may have been missed while disconnected
+            self.versions.clear()
+            await asyncio.sleep(self.retry_delay)
+
+    def start(self, database_url: str):
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(database_url))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.conn is not None and not self.conn.is_closed():
+            await self.conn.close()
+        self.conn = None
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(headers, etag: str, last_modified: float) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110)"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: ignore W/ prefixes
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in candidates
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def validator_headers(etag: str, last_modified: float) -> Dict[str, str]:
+    return {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": "no-cache",
+    }
+
+
+# Global resource version registry
+resource_versions = ResourceVersions()
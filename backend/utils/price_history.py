@@ -0,0 +1,319 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple, Iterable
+
+import asyncpg
+import numpy as np
+
+# Per tick: int64 timestamp (ms) + float32 yes_price + float32 no_price = 16 bytes,
+# i.e. ~16 MB per million ticks held in memory (see benchmarks/bench_price_history.py)
+TICK_BYTES = 16
+
+
+class PriceRing:
+    """Fixed-capacity ring buffer of price ticks for a single market"""
+
+    __slots__ = ("capacity", "ts", "yes", "no", "head", "size")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.yes = np.zeros(capacity, dtype=np.float32)
+        self.no = np.zeros(capacity, dtype=np.float32)
+        self.head = 0
+        self.size = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.ts.nbytes + self.yes.nbytes + self.no.nbytes
+
+    def last_ts(self) -> Optional[int]:
+        if not self.size:
+            return None
+        return int(self.ts[(self.head - 1) % self.capacity])
+
+    def append(self, ts_ms: int, yes_price: float, no_price: float):
+        """Append a tick; ticks not newer than the latest one are dropped"""
+        last = self.last_ts()
+        if last is not None and ts_ms <= last:
+            return
+        self.ts[self.head] = ts_ms
+        self.yes[self.head] = yes_price
+        self.no[self.head] = no_price
+        self.head = (self.head + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def extend(self, ts_ms: np.ndarray, yes: np.ndarray, no: np.ndarray):
+        """Append a time-ordered batch of ticks"""
+        last = self.last_ts()
+        if last is not None:
+            keep = ts_ms > last
+            ts_ms, yes, no = ts_ms[keep], yes[keep], no[keep]
+        n = len(ts_ms)
+        if n == 0:
+            return
+        if n >= self.capacity:
+            ts_ms, yes, no = ts_ms[-self.capacity:], yes[-self.capacity:], no[-self.capacity:]
+            n = self.capacity
+        idx = (self.head + np.arange(n)) % self.capacity
+        self.ts[idx] = ts_ms
+        self.yes[idx] = yes
+        self.no[idx] = no
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def merge(self, ts_ms: np.ndarray, yes: np.ndarray, no: np.ndarray):
+        """Add a time-ordered batch that may reach back before the newest tick
+
+        Late ticks are slotted into place and replace a tick at the same
+        timestamp; the ring is rebuilt, which only happens for late batches.
+        """
+        last = self.last_ts()
+        if last is None or not len(ts_ms) or ts_ms[0] > last:
+            self.extend(ts_ms, yes, no)
+            return
+        ts = np.concatenate((self._ordered(self.ts), ts_ms))
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        yes = np.concatenate((self._ordered(self.yes), yes))[order]
+        no = np.concatenate((self._ordered(self.no), no))[order]
+        # The later entry for a timestamp is the batch's
+        keep = np.append(ts[1:] != ts[:-1], True)
+        ts, yes, no = ts[keep][-self.capacity:], yes[keep][-self.capacity:], no[keep][-self.capacity:]
+        n = len(ts)
+        self.ts[:n] = ts
+        self.yes[:n] = yes
+        self.no[:n] = no
+        self.head = n % self.capacity
+        self.size = n
+
+    def _ordered(self, array: np.ndarray) -> np.ndarray:
+        if self.size < self.capacity:
+            return array[:self.size]
+        return np.concatenate((array[self.head:], array[:self.head]))
+
+    def window(self, since_ms: Optional[int] = None, until_ms: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (ts_ms, yes, no) arrays in time order within [since, until]"""
+        ts = self._ordered(self.ts)
+        lo = 0 if since_ms is None else int(np.searchsorted(ts, since_ms, side="left"))
+        hi = len(ts) if until_ms is None else int(np.searchsorted(ts, until_ms, side="right"))
+        return ts[lo:hi], self._ordered(self.yes)[lo:hi], self._ordered(self.no)[lo:hi]
+
+
+class PriceHistoryStore:
+    """Process-local store of the last N hours of price ticks per market
+
+    Ticks are persisted by the `market_price_ticks` trigger on markets; this
+    store polls the table incrementally and keeps compact NumPy ring buffers
+    so recent price paths can be read without touching the database
+    (`GET /api/v1/markets/{id}/prices`).
+
+    Polling follows the insertion sequence (seq), not ts, which is the event
+    time and can arrive late. Skipped seq values may belong to transactions
+    that have not committed yet, so they are asked for again on every
+    refresh until gap_timeout; values burnt by conflicting inserts simply
+    expire.
+    """
+
+    def __init__(self, window_hours: float = 24.0, capacity_per_market: int = 4096,
+                 refresh_interval: float = 5.0, gap_timeout: float = 60.0, max_gaps: int = 10000):
+        self.window_hours = window_hours
+        self.capacity_per_market = capacity_per_market
+        self.refresh_interval = refresh_interval
+        self.gap_timeout = gap_timeout
+        self.max_gaps = max_gaps
+        self.rings: Dict[str, PriceRing] = {}
+        self.last_seq: Optional[int] = None
+        self._gaps: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        """True once the window has been loaded from the database"""
+        return self.last_seq is not None
+
+    @property
+    def window_ms(self) -> int:
+        return int(self.window_hours * 3600 * 1000)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ring.nbytes for ring in self.rings.values())
+
+    @property
+    def tick_count(self) -> int:
+        return sum(ring.size for ring in self.rings.values())
+
+    def _ring(self, market_id: str) -> PriceRing:
+        ring = self.rings.get(market_id)
+        if ring is None:
+            ring = self.rings[market_id] = PriceRing(self.capacity_per_market)
+        return ring
+
+    def append(self, market_id: str, ts: datetime, yes_price: float, no_price: float):
+        """Record a single tick"""
+        self._ring(str(market_id)).append(int(ts.timestamp() * 1000), yes_price, no_price)
+
+    def ingest(self, rows: Iterable[Any], now_ms: Optional[int] = None):
+        """Record ticks from rows with market_id, ts, yes_price, no_price, in any order
+
+        Ticks older than the window are ignored.
+        """
+        cutoff = (int(time.time() * 1000) if now_ms is None else now_ms) - self.window_ms
+        grouped: Dict[str, List[Tuple[int, float, float]]] = {}
+        for row in rows:
+            ts_ms = int(row['ts'].timestamp() * 1000)
+            if ts_ms < cutoff:
+                continue
+            grouped.setdefault(str(row['market_id']), []).append((
+                ts_ms,
+                float(row['yes_price'] if row['yes_price'] is not None else np.nan),
+                float(row['no_price'] if row['no_price'] is not None else np.nan),
+            ))
+        for market_id, ticks in grouped.items():
+            data = np.array(ticks, dtype=np.float64)
+            data = data[np.argsort(data[:, 0], kind="stable")]
+            self._ring(market_id).merge(
+                data[:, 0].astype(np.int64),
+                data[:, 1].astype(np.float32),
+                data[:, 2].astype(np.float32),
+            )
+
+    def _advance(self, seqs: List[int], upto: int):
+        """Move the watermark to upto; values passed over and not in seqs become gaps"""
+        now = time.monotonic()
+        seen = set(seqs)
+        for seq in seen:
+            self._gaps.pop(seq, None)
+        for seq in range(max(self.last_seq + 1, upto - self.max_gaps), upto + 1):
+            if seq not in seen:
+                self._gaps[seq] = now
+        self.last_seq = max(self.last_seq, upto)
+        for seq in [seq for seq, at in self._gaps.items() if now - at > self.gap_timeout]:
+            del self._gaps[seq]
+        while len(self._gaps) > self.max_gaps:
+            del self._gaps[next(iter(self._gaps))]
+
+    def path(self, market_id: str, hours: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Return the recent price path of a market as arrays"""
+        ring = self.rings.get(str(market_id))
+        if ring is None:
+            empty = np.empty(0)
+            return {"ts": empty.astype(np.int64), "yes_price": empty, "no_price": empty}
+        hours = self.window_hours if hours is None else hours
+        since_ms = int(time.time() * 1000) - int(hours * 3600 * 1000)
+        ts, yes, no = ring.window(since_ms=since_ms)
+        return {"ts": ts, "yes_price": yes, "no_price": no}
+
+    def covers(self, market_id: str, hours: float) -> bool:
+        """True if path() holds every tick of the last hours (a full ring has dropped older ones)"""
+        if not self.ready or hours > self.window_hours:
+            return False
+        ring = self.rings.get(str(market_id))
+        if ring is None or ring.size < ring.capacity:
+            return True
+        since_ms = int(time.time() * 1000) - int(hours * 3600 * 1000)
+        return int(ring.ts[ring.head]) <= since_ms
+
+    def latest(self, market_id: str) -> Optional[Tuple[int, float, float]]:
+        """Return the newest (ts_ms, yes_price, no_price) for a market"""
+        ring = self.rings.get(str(market_id))
+        if ring is None or not ring.size:
+            return None
+        i = (ring.head - 1) % ring.capacity
+        return int(ring.ts[i]), float(ring.yes[i]), float(ring.no[i])
+
+    def evict(self, now_ms: Optional[int] = None):
+        """Drop markets whose newest tick has left the window"""
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        cutoff = now_ms - self.window_ms
+        stale = [m for m, ring in self.rings.items() if (ring.last_ts() or 0) < cutoff]
+        for market_id in stale:
+            del self.rings[market_id]
+
+    async def load(self, conn: asyncpg.Connection) -> int:
+        """Fill the buffers with the last window_hours of ticks"""
+        # Read first: anything committed later has a higher seq or is a gap
+        top = await conn.fetchval("SELECT COALESCE(max(seq), 0) FROM market_price_ticks")
+        rows = await conn.fetch(
+            """
+            SELECT market_id, ts, yes_price, no_price, seq
+            FROM market_price_ticks
+            WHERE ts >= CURRENT_TIMESTAMP - make_interval(secs => $1)
+            ORDER BY ts
+            """,
+            self.window_hours * 3600
+        )
+        self.rings = {}
+        self._gaps = {}
+        self.ingest(rows)
+        # Recent values missing from the window may still be committing
+        self.last_seq = max(top - self.max_gaps, 0)
+        self._advance([row['seq'] for row in rows if row['seq'] is not None], top)
+        return len(rows)
+
+    async def refresh(self, conn: asyncpg.Connection) -> int:
+        """Pull ticks inserted after the watermark, and any gaps that have committed since"""
+        if self.last_seq is None:
+            return await self.load(conn)
+        rows = await conn.fetch(
+            """
+            SELECT market_id, ts, yes_price, no_price, seq
+            FROM market_price_ticks
+            WHERE seq > $1 OR seq = ANY($2::bigint[])
+            ORDER BY seq
+            """,
+            self.last_seq, list(self._gaps)
+        )
+        self.ingest(rows)
+        seqs = [row['seq'] for row in rows]
+        self._advance(seqs, max(seqs, default=self.last_seq))
+        return len(rows)
+
+    async def _run(self, database_url: str):
+        conn = None
+        while True:
+            try:
+                if conn is None or conn.is_closed():
+                    conn = await asyncpg.connect(
+                        database_url,
+                        timeout=30.0,
+                        server_settings={'application_name': 'arblens_price_history'}
+                    )
+                    loaded = await self.load(conn)
+                    print(f"📈 Price history loaded {loaded} ticks for {len(self.rings)} markets")
+                else:
+                    await self.refresh(conn)
+                    self.evict()
+            except asyncio.CancelledError:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+                raise
+            except Exception as e:
+                print(f"❌ Price history refresh error: {e}")
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+                conn = None
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self, database_url: str):
+        """Start the background refresh loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(database_url))
+
+    async def stop(self):
+        """Cancel the background refresh loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global price history store
+price_history = PriceHistoryStore()
@@ -0,0 +1,274 @@
+import hmac
+import os
+import signal
+import threading
+import time
+import uuid
+from collections import deque, Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+PROFILE_OUTPUT_HEADER = b"x-profile-output"
+
+# Admin endpoints authenticate with the same header and are never profiled
+PROFILES_PATH = "/api/v1/admin/profiles"
+
+MAX_STACK_DEPTH = 128
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+def _frame_label(code) -> str:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+def _short_query(query: str, length: int = 80) -> str:
+    return " ".join(query.split())[:length]
+
+
+class RequestProfile:
+    """Samples, database time and timings for one profiled request
+
+    CPU samples are (collapsed stack -> seconds) taken on SIGPROF while this
+    request's context is running; each sample is weighted by the main
+    thread's CPU time since the previous tick, since the kernel may deliver
+    ticks less often than asked. Database time comes from asyncpg's query
+    logger on connections opened during the request. The rest of the wall
+    time was spent awaiting something else (other tasks, the API key and
+    reference-data pools, the client).
+    """
+
+    def __init__(self, method: str, path: str, query: str, sampling: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.query = query
+        self.sampling = sampling
+        self.started_at = datetime.now(timezone.utc)
+        self.status_code: Optional[int] = None
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.queries: Dict[str, List[float]] = {}
+        self.connect_time = 0.0
+        self._started = time.perf_counter()
+        self.wall_time = 0.0
+
+    @property
+    def root(self) -> str:
+        return f"{self.method} {self.path}"
+
+    def add_sample(self, frame, cpu_time: float):
+        labels = []
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            labels.append(_frame_label(frame.f_code))
+            frame = frame.f_back
+        labels.append(self.root)
+        self.samples[";".join(reversed(labels))] += cpu_time
+        self.sample_count += 1
+
+    def log_query(self, record):
+        self.queries.setdefault(_short_query(record.query), []).append(record.elapsed)
+
+    def finish(self, status_code: Optional[int]):
+        self.status_code = status_code
+        self.wall_time = time.perf_counter() - self._started
+
+    @property
+    def cpu_time(self) -> float:
+        return sum(self.samples.values())
+
+    @property
+    def db_time(self) -> float:
+        return self.connect_time + sum(sum(times) for times in self.queries.values())
+
+    @property
+    def other_await_time(self) -> float:
+        return max(0.0, self.wall_time - self.cpu_time - self.db_time)
+
+    def summary(self) -> Dict[str, Any]:
+        top = sorted(self.queries.items(), key=lambda item: sum(item[1]), reverse=True)[:10]
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status_code": self.status_code,
+            "started_at": self.started_at.isoformat(),
+            "wall_ms": round(self.wall_time * 1000, 2),
+            "cpu_ms": round(self.cpu_time * 1000, 2),
+            "db_ms": round(self.db_time * 1000, 2),
+            "other_await_ms": round(self.other_await_time * 1000, 2),
+            "samples": self.sample_count,
+            "sampling": self.sampling,
+            "top_queries": [
+                {"query": query, "calls": len(times), "total_ms": round(sum(times) * 1000, 2)}
+                for query, times in top
+            ],
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed stacks, weighted in microseconds
+
+        CPU stacks come from samples; database and other await time appear
+        as `[db] ...` and `[await]` leaves under the request root.
+        """
+        lines = [f"{stack} {int(seconds * 1e6)}" for stack, seconds in self.samples.most_common()]
+        if self.connect_time:
+            lines.append(f"{self.root};[db] connect {int(self.connect_time * 1e6)}")
+        for query, times in self.queries.items():
+            lines.append(f"{self.root};[db] {query.replace(';', ',')} {int(sum(times) * 1e6)}")
+        if self.other_await_time:
+            lines.append(f"{self.root};[await] {int(self.other_await_time * 1e6)}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestProfiler:
+    """Admin-gated, per-request sampling profiler
+
+    Profiling is enabled only when PROFILING_TOKEN is set, and a request is
+    profiled only when it sends that token in X-Profile-Token. A
+    process-wide SIGPROF timer runs while at least one profiled request is
+    in flight; each tick is charged to whichever profiled request's context
+    is executing, so concurrent requests never pollute each other. Finished
+    profiles are kept in a bounded buffer.
+    """
+
+    def __init__(self, token: Optional[str] = None, buffer_size: int = 20, interval: float = 0.001):
+        self.token = token
+        self.interval = interval
+        self.profiles: deque = deque(maxlen=buffer_size)
+        self._active = 0
+        self._handler_installed = False
+        self._last_tick = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    @property
+    def can_sample(self) -> bool:
+        # Signal handlers can only be installed from the main thread
+        return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+    def authorized(self, token: Optional[str]) -> bool:
+        return self.enabled and token is not None and hmac.compare_digest(token, self.token)
+
+    def _on_sample(self, signum, frame):
+        now = time.thread_time()
+        cpu_time, self._last_tick = now - self._last_tick, now
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.add_sample(frame, cpu_time)
+
+    def begin(self, method: str, path: str, query: str) -> RequestProfile:
+        sampling = self.can_sample
+        profile = RequestProfile(method, path, query, sampling)
+        if sampling:
+            if not self._handler_installed:
+                signal.signal(signal.SIGPROF, self._on_sample)
+                signal.siginterrupt(signal.SIGPROF, False)
+                self._handler_installed = True
+            if self._active == 0:
+                self._last_tick = time.thread_time()
+                signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+            self._active += 1
+        return profile
+
+    def end(self, profile: RequestProfile, status_code: Optional[int]):
+        if profile.sampling:
+            self._active -= 1
+            if self._active == 0:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+        profile.finish(status_code)
+        self.profiles.append(profile)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return next((p for p in self.profiles if p.id == profile_id), None)
+
+
+def track_connection(connection, connect_time: float):
+    """Attribute a connection's queries to the profiled request, if any"""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.connect_time += connect_time
+        connection.add_query_logger(profile.log_query)
+
+
+class ProfilingMiddleware:
+    """Profile requests that carry a valid X-Profile-Token
+
+    The response gains an X-Profile-Id header and the profile is kept for
+    the admin endpoints. With X-Profile-Output: collapsed the body is
+    replaced by the collapsed stacks, with the time split in Server-Timing.
+    Requests without the header, or every request when profiling is
+    disabled, pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        profiler = request_profiler
+        if scope["type"] != "http" or not profiler.enabled or scope["path"].startswith(PROFILES_PATH):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        token = headers.get(PROFILE_TOKEN_HEADER)
+        if token is None or not profiler.authorized(token.decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        collapsed = headers.get(PROFILE_OUTPUT_HEADER, b"").lower() == b"collapsed"
+        profile = profiler.begin(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"))
+        context_token = _current_profile.set(profile)
+        status_code = None
+
+        async def send_profiled(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if collapsed:
+                    return
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.id.encode()),
+                ]
+            elif collapsed:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            _current_profile.reset(context_token)
+            profiler.end(profile, status_code)
+
+        if collapsed:
+            summary = profile.summary()
+            body = profile.collapsed().encode()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-profile-id", profile.id.encode()),
+                    (b"x-profile-status", str(status_code).encode()),
+                    (b"server-timing", server_timing(summary).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+
+
+def server_timing(summary: Dict[str, Any]) -> str:
+    return (f"cpu;dur={summary['cpu_ms']}, db;dur={summary['db_ms']}, "
+            f"await;dur={summary['other_await_ms']}, total;dur={summary['wall_ms']}")
+
+
+# Global request profiler; disabled unless PROFILING_TOKEN is set
+request_profiler = RequestProfiler(
+    token=os.getenv("PROFILING_TOKEN") or None,
+    buffer_size=int(os.getenv("PROFILE_BUFFER_SIZE", "20"))
+)
@@ -0,0 +1,112 @@
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Type
+
+from pydantic import BaseModel
+
+from utils.reference_data import reference_data
+
+OPPORTUNITY_COLUMNS = [
+    "id", "pair_id", "gross_spread_pct", "net_spread_pct", "expected_profit_pct", "expected_profit_usd",
+    "max_tradable_amount", "venue_a_side", "venue_b_side", "venue_a_price", "venue_b_price",
+    "venue_a_liquidity", "venue_b_liquidity", "risk_level", "status", "expires_at", "created_at", "updated_at",
+]
+
+PAIR_COLUMNS = ["confidence_score", "market_a_id", "market_b_id", "is_manual_override"]
+
+# Filled in from the reference cache; they need the pair's market ids
+ENRICHED_FIELDS = {
+    "market_a_title", "market_a_category", "venue_a_name", "venue_a_type",
+    "market_b_title", "market_b_category", "venue_b_name", "venue_b_type",
+}
+
+LEG_FIELDS = {"market_a": "ma", "market_b": "mb"}
+
+MARKET_COLUMNS = [
+    "id", "venue_id", "external_id", "title", "description", "category", "event_date", "resolution_date",
+    "yes_price", "no_price", "yes_liquidity", "no_liquidity", "volume_24h", "tick_size", "market_url",
+    "status", "last_updated", "created_at",
+]
+
+PAIR_JOIN = "JOIN market_pairs mp ON ao.pair_id = mp.id"
+
+
+def _jsonable(value):
+    if hasattr(value, '__float__'):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    """Requested field names, validated against a response model; None means all fields"""
+    if fields is None:
+        return None
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    if not requested:
+        raise ValueError("fields must name at least one field")
+    unknown = [f for f in requested if f not in model.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(model.model_fields)}")
+    return requested
+
+
+class OpportunityProjection:
+    """SELECT list and joins needed for a set of opportunity fields
+
+    Only requested columns are read, market_pairs is joined only when a
+    pair column, a reference-data field or a filter needs it, and each
+    leg's markets row is joined only when that leg is requested. Leg
+    columns are aliased `market_a__<column>` so legs never collide.
+    """
+
+    def __init__(self, fields: Optional[List[str]], filtering: bool = False, detail: bool = False):
+        self.fields = fields
+        wanted = set(fields) if fields is not None else None
+        ao = OPPORTUNITY_COLUMNS if wanted is None else [c for c in OPPORTUNITY_COLUMNS if c in wanted]
+        pair_columns = PAIR_COLUMNS if detail else PAIR_COLUMNS[:3]
+        pair = pair_columns if wanted is None else [c for c in pair_columns if c in wanted]
+        self.enrich = wanted is None or bool(wanted & ENRICHED_FIELDS)
+        self.legs = [leg for leg in LEG_FIELDS if detail and (wanted is None or leg in wanted)]
+        if self.enrich:
+            pair = list(dict.fromkeys(pair + ["market_a_id", "market_b_id"]))
+        self.join_pair = filtering or bool(pair) or bool(self.legs)
+
+        select = [f"ao.{c}" for c in ao] + [f"mp.{c}" for c in pair]
+        for leg in self.legs:
+            alias = LEG_FIELDS[leg]
+            select += [f"{alias}.{c} as {leg}__{c}" for c in MARKET_COLUMNS]
+        # Something must be selected even for fields served only from the cache
+        self.select = ", ".join(select) or "ao.id"
+
+    @property
+    def joins(self) -> str:
+        joins = [PAIR_JOIN] if self.join_pair else []
+        for leg in self.legs:
+            alias = LEG_FIELDS[leg]
+            joins.append(f"LEFT JOIN markets {alias} ON mp.{leg}_id = {alias}.id")
+        return " ".join(joins)
+
+    def shape(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Enrich a fetched row, nest leg columns and keep only the requested keys"""
+        for leg in self.legs:
+            prefix = f"{leg}__"
+            market = {key[len(prefix):]: _jsonable(row.pop(key)) for key in list(row) if key.startswith(prefix)}
+            if market.get("id") is None:
+                row[leg] = None
+            else:
+                venue = reference_data.venues.get(str(market["venue_id"]), {})
+                market["venue_name"] = venue.get("name")
+                market["venue_type"] = venue.get("venue_type")
+                market["venue_fee_bps"] = venue.get("fee_bps")
+                row[leg] = market
+        if self.enrich:
+            reference_data.enrich_opportunity(row)
+        if self.fields is not None:
+            row = {field: row.get(field) for field in self.fields}
+        return row
+
+    def market_ids(self, rows) -> List[Any]:
+        if not self.enrich:
+            return []
+        return [row['market_a_id'] for row in rows] + [row['market_b_id'] for row in rows]
@@ -0,0 +1,236 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterable, Set
+
+import asyncpg
+
+REFERENCE_CHANNEL = "reference_data_changed"
+
+MARKET_COLUMNS = "id, venue_id, title, category"
+
+
+def _jsonable(row) -> Dict[str, Any]:
+    item = dict(row)
+    for key, value in item.items():
+        if hasattr(value, '__float__'):
+            item[key] = float(value)
+        elif isinstance(value, datetime):
+            item[key] = value.isoformat()
+    return item
+
+
+class ReferenceDataCache:
+    """Warm in-process copy of venues and market title/category
+
+    Venues are a handful of rows and market metadata rarely changes, so hot
+    queries skip those joins and rows are enriched from here after the
+    fetch. Changes arrive as `venues:<id>` / `markets:<id>` payloads on the
+    `reference_data_changed` channel and only the changed rows are re-read.
+    Markets missing from the cache are fetched on demand.
+    """
+
+    def __init__(self, batch_window: float = 0.1, retry_delay: float = 5.0, max_age: float = 300.0):
+        self.batch_window = batch_window
+        self.retry_delay = retry_delay
+        self.max_age = max_age
+        self.venues: Dict[str, Dict[str, Any]] = {}
+        self.venue_ids_by_name: Dict[str, str] = {}
+        self.markets: Dict[str, Dict[str, Any]] = {}
+        self.markets_by_category: Dict[Optional[str], Set[str]] = {}
+        self.markets_by_venue: Dict[str, Set[str]] = {}
+        self.loaded_at: Optional[float] = None
+        self.version = 0
+        self.conn: Optional[asyncpg.Connection] = None
+        self._changed: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def listening(self) -> bool:
+        return self.conn is not None and not self.conn.is_closed()
+
+    def _on_change(self, connection, pid, channel, payload):
+        self._changed.add(payload)
+        self._wakeup.set()
+
+    def _put_venue(self, row):
+        venue = _jsonable(row)
+        venue_id = str(venue['id'])
+        venue['id'] = venue_id
+        old = self.venues.get(venue_id)
+        if old is not None:
+            self.venue_ids_by_name.pop(old['name'], None)
+        self.venues[venue_id] = venue
+        self.venue_ids_by_name[venue['name']] = venue_id
+
+    def _drop_venue(self, venue_id: str):
+        old = self.venues.pop(venue_id, None)
+        if old is not None:
+            self.venue_ids_by_name.pop(old['name'], None)
+
+    def _put_market(self, row):
+        market_id = str(row['id'])
+        self._drop_market(market_id)
+        market = {
+            'venue_id': str(row['venue_id']) if row['venue_id'] else None,
+            'title': row['title'],
+            'category': row['category'],
+        }
+        self.markets[market_id] = market
+        self.markets_by_category.setdefault(market['category'], set()).add(market_id)
+        if market['venue_id']:
+            self.markets_by_venue.setdefault(market['venue_id'], set()).add(market_id)
+
+    def _drop_market(self, market_id: str):
+        old = self.markets.pop(market_id, None)
+        if old is None:
+            return
+        self.markets_by_category.get(old['category'], set()).discard(market_id)
+        if old['venue_id']:
+            self.markets_by_venue.get(old['venue_id'], set()).discard(market_id)
+
+    async def load(self, conn: asyncpg.Connection):
+        """Replace the cache with a full read of both tables"""
+        venue_rows = await conn.fetch("SELECT * FROM venues")
+        market_rows = await conn.fetch(f"SELECT {MARKET_COLUMNS} FROM markets")
+        self.venues, self.venue_ids_by_name = {}, {}
+        self.markets, self.markets_by_category, self.markets_by_venue = {}, {}, {}
+        for row in venue_rows:
+            self._put_venue(row)
+        for row in market_rows:
+            self._put_market(row)
+        self.loaded_at = time.monotonic()
+        self.version += 1
+
+    @property
+    def stale(self) -> bool:
+        """Never loaded, or too old while change notifications are not arriving"""
+        return self.loaded_at is None or (not self.listening and time.monotonic() - self.loaded_at > self.max_age)
+
+    async def ensure_loaded(self, conn: asyncpg.Connection):
+        if self.stale:
+            await self.load(conn)
+
+    async def apply_changes(self, conn: asyncpg.Connection, payloads: Iterable[str]):
+        """Re-read only the venues and markets named in change payloads"""
+        ids: Dict[str, List[str]] = {'venues': [], 'markets': []}
+        for payload in payloads:
+            table, _, row_id = payload.partition(':')
+            if table in ids and row_id:
+                ids[table].append(row_id)
+
+        if ids['venues']:
+            rows = await conn.fetch("SELECT * FROM venues WHERE id = ANY($1::uuid[])", ids['venues'])
+            found = {str(row['id']) for row in rows}
+            for row in rows:
+                self._put_venue(row)
+            for venue_id in set(ids['venues']) - found:
+                self._drop_venue(venue_id)
+        if ids['markets']:
+            rows = await conn.fetch(f"SELECT {MARKET_COLUMNS} FROM markets WHERE id = ANY($1::uuid[])", ids['markets'])
+            found = {str(row['id']) for row in rows}
+            for row in rows:
+                self._put_market(row)
+            for market_id in set(ids['markets']) - found:
+                self._drop_market(market_id)
+        if ids['venues'] or ids['markets']:
+            self.version += 1
+
+    async def fill_markets(self, conn: asyncpg.Connection, market_ids: Iterable[Any]):
+        """Fetch markets created since the last notification was processed"""
+        missing = {str(market_id) for market_id in market_ids if market_id is not None} - self.markets.keys()
+        if missing:
+            rows = await conn.fetch(f"SELECT {MARKET_COLUMNS} FROM markets WHERE id = ANY($1::uuid[])", list(missing))
+            for row in rows:
+                self._put_market(row)
+
+    def venue_ids(self, names: Iterable[str]) -> List[str]:
+        return [self.venue_ids_by_name[name] for name in names if name in self.venue_ids_by_name]
+
+    def market_ids(self, category: Optional[str] = None, venue_ids: Optional[List[str]] = None) -> List[str]:
+        """Ids of cached markets matching a category and/or any of the venues"""
+        result: Optional[Set[str]] = None
+        if category is not None:
+            result = set(self.markets_by_category.get(category, ()))
+        if venue_ids is not None:
+            by_venue = set().union(*(self.markets_by_venue.get(v, set()) for v in venue_ids))
+            result = by_venue if result is None else result & by_venue
+        return list(result or ())
+
+    def list_venues(self, status: Optional[str] = None, venue_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        venues = [
+            v for v in self.venues.values()
+            if (not status or v['status'] == status) and (not venue_type or v['venue_type'] == venue_type)
+        ]
+        return sorted(venues, key=lambda v: v['name'])
+
+    def enrich_market(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Add venue_name/venue_type to a markets row"""
+        venue = self.venues.get(str(row.get('venue_id')), {})
+        row['venue_name'] = venue.get('name')
+        row['venue_type'] = venue.get('venue_type')
+        return row
+
+    def enrich_opportunity(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Add market titles/categories and venue names/types for both legs"""
+        for leg in ('a', 'b'):
+            market = self.markets.get(str(row.get(f'market_{leg}_id')), {})
+            venue = self.venues.get(market.get('venue_id'), {})
+            row[f'market_{leg}_title'] = market.get('title')
+            row[f'market_{leg}_category'] = market.get('category')
+            row[f'venue_{leg}_name'] = venue.get('name')
+            row[f'venue_{leg}_type'] = venue.get('venue_type')
+        return row
+
+    async def _connect(self, database_url: str):
+        self.conn = await asyncpg.connect(
+            database_url,
+            timeout=30.0,
+            server_settings={'application_name': 'arblens_reference_data'}
+        )
+        await self.conn.add_listener(REFERENCE_CHANNEL, self._on_change)
+        # Listen before loading so no change falls between the two
+        await self.load(self.conn)
+        print(f"📚 Reference data loaded: {len(self.venues)} venues, {len(self.markets)} markets")
+
+    async def _run(self, database_url: str):
+        while True:
+            try:
+                if not self.listening:
+                    await self._connect(database_url)
+                await self._wakeup.wait()
+                await asyncio.sleep(self.batch_window)
+                self._wakeup.clear()
+                changed, self._changed = self._changed, set()
+                await self.apply_changes(self.conn, changed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Reference data error: {e}")
+                if self.conn is not None and not self.conn.is_closed():
+                    await self.conn.close()
+                self.conn = None
+                await asyncio.sleep(self.retry_delay)
+
+    def start(self, database_url: str):
+        """Load reference data and keep it current from change notifications"""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(database_url))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.conn is not None and not self.conn.is_closed():
+            await self.conn.close()
+        self.conn = None
+
+
+# Global reference data cache
+reference_data = ReferenceDataCache()
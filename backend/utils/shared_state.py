@@ -0,0 +1,417 @@
+import asyncio
+import contextvars
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+INVALIDATION_CHANNEL = "arblens:invalidate"
+KEY_PREFIX = "arblens:"
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second"""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, rate: float, now: Optional[float] = None):
+        self.capacity = float(max(capacity, 1))
+        self.rate = float(rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def take(self, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Consume one token; returns (allowed, seconds until the next token)"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+
+class InMemoryBackend:
+    """Process-local backend with the same semantics as RedisBackend
+
+    Used when no REDIS_URL is configured or Redis is unreachable. Sharing
+    one instance between several SharedState objects stands in for Redis in
+    tests and benchmarks, including pub/sub fan-out.
+    """
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[str, float]] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._subscribers: Dict[str, List[Callable[[str], None]]] = {}
+
+    def _alive(self, key: str) -> Optional[str]:
+        item = self._values.get(key)
+        if item is None:
+            return None
+        if item[1] <= time.monotonic():
+            del self._values[key]
+            return None
+        return item[0]
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._alive(key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        self._values[key] = (value, time.monotonic() + ttl)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._values.pop(key, None)
+
+    async def delete_prefix(self, prefix: str):
+        for key in [k for k in self._values if k.startswith(prefix)]:
+            del self._values[key]
+
+    async def acquire(self, key: str, token: str, ttl: float) -> bool:
+        if self._alive(key) is not None:
+            return False
+        self._values[key] = (token, time.monotonic() + ttl)
+        return True
+
+    async def release(self, key: str, token: str):
+        if self._alive(key) == token:
+            del self._values[key]
+
+    async def take_token(self, key: str, capacity: float, rate: float) -> Tuple[bool, float, float]:
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.capacity != max(capacity, 1) or bucket.rate != rate:
+            bucket = self._buckets[key] = TokenBucket(capacity, rate)
+        allowed, retry_after = bucket.take()
+        return allowed, retry_after, bucket.tokens
+
+    async def publish(self, channel: str, message: str):
+        for callback in self._subscribers.get(channel, []):
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]):
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    async def close(self):
+        pass
+
+
+# Refill and take one token atomically; state lives in a hash per bucket
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+# Delete a lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBackend:
+    """Redis-backed values, locks, token buckets and invalidation pub/sub"""
+
+    def __init__(self, redis_url: str):
+        self.client = redis_asyncio.from_url(redis_url, decode_responses=True, socket_timeout=1.0)
+        self._token_bucket = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._release = self.client.register_script(RELEASE_LOCK_SCRIPT)
+        self._pubsub = None
+
+    async def ping(self):
+        await self.client.ping()
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(KEY_PREFIX + key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self.client.set(KEY_PREFIX + key, value, px=int(ttl * 1000))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*(KEY_PREFIX + key for key in keys))
+
+    async def delete_prefix(self, prefix: str, batch: int = 500):
+        """SCAN for keys under prefix and UNLINK them in batches; never blocks Redis with KEYS"""
+        pattern = KEY_PREFIX + "".join("\\" + c if c in "*?[]\\" else c for c in prefix) + "*"
+        keys = []
+        async for key in self.client.scan_iter(match=pattern, count=batch):
+            keys.append(key)
+            if len(keys) >= batch:
+                await self.client.unlink(*keys)
+                keys = []
+        if keys:
+            await self.client.unlink(*keys)
+
+    async def acquire(self, key: str, token: str, ttl: float) -> bool:
+        return bool(await self.client.set(KEY_PREFIX + key, token, nx=True, px=int(ttl * 1000)))
+
+    async def release(self, key: str, token: str):
+        await self._release(keys=[KEY_PREFIX + key], args=[token])
+
+    async def take_token(self, key: str, capacity: float, rate: float) -> Tuple[bool, float, float]:
+        capacity = max(capacity, 1)
+        allowed, tokens = await self._token_bucket(keys=[KEY_PREFIX + key], args=[capacity, rate, time.time()])
+        tokens = float(tokens)
+        return bool(allowed), 0.0 if allowed else (1 - tokens) / rate, tokens
+
+    async def publish(self, channel: str, message: str):
+        await self.client.publish(channel, message)
+
+    async def listen(self, channel: str, callback: Callable[[str], None], ping_interval: float = 10.0):
+        """Deliver messages on a channel until cancelled or the connection drops
+
+        A quiet channel is normal: reads wait with their own timeout instead
+        of the client's socket_timeout, and a PING every ping_interval
+        without traffic detects a dead connection by its missing reply.
+        """
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(channel)
+        loop = asyncio.get_running_loop()
+        last_seen = pinged_at = loop.time()
+        try:
+            while True:
+                message = await self._pubsub.get_message(timeout=min(1.0, ping_interval))
+                now = loop.time()
+                if message is not None:
+                    last_seen = now
+                    if message.get("type") == "message":
+                        callback(message["data"])
+                elif now - last_seen >= 3 * ping_interval:
+                    raise ConnectionError(f"No reply from Redis pub/sub in {now - last_seen:.0f} s")
+                if now - max(last_seen, pinged_at) >= ping_interval:
+                    await self._pubsub.ping()
+                    pinged_at = now
+        finally:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class SharedState:
+    """Two-tier cache, single-flight loads and rate limits shared across workers
+
+    A small local tier with a short TTL sits in front of the shared backend
+    (Redis when REDIS_URL is set). Loads are single-flight within a process
+    through a future per key and across processes through a lock in the
+    backend. Invalidations are published so every worker drops its local
+    copy. If Redis is missing or fails, everything falls back to
+    process-local state and Redis is retried periodically.
+    """
+
+    def __init__(self, local_ttl: float = 2.0, local_size: int = 1024, lock_ttl: float = 10.0,
+                 lock_poll: float = 0.05, retry_interval: float = 30.0):
+        self.local_ttl = local_ttl
+        self.local_size = local_size
+        self.lock_ttl = lock_ttl
+        self.lock_poll = lock_poll
+        self.retry_interval = retry_interval
+        self.local = InMemoryBackend()
+        self.local.subscribe(INVALIDATION_CHANNEL, self._on_invalidate)
+        self.remote = None
+        self._remote_ok = False
+        self._tier: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"local_hits": 0, "shared_hits": 0, "loads": 0, "fallbacks": 0}
+
+    @property
+    def shared(self) -> bool:
+        """True while a shared backend is in use"""
+        return self.remote is not None and self._remote_ok
+
+    @property
+    def backend(self):
+        return self.remote if self.shared else self.local
+
+    def use_backend(self, backend):
+        """Share an existing backend, e.g. one InMemoryBackend across several instances in tests"""
+        self.remote = backend
+        self._remote_ok = True
+        if isinstance(backend, InMemoryBackend):
+            backend.subscribe(INVALIDATION_CHANNEL, self._on_invalidate)
+
+    def _on_invalidate(self, key: str):
+        if key.endswith("*"):
+            prefix = key[:-1]
+            for cached in [k for k in self._tier if k.startswith(prefix)]:
+                del self._tier[cached]
+        else:
+            self._tier.pop(key, None)
+
+    async def _call(self, method: str, *args):
+        backend = self.backend
+        try:
+            return await getattr(backend, method)(*args)
+        except Exception as e:
+            if backend is self.local:
+                raise
+            print(f"❌ Shared state unavailable, using process-local state: {e}")
+            self._remote_ok = False
+            self.stats["fallbacks"] += 1
+            return await getattr(self.local, method)(*args)
+
+    def _local_get(self, key: str):
+        item = self._tier.get(key)
+        if item is None:
+            return None
+        if item[1] <= time.monotonic():
+            del self._tier[key]
+            return None
+        self._tier.move_to_end(key)
+        return item
+
+    def _local_set(self, key: str, value: Any, ttl: float):
+        self._tier[key] = (value, time.monotonic() + min(ttl, self.local_ttl))
+        self._tier.move_to_end(key)
+        if len(self._tier) > self.local_size:
+            self._tier.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Any]:
+        item = self._local_get(key)
+        if item is not None:
+            self.stats["local_hits"] += 1
+            return item[0]
+        raw = await self._call("get", key)
+        if raw is None:
+            return None
+        self.stats["shared_hits"] += 1
+        value = json.loads(raw)
+        self._local_set(key, value, self.local_ttl)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self._call("set", key, json.dumps(value, default=str), ttl)
+        self._local_set(key, value, ttl)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        """Cached value for key, running loader at most once across workers on a miss"""
+        item = self._local_get(key)
+        if item is not None:
+            self.stats["local_hits"] += 1
+            return item[0]
+        load = self._inflight.get(key)
+        if load is None:
+            # The load runs in its own task that every caller only awaits, so a
+            # caller cancelled mid-load (client disconnect) does not fail the
+            # others. A fresh context keeps it off the first caller's request
+            # deadline, whose connections are closed when that request ends.
+            load = asyncio.create_task(self._load_shared(key, loader, ttl), context=contextvars.Context())
+            self._inflight[key] = load
+            load.add_done_callback(lambda done: self._load_done(key, done))
+        return await asyncio.shield(load)
+
+    def _load_done(self, key: str, load: asyncio.Task):
+        if self._inflight.get(key) is load:
+            del self._inflight[key]
+        if not load.cancelled():
+            # Retrieved here in case every caller has gone away
+            load.exception()
+
+    async def _load_shared(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_ttl
+        while True:
+            value = await self.get(key)
+            if value is not None:
+                return value
+            if await self._call("acquire", lock_key, token, self.lock_ttl) or time.monotonic() >= deadline:
+                break
+            # Another worker is loading; wait for its result
+            await asyncio.sleep(self.lock_poll)
+        try:
+            self.stats["loads"] += 1
+            value = await loader()
+            await self.set(key, value, ttl)
+            return value
+        finally:
+            await self._call("release", lock_key, token)
+
+    async def invalidate(self, *keys: str):
+        """Drop keys everywhere; a trailing `*` drops every key with that prefix"""
+        exact = [key for key in keys if not key.endswith("*")]
+        if exact:
+            await self._call("delete", *exact)
+        for key in keys:
+            if key.endswith("*"):
+                await self._call("delete_prefix", key[:-1])
+            self._on_invalidate(key)
+            if self.shared:
+                await self._call("publish", INVALIDATION_CHANNEL, key)
+
+    async def take_token(self, key: str, capacity: float, rate: float) -> Tuple[bool, float, float]:
+        """Charge one request against a shared token bucket: (allowed, retry_after, remaining)"""
+        return await self._call("take_token", f"ratelimit:{key}", capacity, rate)
+
+    async def _run(self, redis_url: str):
+        while True:
+            try:
+                if self.remote is None:
+                    self.remote = RedisBackend(redis_url)
+                await self.remote.ping()
+                self._remote_ok = True
+                # Entries cached while disconnected may have missed invalidations
+                self._tier.clear()
+                print("✅ Shared state connected to Redis")
+                await self.remote.listen(INVALIDATION_CHANNEL, self._on_invalidate)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._remote_ok:
+                    self.stats["fallbacks"] += 1
+                print(f"❌ Redis unavailable, using process-local state: {e}")
+            self._remote_ok = False
+            await asyncio.sleep(self.retry_interval)
+
+    def start(self, redis_url: Optional[str] = None):
+        """Connect to Redis if configured; otherwise stay process-local"""
+        redis_url = redis_url or os.getenv("REDIS_URL")
+        if not redis_url:
+            return
+        if redis_asyncio is None:
+            print("⚠️  REDIS_URL is set but the redis package is not installed; using process-local state")
+            return
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run(redis_url))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.remote is not None:
+            await self.remote.close()
+            self.remote = None
+        self._remote_ok = False
+
+
+# Global shared state instance
+shared_state = SharedState()
@@ -0,0 +1,98 @@
+import heapq
+from typing import Optional, Dict, Any
+
+import numpy as np
+
+
+def simulate_execution(entry_ts: np.ndarray, release_ts: np.ndarray, pair_index: np.ndarray,
+                       max_tradable_amount: np.ndarray, net_spread_pct: np.ndarray,
+                       initial_capital_usd: float,
+                       max_position_usd: Optional[float] = None) -> Dict[str, Any]:
+    """Event-driven, capital-constrained replay of opportunities
+
+    Opportunities are taken in entry order. Each position is sized by
+    min(max_tradable_amount, free bankroll, max_position_usd) and locks its
+    capital until release_ts (market resolution), when capital plus PnL
+    returns to the bankroll via a priority queue of releases. A pair with an
+    open position is not entered again until that position is released.
+    Timestamps are in seconds; PnL is realized at release.
+    """
+    order = np.argsort(entry_ts, kind="stable")
+    entries = np.asarray(entry_ts, dtype=np.float64)[order].tolist()
+    releases = np.maximum(np.asarray(release_ts, dtype=np.float64)[order], entries).tolist()
+    pairs = np.asarray(pair_index)[order].tolist()
+    sizes = np.nan_to_num(np.asarray(max_tradable_amount, dtype=np.float64))[order].tolist()
+    rates = (np.asarray(net_spread_pct, dtype=np.float64) / 100)[order].tolist()
+    position_cap = float("inf") if max_position_usd is None else float(max_position_usd)
+
+    heappush, heappop = heapq.heappush, heapq.heappop
+    pending = []
+    open_pairs = set()
+    cash = float(initial_capital_usd)
+    locked = 0.0
+    equity = cash
+    peak_equity = equity
+    max_drawdown = 0.0
+    max_utilization = 0.0
+    taken = skipped_capital = skipped_open = 0
+    deployed = 0.0
+    utilization_area = 0.0
+    last_t = entries[0] if entries else 0.0
+
+    def release_until(t):
+        nonlocal cash, locked, equity, peak_equity, max_drawdown, utilization_area, last_t
+        while pending and pending[0][0] <= t:
+            release_t, capital, pnl, pair = heappop(pending)
+            if equity > 0:
+                utilization_area += locked / equity * (release_t - last_t)
+            last_t = release_t
+            locked -= capital
+            cash += capital + pnl
+            equity += pnl
+            open_pairs.discard(pair)
+            if equity > peak_equity:
+                peak_equity = equity
+            elif peak_equity > 0:
+                drawdown = (peak_equity - equity) / peak_equity
+                if drawdown > max_drawdown:
+                    max_drawdown = drawdown
+
+    for t, release_t, pair, size, rate in zip(entries, releases, pairs, sizes, rates):
+        if pending and pending[0][0] <= t:
+            release_until(t)
+        if pair in open_pairs:
+            skipped_open += 1
+            continue
+        position = min(size, cash, position_cap)
+        if position <= 0:
+            skipped_capital += 1
+            continue
+        if equity > 0:
+            utilization_area += locked / equity * (t - last_t)
+        last_t = t
+        cash -= position
+        locked += position
+        if equity > 0 and locked / equity > max_utilization:
+            max_utilization = locked / equity
+        deployed += position
+        taken += 1
+        open_pairs.add(pair)
+        heappush(pending, (release_t, position, position * rate, pair))
+
+    start_t = entries[0] if entries else 0.0
+    release_until(float("inf"))
+    duration = last_t - start_t
+
+    return {
+        "initial_capital_usd": round(float(initial_capital_usd), 2),
+        "ending_capital_usd": round(cash, 2),
+        "total_pnl_usd": round(cash - initial_capital_usd, 2),
+        "total_return_pct": round((cash / initial_capital_usd - 1) * 100, 4) if initial_capital_usd else 0.0,
+        "trades_taken": taken,
+        "skipped_insufficient_capital": skipped_capital,
+        "skipped_pair_already_open": skipped_open,
+        "capital_deployed_usd": round(deployed, 2),
+        "avg_utilization_pct": round(utilization_area / duration * 100, 4) if duration > 0 else 0.0,
+        "max_utilization_pct": round(max_utilization * 100, 4),
+        "max_drawdown_pct": round(max_drawdown * 100, 4),
+    }
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import time
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable
+
+# Requests that do not count as the "first request" of the process
+PROBE_PATHS = {"/health", "/health/ready"}
+
+
+async def asgi_request(app, method: str, path: str, query_string: bytes = b"", body: bytes = b"") -> int:
+    """Run one request through an ASGI app in-process and return its status code"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string,
+        "root_path": "",
+        "headers": [(b"host", b"warmup"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("warmup", 80),
+    }
+    status = 0
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+class StartupWarmup:
+    """Cold-start sequence, readiness gate and cold-start timings
+
+    Startup runs the warm-up steps in a background task so the server
+    accepts connections (and answers liveness probes) immediately, while
+    /health/ready stays 503 until every step has finished. Step durations,
+    the time spent importing main, and the latency of the first real request
+    are kept for the readiness report.
+
+    A failing step (the database briefly unreachable during a deploy) is
+    retried with exponential backoff. After max_attempts the instance
+    reports ready without being warm, since requests create the pool and
+    fill the caches lazily, and the last error stays in the report.
+    """
+
+    def __init__(self, max_attempts: int = 5, retry_delay: float = 1.0, max_retry_delay: float = 30.0):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.ready = False
+        self.warm = False
+        self.attempts: Dict[str, int] = {}
+        self.error: Optional[str] = None
+        self.import_seconds: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+        self.started_at: Optional[float] = None
+        self.ready_seconds: Optional[float] = None
+        self.first_request: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self, steps: List[Tuple[str, Callable[[], Awaitable]]]):
+        delay = self.retry_delay
+        for name, step in steps:
+            while True:
+                self.attempts[name] = self.attempts.get(name, 0) + 1
+                step_started = time.perf_counter()
+                try:
+                    await step()
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.error = f"{name}: {type(e).__name__}: {e}"
+                if self.attempts[name] >= self.max_attempts:
+                    print(f"❌ Warm-up gave up after {self.attempts[name]} attempts ({self.error}); "
+                          f"reporting ready without warming")
+                    self.mark_ready()
+                    return
+                print(f"⚠️  Warm-up step failed ({self.error}), attempt {self.attempts[name]} of "
+                      f"{self.max_attempts}; retrying in {delay:.0f} s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+            self.steps[name] = round((time.perf_counter() - step_started) * 1000, 1)
+        self.error = None
+        self.warm = True
+        self.mark_ready()
+        print(f"✅ Warm and ready in {self.ready_seconds * 1000:.0f} ms ({self.steps})")
+
+    def start(self, steps: List[Tuple[str, Callable[[], Awaitable]]]):
+        self.started_at = time.perf_counter()
+        self._task = asyncio.create_task(self._run(steps))
+
+    def mark_ready(self):
+        """Ready; without warming when warm-up is disabled or gave up"""
+        self.started_at = self.started_at or time.perf_counter()
+        self.ready_seconds = time.perf_counter() - self.started_at
+        self.ready = True
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def record_request(self, path: str, elapsed: float):
+        if self.first_request is None and path not in PROBE_PATHS:
+            self.first_request = {
+                "path": path,
+                "latency_ms": round(elapsed * 1000, 1),
+                "before_ready": not self.ready,
+            }
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warm": self.warm,
+            "error": self.error,
+            "attempts": self.attempts,
+            "import_ms": round(self.import_seconds * 1000, 1) if self.import_seconds is not None else None,
+            "warmup_ms": round(self.ready_seconds * 1000, 1) if self.ready_seconds is not None else None,
+            "steps_ms": self.steps,
+            "first_request": self.first_request,
+        }
+
+
+# Global startup state
+startup_warmup = StartupWarmup(max_attempts=int(os.getenv("STARTUP_WARMUP_ATTEMPTS", "5")))
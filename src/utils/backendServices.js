@@ -309,6 +309,25 @@ export const arbitrageService = {
     };
 
     return executeWithFallback(backendFn, supabaseFn, 'getOpportunityById');
+  },
+
+  async getOpportunitiesByIds(opportunityIds, fields = null) {
+    const backendFn = async () => {
+      const data = await makeApiRequest('/api/v1/opportunities/batch', {
+        method: 'POST',
+        body: JSON.stringify({ ids: opportunityIds, ...(fields ? { fields } : {}) }),
+      });
+      return data?.opportunities || [];
+    };
+
+    const supabaseFn = async () => {
+      const results = await Promise.all(
+        opportunityIds?.map((id) => supabaseServices?.arbitrageService?.getOpportunityById(id))
+      );
+      return results?.filter(Boolean);
+    };
+
+    return executeWithFallback(backendFn, supabaseFn, 'getOpportunitiesByIds');
   }
 };
 
@@ -0,0 +1,50 @@
+-- Location: supabase/migrations/20251019090000_opportunity_expiry_notify.sql
+-- Schema Analysis: Extends existing ArbLens arbitrage_opportunities table
+-- Dependencies: arbitrage_opportunities (existing)
+-- Integration Type: Change notifications for the backend expiry scheduler
+-- Tables Modified: None (trigger only)
+-- Tables Added: None
+
+-- ===================================
+-- EXPIRY LOOKUP INDEX
+-- ===================================
+
+-- Startup load of the expiry heap only reads active rows with a deadline
+CREATE INDEX IF NOT EXISTS idx_opportunities_active_expires_at
+ON public.arbitrage_opportunities(expires_at)
+WHERE status = 'active' AND expires_at IS NOT NULL;
+
+-- ===================================
+-- EXPIRY CHANGE NOTIFICATIONS
+-- ===================================
+
+-- Publishes inserts and expiry/status changes so the scheduler heap stays current
+CREATE OR REPLACE FUNCTION public.notify_opportunity_expiry()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.expires_at IS NOT DISTINCT FROM OLD.expires_at
+       AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+        RETURN NEW;
+    END IF;
+
+    PERFORM pg_notify(
+        'opportunity_expiry',
+        json_build_object(
+            'id', NEW.id,
+            'expires_at', NEW.expires_at,
+            'status', NEW.status
+        )::text
+    );
+    RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS on_opportunity_expiry_change ON public.arbitrage_opportunities;
+CREATE TRIGGER on_opportunity_expiry_change
+    AFTER INSERT OR UPDATE OF expires_at, status ON public.arbitrage_opportunities
+    FOR EACH ROW EXECUTE FUNCTION public.notify_opportunity_expiry();
+
+COMMENT ON FUNCTION public.notify_opportunity_expiry() IS
+'Sends opportunity expiry changes on the opportunity_expiry channel for the backend expiry scheduler.';
@@ -0,0 +1,103 @@
+-- Location: supabase/migrations/20251019100000_market_price_ticks.sql
+-- Schema Analysis: Extends existing ArbLens market data with price history
+-- Dependencies: markets (existing)
+-- Integration Type: Append-only, time-partitioned tick storage
+-- Tables Modified: markets (price change trigger)
+-- Tables Added: market_price_ticks (partitioned by month)
+
+-- ===================================
+-- PRICE TICK TABLE
+-- ===================================
+
+CREATE TABLE IF NOT EXISTS public.market_price_ticks (
+    market_id UUID NOT NULL REFERENCES public.markets(id) ON DELETE CASCADE,
+    ts TIMESTAMPTZ NOT NULL,
+    yes_price DECIMAL(10,4),
+    no_price DECIMAL(10,4),
+    yes_liquidity DECIMAL(18,2),
+    no_liquidity DECIMAL(18,2),
+
+    PRIMARY KEY (market_id, ts)
+) PARTITION BY RANGE (ts);
+
+-- Catches ticks outside the pre-created monthly partitions so inserts never fail
+CREATE TABLE IF NOT EXISTS public.market_price_ticks_default
+PARTITION OF public.market_price_ticks DEFAULT;
+
+-- Time-ordered scans across all markets (backtest replay, incremental refresh)
+CREATE INDEX IF NOT EXISTS idx_market_price_ticks_ts
+ON public.market_price_ticks(ts);
+
+ALTER TABLE public.market_price_ticks ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "public_can_read_market_price_ticks"
+ON public.market_price_ticks
+FOR SELECT
+TO public
+USING (true);
+
+-- ===================================
+-- PARTITION MANAGEMENT
+-- ===================================
+
+-- Creates the monthly partition containing the given day
+CREATE OR REPLACE FUNCTION public.create_price_tick_partition(month_start DATE)
+RETURNS TEXT
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    range_start DATE := date_trunc('month', month_start)::DATE;
+    range_end DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::DATE;
+    partition_name TEXT := 'market_price_ticks_' || to_char(range_start, 'YYYY_MM');
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.market_price_ticks
+         FOR VALUES FROM (%L) TO (%L)',
+        partition_name, range_start, range_end
+    );
+    RETURN partition_name;
+END $$;
+
+-- Current month plus the next two; call periodically to keep ahead of ingestion
+DO $$
+BEGIN
+    PERFORM public.create_price_tick_partition(CURRENT_DATE);
+    PERFORM public.create_price_tick_partition((CURRENT_DATE + INTERVAL '1 month')::DATE);
+    PERFORM public.create_price_tick_partition((CURRENT_DATE + INTERVAL '2 months')::DATE);
+END $$;
+
+-- ===================================
+-- TICK CAPTURE
+-- ===================================
+
+-- Appends a tick whenever a market's prices are overwritten by a sync
+CREATE OR REPLACE FUNCTION public.record_market_price_tick()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.yes_price IS NOT DISTINCT FROM OLD.yes_price
+       AND NEW.no_price IS NOT DISTINCT FROM OLD.no_price THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO public.market_price_ticks (market_id, ts, yes_price, no_price, yes_liquidity, no_liquidity)
+    VALUES (NEW.id, COALESCE(NEW.last_updated, CURRENT_TIMESTAMP), NEW.yes_price, NEW.no_price,
+            NEW.yes_liquidity, NEW.no_liquidity)
+    ON CONFLICT (market_id, ts) DO NOTHING;
+    RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS on_market_price_change ON public.markets;
+CREATE TRIGGER on_market_price_change
+    AFTER INSERT OR UPDATE OF yes_price, no_price ON public.markets
+    FOR EACH ROW EXECUTE FUNCTION public.record_market_price_tick();
+
+COMMENT ON TABLE public.market_price_ticks IS
+'Append-only price history per market, range-partitioned by month on ts.';
+
+COMMENT ON FUNCTION public.create_price_tick_partition(DATE) IS
+'Creates the monthly market_price_ticks partition for the given date. Should be called ahead of each new month.';
@@ -0,0 +1,13 @@
+-- Location: supabase/migrations/20251019110000_backtest_replay_mode.sql
+-- Schema Analysis: Extends existing ArbLens backtests table
+-- Dependencies: backtests (existing), market_price_ticks
+-- Integration Type: Replay backtest parameters
+-- Tables Modified: backtests (mode, fee_adjustment_bps, min_confidence_score)
+-- Tables Added: None
+
+-- 'recorded' aggregates arbitrage_opportunities rows; 'replay' re-runs detection over market_price_ticks
+ALTER TABLE public.backtests
+    ADD COLUMN IF NOT EXISTS mode TEXT DEFAULT 'recorded',
+    ADD COLUMN IF NOT EXISTS fee_adjustment_bps INTEGER DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS min_confidence_score INTEGER DEFAULT 0
+        CHECK (min_confidence_score >= 0 AND min_confidence_score <= 100);
@@ -0,0 +1,10 @@
+-- Location: supabase/migrations/20251019120000_backtest_simulation.sql
+-- Schema Analysis: Extends existing ArbLens backtests table
+-- Dependencies: backtests (existing)
+-- Integration Type: Capital-constrained execution simulation results
+-- Tables Modified: backtests (simulation)
+-- Tables Added: None
+
+-- Realized PnL, utilization and drawdown from the event-driven simulator; NULL when not requested
+ALTER TABLE public.backtests
+    ADD COLUMN IF NOT EXISTS simulation JSONB;
@@ -0,0 +1,10 @@
+-- Location: supabase/migrations/20251019130000_backtest_confidence_intervals.sql
+-- Schema Analysis: Extends existing ArbLens backtests table
+-- Dependencies: backtests (existing)
+-- Integration Type: Block bootstrap confidence intervals for backtest metrics
+-- Tables Modified: backtests (confidence_intervals)
+-- Tables Added: None
+
+-- Lower/median/upper bounds for Sharpe, drawdown and total return; NULL when not requested
+ALTER TABLE public.backtests
+    ADD COLUMN IF NOT EXISTS confidence_intervals JSONB;
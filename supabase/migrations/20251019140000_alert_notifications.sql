@@ -0,0 +1,54 @@
+-- Location: supabase/migrations/20251019140000_alert_notifications.sql
+-- Schema Analysis: Extends existing ArbLens alerting tables
+-- Dependencies: alert_rules, arbitrage_opportunities (existing)
+-- Integration Type: Change notifications for the backend alert engine
+-- Tables Modified: None (triggers only)
+-- Tables Added: None
+
+-- ===================================
+-- ALERT RULE CHANGES
+-- ===================================
+
+-- Sends the changed rule id so the engine re-reads only that rule. Only
+-- columns the engine and dispatcher read fire it; the dispatcher's own
+-- last_triggered_at claims must not reload the rule in every worker.
+CREATE OR REPLACE FUNCTION public.notify_alert_rule_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('alert_rules_changed', COALESCE(NEW.id, OLD.id)::text);
+    RETURN COALESCE(NEW, OLD);
+END $$;
+
+DROP TRIGGER IF EXISTS on_alert_rule_change ON public.alert_rules;
+CREATE TRIGGER on_alert_rule_change
+    AFTER INSERT OR DELETE OR UPDATE OF
+        user_id, name, min_spread_pct, min_liquidity_usd, venue_filter, category_filter,
+        alert_types, email_address, telegram_chat_id, webhook_url, status
+    ON public.alert_rules
+    FOR EACH ROW EXECUTE FUNCTION public.notify_alert_rule_change();
+
+-- ===================================
+-- NEW OPPORTUNITIES
+-- ===================================
+
+CREATE OR REPLACE FUNCTION public.notify_opportunity_created()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('opportunity_created', NEW.id::text);
+    RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS on_opportunity_created ON public.arbitrage_opportunities;
+CREATE TRIGGER on_opportunity_created
+    AFTER INSERT ON public.arbitrage_opportunities
+    FOR EACH ROW EXECUTE FUNCTION public.notify_opportunity_created();
+
+COMMENT ON FUNCTION public.notify_alert_rule_change() IS
+'Sends changed alert rule ids on the alert_rules_changed channel for incremental reloads.';
+
+COMMENT ON FUNCTION public.notify_opportunity_created() IS
+'Sends new opportunity ids on the opportunity_created channel for alert rule matching.';
@@ -0,0 +1,45 @@
+-- Location: supabase/migrations/20251019150000_api_key_revocation.sql
+-- Schema Analysis: Extends existing ArbLens API key management
+-- Dependencies: api_keys (existing)
+-- Integration Type: Change notifications for the backend API key cache
+-- Tables Modified: None (triggers and index only)
+-- Tables Added: None
+
+-- ===================================
+-- KEY LOOKUP
+-- ===================================
+
+-- Backend lookups filter on the hash of active keys only
+CREATE INDEX IF NOT EXISTS idx_api_keys_hash_active
+    ON public.api_keys(key_hash) WHERE is_active = true;
+
+-- ===================================
+-- KEY CHANGES
+-- ===================================
+
+-- Sends the old key hash so the backend evicts that cached key.
+-- last_used_at-only updates come from the backend itself and are skipped.
+CREATE OR REPLACE FUNCTION public.notify_api_key_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.key_hash = OLD.key_hash
+       AND NEW.is_active IS NOT DISTINCT FROM OLD.is_active
+       AND NEW.tier = OLD.tier
+       AND NEW.rate_limit_per_minute IS NOT DISTINCT FROM OLD.rate_limit_per_minute
+       AND NEW.expires_at IS NOT DISTINCT FROM OLD.expires_at THEN
+        RETURN NEW;
+    END IF;
+    PERFORM pg_notify('api_keys_changed', OLD.key_hash);
+    RETURN COALESCE(NEW, OLD);
+END $$;
+
+DROP TRIGGER IF EXISTS on_api_key_change ON public.api_keys;
+CREATE TRIGGER on_api_key_change
+    AFTER UPDATE OR DELETE ON public.api_keys
+    FOR EACH ROW EXECUTE FUNCTION public.notify_api_key_change();
+
+COMMENT ON FUNCTION public.notify_api_key_change() IS
+'Sends revoked or edited key hashes on the api_keys_changed channel so the backend drops cached keys.';
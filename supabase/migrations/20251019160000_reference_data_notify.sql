@@ -0,0 +1,47 @@
+-- Location: supabase/migrations/20251019160000_reference_data_notify.sql
+-- Schema Analysis: Extends existing ArbLens venue and market tables
+-- Dependencies: venues, markets (existing)
+-- Integration Type: Change notifications for the backend reference data cache
+-- Tables Modified: None (triggers only)
+-- Tables Added: None
+
+-- ===================================
+-- VENUE CHANGES
+-- ===================================
+
+-- Payloads are '<table>:<id>' so one channel serves both tables
+CREATE OR REPLACE FUNCTION public.notify_reference_data_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('reference_data_changed', TG_TABLE_NAME || ':' || COALESCE(NEW.id, OLD.id)::text);
+    RETURN COALESCE(NEW, OLD);
+END $$;
+
+DROP TRIGGER IF EXISTS on_venue_reference_change ON public.venues;
+CREATE TRIGGER on_venue_reference_change
+    AFTER INSERT OR UPDATE OR DELETE ON public.venues
+    FOR EACH ROW EXECUTE FUNCTION public.notify_reference_data_change();
+
+-- ===================================
+-- MARKET METADATA CHANGES
+-- ===================================
+
+-- Price and liquidity updates are frequent and do not touch cached columns
+DROP TRIGGER IF EXISTS on_market_reference_insert_delete ON public.markets;
+CREATE TRIGGER on_market_reference_insert_delete
+    AFTER INSERT OR DELETE ON public.markets
+    FOR EACH ROW EXECUTE FUNCTION public.notify_reference_data_change();
+
+DROP TRIGGER IF EXISTS on_market_reference_update ON public.markets;
+CREATE TRIGGER on_market_reference_update
+    AFTER UPDATE ON public.markets
+    FOR EACH ROW
+    WHEN (OLD.title IS DISTINCT FROM NEW.title
+          OR OLD.category IS DISTINCT FROM NEW.category
+          OR OLD.venue_id IS DISTINCT FROM NEW.venue_id)
+    EXECUTE FUNCTION public.notify_reference_data_change();
+
+COMMENT ON FUNCTION public.notify_reference_data_change() IS
+'Sends <table>:<id> on the reference_data_changed channel when venues or market title/category/venue change.';
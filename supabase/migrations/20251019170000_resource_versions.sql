@@ -0,0 +1,71 @@
+-- Location: supabase/migrations/20251019170000_resource_versions.sql
+-- Schema Analysis: Extends existing ArbLens market data tables
+-- Dependencies: venues, markets, market_pairs, arbitrage_opportunities (existing),
+--               notify_reference_data_change (20251019160000)
+-- Integration Type: Version tokens for ETag / conditional GET support in the backend
+-- Tables Modified: None (sequence and triggers only)
+-- Tables Added: None
+
+-- ===================================
+-- VERSION SEQUENCE
+-- ===================================
+
+-- One sequence for all resources: nextval never blocks writers and every
+-- backend worker sees the same number for a change
+CREATE SEQUENCE IF NOT EXISTS public.resource_version_seq;
+
+-- ===================================
+-- TABLE WRITES
+-- ===================================
+
+-- Statement-level, so a bulk upsert costs one notification
+CREATE OR REPLACE FUNCTION public.notify_resource_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('resource_changed', TG_TABLE_NAME || ':' || nextval('public.resource_version_seq'));
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS on_venues_resource_change ON public.venues;
+CREATE TRIGGER on_venues_resource_change
+    AFTER INSERT OR UPDATE OR DELETE ON public.venues
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_resource_change();
+
+DROP TRIGGER IF EXISTS on_markets_resource_change ON public.markets;
+CREATE TRIGGER on_markets_resource_change
+    AFTER INSERT OR UPDATE OR DELETE ON public.markets
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_resource_change();
+
+DROP TRIGGER IF EXISTS on_market_pairs_resource_change ON public.market_pairs;
+CREATE TRIGGER on_market_pairs_resource_change
+    AFTER INSERT OR UPDATE OR DELETE ON public.market_pairs
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_resource_change();
+
+DROP TRIGGER IF EXISTS on_opportunities_resource_change ON public.arbitrage_opportunities;
+CREATE TRIGGER on_opportunities_resource_change
+    AFTER INSERT OR UPDATE OR DELETE ON public.arbitrage_opportunities
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_resource_change();
+
+-- ===================================
+-- REFERENCE DATA
+-- ===================================
+
+-- Venue and market metadata changes also bump the 'reference' resource,
+-- which opportunity listings depend on instead of every market price tick
+CREATE OR REPLACE FUNCTION public.notify_reference_data_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('reference_data_changed', TG_TABLE_NAME || ':' || COALESCE(NEW.id, OLD.id)::text);
+    PERFORM pg_notify('resource_changed', 'reference:' || nextval('public.resource_version_seq'));
+    RETURN COALESCE(NEW, OLD);
+END $$;
+
+COMMENT ON SEQUENCE public.resource_version_seq IS
+'Shared version counter for backend ETags; advanced by notify_resource_change.';
+
+COMMENT ON FUNCTION public.notify_resource_change() IS
+'Sends <table>:<version> on the resource_changed channel after each write statement.';
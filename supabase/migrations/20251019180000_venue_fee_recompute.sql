@@ -0,0 +1,48 @@
+-- Location: supabase/migrations/20251019180000_venue_fee_recompute.sql
+-- Schema Analysis: Extends existing ArbLens venue and opportunity tables
+-- Dependencies: venues, markets, market_pairs, arbitrage_opportunities (existing)
+-- Integration Type: Fee change notifications for the backend spread recompute
+-- Tables Modified: None (trigger and indexes only)
+-- Tables Added: None
+
+-- ===================================
+-- FEE CHANGE NOTIFICATIONS
+-- ===================================
+
+-- Payload is the venue id; fires only when fee_bps actually changes
+CREATE OR REPLACE FUNCTION public.notify_venue_fee_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('venue_fee_changed', NEW.id::text);
+    RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS on_venue_fee_change ON public.venues;
+CREATE TRIGGER on_venue_fee_change
+    AFTER UPDATE OF fee_bps ON public.venues
+    FOR EACH ROW
+    WHEN (OLD.fee_bps IS DISTINCT FROM NEW.fee_bps)
+    EXECUTE FUNCTION public.notify_venue_fee_change();
+
+COMMENT ON FUNCTION public.notify_venue_fee_change() IS
+'Sends the venue id on venue_fee_changed so the backend re-derives net spreads of its active opportunities.';
+
+-- ===================================
+-- INDEXES FOR THE AFFECTED-SET LOOKUP
+-- ===================================
+
+-- market_a_id is already covered by UNIQUE(market_a_id, market_b_id)
+CREATE INDEX IF NOT EXISTS idx_market_pairs_market_b
+ON public.market_pairs(market_b_id);
+
+CREATE INDEX IF NOT EXISTS idx_opportunities_active_pair
+ON public.arbitrage_opportunities(pair_id)
+WHERE status = 'active';
+
+COMMENT ON INDEX public.idx_market_pairs_market_b IS
+'Finds pairs whose second leg trades on a venue whose fee changed.';
+
+COMMENT ON INDEX public.idx_opportunities_active_pair IS
+'Finds the active opportunities of a set of pairs for the fee recompute.';
@@ -0,0 +1,35 @@
+-- Location: supabase/migrations/20251019190000_market_search.sql
+-- Schema Analysis: Extends existing ArbLens markets table
+-- Dependencies: markets (existing)
+-- Integration Type: Trigram indexes for /api/v1/markets?q= typeahead search
+-- Tables Modified: None (extension and indexes only)
+-- Tables Added: None
+--
+-- The indexes are built CONCURRENTLY so ingestion keeps writing to markets
+-- while they build. CREATE INDEX CONCURRENTLY cannot run inside a
+-- transaction block, so apply this file on its own, e.g.
+--   psql "$DATABASE_URL" -f supabase/migrations/20251019190000_market_search.sql
+-- An interrupted build leaves an INVALID index that IF NOT EXISTS would
+-- keep; drop it with DROP INDEX CONCURRENTLY before re-running.
+
+-- ===================================
+-- TRIGRAM EXTENSION
+-- ===================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+-- ===================================
+-- SEARCH INDEXES
+-- ===================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_markets_title_trgm
+ON public.markets USING gin (title extensions.gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_markets_description_trgm
+ON public.markets USING gin (description extensions.gin_trgm_ops);
+
+COMMENT ON INDEX public.idx_markets_title_trgm IS
+'Trigram index for q= search; serves the <% (word similarity) filter on market titles.';
+
+COMMENT ON INDEX public.idx_markets_description_trgm IS
+'Trigram index for q= search over market descriptions.';
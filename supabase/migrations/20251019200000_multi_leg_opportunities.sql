@@ -0,0 +1,120 @@
+-- Location: supabase/migrations/20251019200000_multi_leg_opportunities.sql
+-- Schema Analysis: Extends existing ArbLens market and opportunity model
+-- Dependencies: markets, market_pairs, venues, opportunity_status (existing)
+-- Integration Type: Multi-venue and multi-outcome (Dutch book) arbitrage detection
+-- Tables Modified: None
+-- Tables Added: outcome_groups, outcome_group_markets, multi_leg_opportunities, multi_leg_opportunity_legs
+
+-- ===================================
+-- OUTCOME GROUPS
+-- ===================================
+
+-- Mutually exclusive outcomes of one event ("Who wins X?"), one binary market
+-- per outcome. Equivalent markets on other venues are found through
+-- market_pairs, so each outcome needs to be listed on one venue only.
+CREATE TABLE IF NOT EXISTS public.outcome_groups (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    name TEXT NOT NULL,
+    -- Exactly one outcome must resolve yes; enables the YES cover
+    is_exhaustive BOOLEAN NOT NULL DEFAULT false,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS public.outcome_group_markets (
+    group_id UUID NOT NULL REFERENCES public.outcome_groups(id) ON DELETE CASCADE,
+    market_id UUID NOT NULL REFERENCES public.markets(id) ON DELETE CASCADE,
+
+    PRIMARY KEY (group_id, market_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_outcome_group_markets_market
+ON public.outcome_group_markets(market_id);
+
+-- ===================================
+-- MULTI-LEG OPPORTUNITIES
+-- ===================================
+
+-- kind: 'binary' (YES and NO of one proposition across 3+ venues),
+-- 'yes_cover' (YES on every outcome of an exhaustive group, pays 1),
+-- 'no_cover' (NO on every outcome of a group, pays n - 1)
+CREATE TABLE IF NOT EXISTS public.multi_leg_opportunities (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    signature TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('binary', 'yes_cover', 'no_cover')),
+    group_id UUID REFERENCES public.outcome_groups(id) ON DELETE CASCADE,
+    leg_count INTEGER NOT NULL,
+    total_cost DECIMAL(10,4) NOT NULL,
+    payout DECIMAL(10,4) NOT NULL,
+    gross_spread_pct DECIMAL(8,4) NOT NULL,
+    net_spread_pct DECIMAL(8,4) NOT NULL,
+    max_sets DECIMAL(18,2),
+    stake_usd DECIMAL(18,2),
+    expected_profit_usd DECIMAL(18,2),
+    status public.opportunity_status DEFAULT 'active'::public.opportunity_status,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- One active row per cover; re-detections update it in place
+CREATE UNIQUE INDEX IF NOT EXISTS idx_multi_leg_opportunities_active_signature
+ON public.multi_leg_opportunities(signature)
+WHERE status = 'active';
+
+CREATE INDEX IF NOT EXISTS idx_multi_leg_opportunities_active_spread
+ON public.multi_leg_opportunities(net_spread_pct DESC)
+WHERE status = 'active';
+
+CREATE TABLE IF NOT EXISTS public.multi_leg_opportunity_legs (
+    opportunity_id UUID NOT NULL REFERENCES public.multi_leg_opportunities(id) ON DELETE CASCADE,
+    leg_index INTEGER NOT NULL,
+    market_id UUID NOT NULL REFERENCES public.markets(id) ON DELETE CASCADE,
+    venue_id UUID REFERENCES public.venues(id) ON DELETE CASCADE,
+    side TEXT NOT NULL CHECK (side IN ('yes', 'no')),
+    price DECIMAL(10,4) NOT NULL,
+    liquidity DECIMAL(18,2),
+    fee_bps INTEGER DEFAULT 0,
+
+    PRIMARY KEY (opportunity_id, leg_index)
+);
+
+ALTER TABLE public.outcome_groups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.outcome_group_markets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.multi_leg_opportunities ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.multi_leg_opportunity_legs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "public_can_read_outcome_groups"
+ON public.outcome_groups
+FOR SELECT
+TO public
+USING (true);
+
+CREATE POLICY "public_can_read_outcome_group_markets"
+ON public.outcome_group_markets
+FOR SELECT
+TO public
+USING (true);
+
+CREATE POLICY "public_can_read_multi_leg_opportunities"
+ON public.multi_leg_opportunities
+FOR SELECT
+TO public
+USING (true);
+
+CREATE POLICY "public_can_read_multi_leg_opportunity_legs"
+ON public.multi_leg_opportunity_legs
+FOR SELECT
+TO public
+USING (true);
+
+COMMENT ON TABLE public.outcome_groups IS
+'Sets of mutually exclusive outcomes of one event, scanned for Dutch-book arbitrage.';
+
+COMMENT ON TABLE public.outcome_group_markets IS
+'One binary market per outcome of an outcome group.';
+
+COMMENT ON TABLE public.multi_leg_opportunities IS
+'Arbitrage spanning three or more venues or a whole outcome group; legs in multi_leg_opportunity_legs.';
+
+COMMENT ON TABLE public.multi_leg_opportunity_legs IS
+'Cheapest venue, side, price and liquidity per outcome of a multi-leg opportunity.';
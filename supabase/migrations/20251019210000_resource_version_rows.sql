@@ -0,0 +1,86 @@
+-- Location: supabase/migrations/20251019210000_resource_version_rows.sql
+-- Schema Analysis: Extends the resource version triggers (20251019170000)
+-- Dependencies: resource_version_seq, notify_resource_change, notify_reference_data_change
+-- Integration Type: Database-held version per resource, so every backend worker
+--                   derives the same ETag and Last-Modified for unchanged data
+-- Tables Modified: None
+-- Tables Added: resource_versions
+
+-- ===================================
+-- CURRENT VERSIONS
+-- ===================================
+
+-- Last version and change time of each resource; workers load it on connect
+-- instead of seeding every resource from the sequence's last_value
+CREATE TABLE IF NOT EXISTS public.resource_versions (
+    resource TEXT PRIMARY KEY,
+    version BIGINT NOT NULL,
+    modified_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO public.resource_versions (resource, version)
+SELECT resource, (SELECT last_value FROM public.resource_version_seq)
+FROM unnest(ARRAY['venues', 'markets', 'arbitrage_opportunities', 'market_pairs', 'reference']) AS resource
+ON CONFLICT (resource) DO NOTHING;
+
+-- Records and announces a new version of one resource. The row lock is held
+-- until the writing transaction commits, which orders concurrent writers of
+-- the same table; ingest writes each table from one process.
+CREATE OR REPLACE FUNCTION public.bump_resource_version(resource_name TEXT)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_version BIGINT := nextval('public.resource_version_seq');
+BEGIN
+    INSERT INTO public.resource_versions (resource, version, modified_at)
+    VALUES (resource_name, new_version, CURRENT_TIMESTAMP)
+    ON CONFLICT (resource) DO UPDATE SET
+        version = GREATEST(public.resource_versions.version, EXCLUDED.version),
+        modified_at = EXCLUDED.modified_at;
+    PERFORM pg_notify(
+        'resource_changed',
+        resource_name || ':' || new_version || ':' || extract(epoch FROM CURRENT_TIMESTAMP)
+    );
+END $$;
+
+-- ===================================
+-- TRIGGER FUNCTIONS
+-- ===================================
+
+CREATE OR REPLACE FUNCTION public.notify_resource_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM public.bump_resource_version(TG_TABLE_NAME);
+    RETURN NULL;
+END $$;
+
+CREATE OR REPLACE FUNCTION public.notify_reference_data_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('reference_data_changed', TG_TABLE_NAME || ':' || COALESCE(NEW.id, OLD.id)::text);
+    PERFORM public.bump_resource_version('reference');
+    RETURN COALESCE(NEW, OLD);
+END $$;
+
+-- ===================================
+-- ROW LEVEL SECURITY
+-- ===================================
+
+ALTER TABLE public.resource_versions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "public_can_read_resource_versions"
+ON public.resource_versions
+FOR SELECT
+TO public
+USING (true);
+
+COMMENT ON TABLE public.resource_versions IS
+'Current version and change time per resource; the source of backend ETags and Last-Modified.';
+
+COMMENT ON FUNCTION public.bump_resource_version(TEXT) IS
+'Advances a resource version and sends <resource>:<version>:<epoch> on resource_changed.';
@@ -0,0 +1,25 @@
+-- Location: supabase/migrations/20251019220000_price_tick_seq.sql
+-- Schema Analysis: Extends market_price_ticks (20251019100000)
+-- Dependencies: market_price_ticks
+-- Integration Type: Insertion-order watermark for incremental reads by the backend
+-- Tables Modified: market_price_ticks (seq column)
+-- Tables Added: None
+
+-- ===================================
+-- INSERTION SEQUENCE
+-- ===================================
+
+-- ts is the event time a sync reports, so a tick written late can carry a ts
+-- older than ticks already read. Incremental readers follow seq instead.
+CREATE SEQUENCE IF NOT EXISTS public.market_price_ticks_seq;
+
+-- No volatile default on ADD COLUMN, so existing partitions are not rewritten;
+-- ticks recorded before this migration keep a NULL seq
+ALTER TABLE public.market_price_ticks ADD COLUMN IF NOT EXISTS seq BIGINT;
+ALTER TABLE public.market_price_ticks ALTER COLUMN seq SET DEFAULT nextval('public.market_price_ticks_seq');
+
+CREATE INDEX IF NOT EXISTS idx_market_price_ticks_seq
+ON public.market_price_ticks(seq);
+
+COMMENT ON COLUMN public.market_price_ticks.seq IS
+'Insertion order. Values can be skipped by conflicting inserts and become visible out of order while transactions commit.';